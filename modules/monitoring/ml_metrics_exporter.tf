@@ -38,7 +38,7 @@ resource "kubernetes_deployment" "ml_metrics_exporter" {
           # Comando para usar o ConfigMap
           command = ["/bin/sh", "-c"]
           args = [
-            "pip install -r /app/config/requirements.txt && python /app/config/app.py"
+            "pip install -r /app/config/requirements.txt && python /app/config/serve.py --mode production"
           ]
           
           port {
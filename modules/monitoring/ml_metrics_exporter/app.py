@@ -2,19 +2,51 @@
 # Importações padrão do Python
 import random
 import time
-import threading
 import datetime
 import os
 import logging
 import json
 import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
 # Bibliotecas para métricas e API REST
 from flask import Flask, jsonify, request, Response
 from prometheus_client import (
     Counter, Gauge, Histogram, Summary, 
-    generate_latest, REGISTRY
+    CONTENT_TYPE_LATEST
+)
+
+# Cache de children pré-resolvidos e limite de cardinalidade para as
+# métricas rotuladas
+from cardinality import LIMITERS, LabelPolicy, limited_labels
+
+# Exposição de /metrics com cache por família e compressão gzip
+from exposition_cache import ExpositionCache, metrics_registry
+
+# Agendador das tarefas periódicas de atualização das métricas simuladas
+from metric_scheduler import MetricScheduler
+
+# Estado-sombra (NumPy) dos gauges simulados por passeio aleatório
+from shadow_state import ShadowStateStore
+
+# Histórico de scores de compliance (SQLite) consultado em /compliance/history
+from compliance_history import ComplianceHistory, query_from_params
+
+# Cache das consultas ao DICT (TTL, LRU, cache negativo e coalescência) e DICT simulado
+from dict_cache import DictCache, DictStub, DictUnavailable, ERROR as DICT_ERROR, MISS as DICT_MISS
+
+# Vocabulário da simulação (canais, tipos de fraude, segmentos...)
+from simulation_vocabulary import (
+    fraud_types, channels, transaction_types, error_types, block_durations,
+    block_reasons, attack_types, detection_methods, severity_levels, time_periods,
+    demographic_groups, profile_types, decision_types, perturbation_types,
+    explanation_methods, feature_categories, business_rule_sets, deployment_stages,
+    model_types, data_sources, processing_stages, policy_categories,
+    compliance_frameworks, documentation_aspects, accelerator_types, operation_types,
+    impact_categories, time_periods_business, article_numbers, requirement_types,
+    user_segments, interaction_types
 )
 
 # Configuração de logging
@@ -27,188 +59,243 @@ logger = logging.getLogger('ml-metrics-exporter')
 # Inicialização da aplicação Flask
 app = Flask(__name__)
 
+# Cache da exposição de métricas servida em /metrics. Em modo multiprocesso
+# (gunicorn, ver serve.py) o registry agrega os arquivos de todos os workers
+exposition_cache = ExpositionCache(metrics_registry())
+
+# Histórico das verificações de /simulate/compliance_check. Com vários workers
+# todos gravam no mesmo arquivo
+compliance_history = ComplianceHistory(
+    os.environ.get('COMPLIANCE_HISTORY_PATH', '/tmp/compliance_history.db')
+)
+
+# Com vários workers, cada gauge é agregado pelo valor escrito mais
+# recentemente entre os processos
+GAUGE_MULTIPROCESS_MODE = 'mostrecent'
+
+# Versão do modelo nos rótulos model_version das métricas simuladas. O
+# serviço de inferência rotula as métricas com as versões que de fato
+# carregou (servicos/inferencia/src/serving/model_registry.py)
+MODEL_VERSION = os.environ.get('MODEL_VERSION', '1.0')
+
 #################################################################
 # DEFINIÇÃO DAS MÉTRICAS
 #################################################################
 
 # Grupo 1: Métricas de Transações e Predições (REQ-MON-*)
-prediction_counter = Counter(
+prediction_counter = limited_labels(Counter,
     'ml_predictions_total', 
     'Total de previsões realizadas, segmentadas por resultado e canal',
     ['result', 'channel']
 )
 
-fraud_counter = Counter(
+fraud_counter = limited_labels(Counter,
     'ml_fraud_detected_total', 
     'Total de fraudes detectadas, segmentadas por tipo de fraude',
     ['fraud_type']
 )
 
-inference_errors = Counter(
+inference_errors = limited_labels(Counter,
     'inference_errors_total', 
     'Total de erros durante inferência, segmentados por tipo de erro',
     ['error_type']
 )
 
 # Grupo 2: Métricas de Qualidade do Modelo (REQ-ANO-*)
-model_precision = Gauge(
+model_precision = limited_labels(Gauge,
     'model_precision', 
     'Precision do modelo de detecção de fraude',
-    ['model_version', 'model_type']
+    ['model_version', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-model_recall = Gauge(
+model_recall = limited_labels(Gauge,
     'model_recall', 
     'Recall do modelo de detecção de fraude',
-    ['model_version', 'model_type']
+    ['model_version', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-model_f1_score = Gauge(
+model_f1_score = limited_labels(Gauge,
     'model_f1_score', 
     'F1-Score do modelo de detecção de fraude',
-    ['model_version', 'model_type']
+    ['model_version', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-model_drift_score = Gauge(
+model_drift_score = limited_labels(Gauge,
     'model_drift_score', 
     'Score de drift do modelo ao longo do tempo',
-    ['feature_set', 'model_version']
+    ['feature_set', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-prediction_fraud_rate = Gauge(
+prediction_fraud_rate = limited_labels(Gauge,
     'prediction_fraud_rate', 
     'Taxa de transações classificadas como fraude',
-    ['channel', 'transaction_type']
+    ['channel', 'transaction_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-model_version_gauge = Gauge(
+model_version_gauge = limited_labels(Gauge,
     'model_version', 
     'Versão atual do modelo em produção',
-    ['model_name', 'model_type']
+    ['model_name', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Grupo 3: Métricas de Performance e Disponibilidade (REQ-SEG-*)
 uptime = Gauge(
     'uptime', 
-    'Tempo de atividade do sistema em segundos'
+    'Tempo de atividade do sistema em segundos',
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-service_health = Gauge(
+service_health = limited_labels(Gauge,
     'service_health', 
     'Status de saúde do serviço (1=saudável, 0=degradado)',
-    ['component']
+    ['component'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Grupo 4: Métricas de Latência (REQ-MON-004)
-inference_latency = Histogram(
+inference_latency = limited_labels(Histogram,
     'inference_latency_seconds', 
     'Latência de inferência do modelo em segundos',
     ['model_name', 'model_version'],
     buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
 )
 
-fraud_detection_trigger_latency = Histogram(
+fraud_detection_trigger_latency = limited_labels(Histogram,
     'fraud_detection_trigger_latency_seconds', 
     'Tempo de resposta para transações com suspeita de fraude',
     ['fraud_type', 'action_taken'],
     buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
 )
 
-http_request_duration = Histogram(
+http_request_duration = limited_labels(Histogram,
     'http_request_duration_seconds', 
     'Duração das requisições HTTP',
     ['endpoint', 'method', 'status'],
     buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
 )
 
-prediction_latency = Summary(
+prediction_latency = limited_labels(Summary,
     'prediction_latency_seconds', 
     'Latência das previsões do modelo',
     ['model_name', 'prediction_type']
 )
 
 # Grupo 5: Métricas de Compliance e Auditoria (REQ-SEG-003, REQ-EXP-*)
-request_audit_counter = Counter(
+# user_id vem do header X-User-ID: apenas os usuários mais frequentes ganham
+# série própria, os demais são agregados em __other__
+request_audit_counter = limited_labels(Counter,
     'request_audit_total', 
     'Contador de requisições para fins de auditoria',
-    ['endpoint', 'user_id', 'request_type']
+    ['endpoint', 'user_id', 'request_type'],
+    label_policies={
+        'user_id': LabelPolicy(
+            max_values=int(os.environ.get('AUDIT_USER_ID_MAX_VALUES', 50)),
+            mode=os.environ.get('AUDIT_USER_ID_MODE', 'top_k')
+        )
+    }
 )
 
-decision_audit_counter = Counter(
+decision_audit_counter = limited_labels(Counter,
     'decision_audit_total', 
     'Contador de decisões do modelo para auditoria',
     ['decision_type', 'model_version', 'explainable']
 )
 
-dict_integration_status = Gauge(
+dict_integration_status = limited_labels(Gauge,
     'dict_integration_status', 
     'Status da integração com o DICT (1=operacional, 0=falha)',
-    ['operation_type']
+    ['operation_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-blocked_accounts_total = Gauge(
+# Incrementado pelos endpoints de simulação em qualquer worker ('mostrecent'
+# não aceita inc), então o total soma os processos vivos
+blocked_accounts_total = limited_labels(Gauge,
     'blocked_accounts_total', 
     'Número total de contas bloqueadas por suspeita de fraude',
-    ['block_reason', 'block_duration']
+    ['block_reason', 'block_duration'],
+    multiprocess_mode='livesum'
 )
 
-dict_query_latency = Histogram(
+dict_query_latency = limited_labels(Histogram,
     'dict_query_latency_seconds', 
     'Latência das consultas ao DICT',
     ['operation_type'],
     buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
 )
 
+# Fração das consultas do processo atendidas sem chamada própria ao DICT.
+# Com vários workers, a taxa agregada vem de dict_cache_lookups_total
 dict_cache_hit_ratio = Gauge(
     'dict_cache_hit_ratio', 
-    'Taxa de acerto do cache para consultas ao DICT'
+    'Taxa de acerto do cache para consultas ao DICT',
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
+)
+
+dict_cache_lookups = limited_labels(Counter,
+    'dict_cache_lookups_total',
+    'Consultas ao cache do DICT por resultado (hit, negative_hit, stale, coalesced, miss, error)',
+    ['result']
 )
 
 # Novas métricas para alertas regulatórios
-model_explainability_score = Gauge(
+model_explainability_score = limited_labels(Gauge,
     'model_explainability_score',
     'Score de explicabilidade do modelo',
-    ['model_version', 'model_type']
+    ['model_version', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 data_retention_compliance = Gauge(
     'data_retention_compliance',
-    'Indicador de conformidade com retenção de dados (1=compliant, 0=non-compliant)'
+    'Indicador de conformidade com retenção de dados (1=compliant, 0=non-compliant)',
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 audit_log_integrity = Gauge(
     'audit_log_integrity',
-    'Integridade dos logs de auditoria (1=completa, 0=comprometida)'
+    'Integridade dos logs de auditoria (1=completa, 0=comprometida)',
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Estabilidade Temporal
-feature_stability_index = Gauge(
+feature_stability_index = limited_labels(Gauge,
     'model_feature_stability_index', 
     'Índice de estabilidade populacional das features principais',
-    ['feature_name', 'model_version']
+    ['feature_name', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-temporal_reliability = Gauge(
+temporal_reliability = limited_labels(Gauge,
     'model_temporal_reliability', 
     'Confiabilidade do modelo em diferentes períodos',
-    ['time_period', 'model_version']
+    ['time_period', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Imparcialidade e Viés
-demographic_parity = Gauge(
+demographic_parity = limited_labels(Gauge,
     'model_demographic_parity',
     'Diferença de resultados entre grupos demográficos',
-    ['demographic_group_a', 'demographic_group_b', 'model_version']
+    ['demographic_group_a', 'demographic_group_b', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-financial_fairness = Gauge(
+financial_fairness = limited_labels(Gauge,
     'financial_decision_fairness',
     'Equidade nas decisões financeiras entre diferentes perfis',
-    ['profile_type', 'decision_type']
+    ['profile_type', 'decision_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Incerteza
-prediction_uncertainty = Histogram(
+prediction_uncertainty = limited_labels(Histogram,
     'prediction_uncertainty_distribution',
     'Distribuição da incerteza nas predições do modelo',
     ['model_name', 'decision_threshold'],
@@ -216,111 +303,123 @@ prediction_uncertainty = Histogram(
 )
 
 # Métricas de Detecção de Ataques Adversariais
-adversarial_attempt_counter = Counter(
+adversarial_attempt_counter = limited_labels(Counter,
     'adversarial_attempts_total',
     'Contagem de tentativas detectadas de ataques adversariais',
     ['attack_type', 'detection_method', 'severity']
 )
 
 # Métricas de Robustez do Modelo
-model_robustness_score = Gauge(
+model_robustness_score = limited_labels(Gauge,
     'model_robustness_score',
     'Score de robustez do modelo a variações nos dados de entrada',
-    ['perturbation_type', 'model_version']
+    ['perturbation_type', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-security_reliability_index = Gauge(
+security_reliability_index = limited_labels(Gauge,
     'model_security_reliability_index',
     'Índice composto de confiabilidade de segurança do modelo',
-    ['model_name', 'model_version']
+    ['model_name', 'model_version'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Consistência das Explicações
-explanation_consistency = Gauge(
+explanation_consistency = limited_labels(Gauge,
     'xai_explanation_consistency',
     'Consistência das explicações geradas para decisões similares',
-    ['explanation_method', 'decision_type']
+    ['explanation_method', 'decision_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-feature_importance_alignment = Gauge(
+feature_importance_alignment = limited_labels(Gauge,
     'feature_importance_business_alignment',
     'Alinhamento entre importância das features e regras de negócio definidas',
-    ['feature_category', 'business_rule_set']
+    ['feature_category', 'business_rule_set'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Ciclo de Vida do Modelo
-model_freshness_days = Gauge(
+model_freshness_days = limited_labels(Gauge,
     'model_freshness_days',
     'Dias desde o último treinamento/atualização do modelo',
-    ['model_name', 'environment']
+    ['model_name', 'environment'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-retraining_efficiency = Histogram(
+retraining_efficiency = limited_labels(Histogram,
     'model_retraining_efficiency',
     'Tempo e recursos necessários para retreinar o modelo',
     ['trigger_reason'],
     buckets=[60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400]  # segundos
 )
 
-automated_deployment_success = Gauge(
+automated_deployment_success = limited_labels(Gauge,
     'automated_deployment_success_rate',
     'Taxa de sucesso de deployments automatizados',
-    ['deployment_stage', 'model_type']
+    ['deployment_stage', 'model_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Governança de Dados e Modelos
-data_lineage_completeness = Gauge(
+data_lineage_completeness = limited_labels(Gauge,
     'data_lineage_completeness',
     'Completude da rastreabilidade de dados até a origem',
-    ['data_source', 'processing_stage']
+    ['data_source', 'processing_stage'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-governance_compliance = Gauge(
+governance_compliance = limited_labels(Gauge,
     'ml_governance_compliance',
     'Nível de conformidade com políticas de governança de ML',
-    ['policy_category', 'compliance_framework']
+    ['policy_category', 'compliance_framework'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-documentation_quality = Gauge(
+documentation_quality = limited_labels(Gauge,
     'model_documentation_quality',
     'Avaliação da qualidade e completude da documentação do modelo',
-    ['documentation_aspect']
+    ['documentation_aspect'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Métricas de Eficiência de Recursos
-hardware_acceleration_efficiency = Gauge(
+hardware_acceleration_efficiency = limited_labels(Gauge,
     'ml_hardware_acceleration_efficiency',
     'Eficiência de utilização de aceleradores (GPU/TPU)',
-    ['accelerator_type', 'operation_type']
+    ['accelerator_type', 'operation_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-ml_carbon_footprint = Counter(
+ml_carbon_footprint = limited_labels(Counter,
     'ml_carbon_footprint_grams',
     'Estimativa de emissão de carbono das operações de ML em gramas de CO2e',
     ['operation_type', 'energy_source']
 )
 
 # Métricas de Valor de Negócio
-model_roi_gauge = Gauge(
+model_roi_gauge = limited_labels(Gauge,
     'model_financial_impact',
     'Impacto financeiro estimado do modelo em reais',
-    ['impact_category', 'time_period']
+    ['impact_category', 'time_period'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-human_effort_saved = Counter(
+human_effort_saved = limited_labels(Counter,
     'ml_human_effort_saved_minutes',
     'Tempo estimado economizado em tarefas manuais graças à automação',
     ['task_category', 'department']
 )
 
 # Métricas de Compliance Regulatório
-bcb_compliance_score = Gauge(
+bcb_compliance_score = limited_labels(Gauge,
     'bcb_403_compliance_score',
     'Nível de conformidade com a Resolução BCB n° 403',
-    ['article_number', 'requirement_type']
+    ['article_number', 'requirement_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-regulatory_request_fulfillment_time = Histogram(
+regulatory_request_fulfillment_time = limited_labels(Histogram,
     'regulatory_request_fulfillment_seconds',
     'Tempo para atender pedidos regulatórios',
     ['request_type', 'requesting_entity'],
@@ -328,26 +427,28 @@ regulatory_request_fulfillment_time = Histogram(
 )
 
 # Métricas de Confiança do Cliente
-user_trust_score = Gauge(
+user_trust_score = limited_labels(Gauge,
     'user_trust_score',
     'Avaliação da confiança dos usuários no sistema',
-    ['user_segment', 'interaction_type']
+    ['user_segment', 'interaction_type'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
-decision_contestation_rate = Gauge(
+decision_contestation_rate = limited_labels(Gauge,
     'algorithmic_decision_contestation_rate',
     'Taxa de contestação de decisões tomadas pelo algoritmo',
-    ['decision_type', 'user_segment']
+    ['decision_type', 'user_segment'],
+    multiprocess_mode=GAUGE_MULTIPROCESS_MODE
 )
 
 # Grupo 6: Métricas de Segurança (REQ-SEG-*)
-security_events_total = Counter(
+security_events_total = limited_labels(Counter,
     'security_events_total', 
     'Total de eventos de segurança detectados',
     ['severity', 'event_type']
 )
 
-data_validation_errors = Counter(
+data_validation_errors = limited_labels(Counter,
     'data_validation_errors_total', 
     'Total de erros de validação de dados de entrada',
     ['error_type', 'source']
@@ -356,15 +457,14 @@ data_validation_errors = Counter(
 # Inicialização de valores simulados para algumas métricas
 # Valores para demonstração que seriam atualizados por sistemas reais
 def initialize_metrics():
-    model_precision.labels(model_version="1.0", model_type="xgboost").set(0.94)
-    model_recall.labels(model_version="1.0", model_type="xgboost").set(0.91)
-    model_f1_score.labels(model_version="1.0", model_type="xgboost").set(0.925)
-    model_drift_score.labels(feature_set="base", model_version="1.0").set(0.03)
+    model_precision.labels(model_version=MODEL_VERSION, model_type="xgboost").set(0.94)
+    model_recall.labels(model_version=MODEL_VERSION, model_type="xgboost").set(0.91)
+    model_f1_score.labels(model_version=MODEL_VERSION, model_type="xgboost").set(0.925)
+    model_drift_score.labels(feature_set="base", model_version=MODEL_VERSION).set(0.03)
     prediction_fraud_rate.labels(channel="PIX", transaction_type="p2p").set(0.007)
     model_version_gauge.labels(model_name="fraude_pix_principal", model_type="xgboost").set(1)
     dict_integration_status.labels(operation_type="query").set(1)
     dict_integration_status.labels(operation_type="update").set(1)
-    dict_cache_hit_ratio.set(0.85)
     service_health.labels(component="ml_serving").set(1)
     service_health.labels(component="dict_connector").set(1)
     service_health.labels(component="api_gateway").set(1)
@@ -372,29 +472,29 @@ def initialize_metrics():
     blocked_accounts_total.labels(block_reason="suspeita_alta", block_duration="30d").set(5)
     blocked_accounts_total.labels(block_reason="multiplas_denuncias", block_duration="indefinido").set(3)
     # Inicialização para as novas métricas
-    model_explainability_score.labels(model_version="1.0", model_type="xgboost").set(0.95)
+    model_explainability_score.labels(model_version=MODEL_VERSION, model_type="xgboost").set(0.95)
     data_retention_compliance.set(1)
     audit_log_integrity.set(1)
     
     # Inicialização das novas métricas MLSecOps
-    feature_stability_index.labels(feature_name="transaction_amount", model_version="1.0").set(0.92)
-    feature_stability_index.labels(feature_name="user_activity", model_version="1.0").set(0.89)
-    feature_stability_index.labels(feature_name="device_fingerprint", model_version="1.0").set(0.95)
+    feature_stability_index.labels(feature_name="transaction_amount", model_version=MODEL_VERSION).set(0.92)
+    feature_stability_index.labels(feature_name="user_activity", model_version=MODEL_VERSION).set(0.89)
+    feature_stability_index.labels(feature_name="device_fingerprint", model_version=MODEL_VERSION).set(0.95)
     
-    temporal_reliability.labels(time_period="business_hours", model_version="1.0").set(0.95)
-    temporal_reliability.labels(time_period="after_hours", model_version="1.0").set(0.88)
-    temporal_reliability.labels(time_period="weekend", model_version="1.0").set(0.90)
+    temporal_reliability.labels(time_period="business_hours", model_version=MODEL_VERSION).set(0.95)
+    temporal_reliability.labels(time_period="after_hours", model_version=MODEL_VERSION).set(0.88)
+    temporal_reliability.labels(time_period="weekend", model_version=MODEL_VERSION).set(0.90)
     
-    demographic_parity.labels(demographic_group_a="low_income", demographic_group_b="high_income", model_version="1.0").set(0.05)
-    demographic_parity.labels(demographic_group_a="urban", demographic_group_b="rural", model_version="1.0").set(0.03)
+    demographic_parity.labels(demographic_group_a="low_income", demographic_group_b="high_income", model_version=MODEL_VERSION).set(0.05)
+    demographic_parity.labels(demographic_group_a="urban", demographic_group_b="rural", model_version=MODEL_VERSION).set(0.03)
     
     financial_fairness.labels(profile_type="individual", decision_type="transaction_block").set(0.97)
     financial_fairness.labels(profile_type="business", decision_type="transaction_block").set(0.96)
     
-    model_robustness_score.labels(perturbation_type="noise", model_version="1.0").set(0.85)
-    model_robustness_score.labels(perturbation_type="targeted", model_version="1.0").set(0.78)
+    model_robustness_score.labels(perturbation_type="noise", model_version=MODEL_VERSION).set(0.85)
+    model_robustness_score.labels(perturbation_type="targeted", model_version=MODEL_VERSION).set(0.78)
     
-    security_reliability_index.labels(model_name="fraude_pix_principal", model_version="1.0").set(0.92)
+    security_reliability_index.labels(model_name="fraude_pix_principal", model_version=MODEL_VERSION).set(0.92)
     
     explanation_consistency.labels(explanation_method="shap", decision_type="fraud_detection").set(0.88)
     explanation_consistency.labels(explanation_method="lime", decision_type="fraud_detection").set(0.85)
@@ -433,456 +533,429 @@ def initialize_metrics():
 
 # Variáveis para simulação
 start_time = time.time()
-fraud_types = ["MULA_FINANCEIRA", "ENGENHARIA_SOCIAL", "INVASAO_CONTA", "GOLPE_FALSO_FUNCIONARIO", "PHISHING"]
-channels = ["PIX", "TED", "BOLETO", "APP_MOBILE", "INTERNET_BANKING"]
-transaction_types = ["p2p", "ecommerce", "bill_payment", "withdrawal", "deposit"]
-error_types = ["timeout", "model_error", "feature_missing", "validation_error", "authentication_error"]
-block_durations = ["72h", "30d", "indefinido"]
-block_reasons = ["fraude_confirmada", "suspeita_alta", "multiplas_denuncias", "ordem_judicial", "atividade_atipica"]
-attack_types = ["input_manipulation", "model_inversion", "membership_inference", "evasion_attack", "data_poisoning"]
-detection_methods = ["input_analysis", "behavioral_patterns", "anomaly_detection", "model_specific_defense"]
-severity_levels = ["low", "medium", "high", "critical"]
-time_periods = ["business_hours", "after_hours", "weekend", "holiday"]
-demographic_groups = ["low_income", "medium_income", "high_income", "urban", "rural", "young", "elderly"]
-profile_types = ["individual", "business", "government", "non_profit"]
-decision_types = ["transaction_block", "limit_increase", "authentication_challenge"]
-perturbation_types = ["noise", "targeted", "boundary", "transfer"]
-explanation_methods = ["shap", "lime", "counterfactual", "feature_importance"]
-feature_categories = ["temporal", "behavioral", "transactional", "demographic", "device"]
-business_rule_sets = ["bcb403", "internal_policy", "fraud_prevention", "aml"]
-deployment_stages = ["dev", "test", "staging", "production"]
-model_types = ["xgboost", "lightgbm", "neural_network", "ensemble"]
-data_sources = ["transactional", "customer", "external", "derived"]
-processing_stages = ["raw", "processed", "feature", "model_input"]
-policy_categories = ["data_access", "model_governance", "security", "privacy", "operational"]
-compliance_frameworks = ["bcb403", "iso27001", "gdpr", "pci_dss"]
-documentation_aspects = ["model_card", "data_dictionary", "risk_assessment", "monitoring_plan"]
-accelerator_types = ["cpu", "gpu", "tpu", "fpga"]
-operation_types = ["training", "inference", "feature_extraction", "data_processing"]
-impact_categories = ["fraud_prevention", "operational_efficiency", "customer_experience", "regulatory"]
-time_periods_business = ["daily", "weekly", "monthly", "quarterly", "yearly"]
-article_numbers = ["89", "91", "93", "95", "97"]
-requirement_types = ["monitoramento_tempo_real", "deteccao_anomalias", "seguranca_dados", "auditoria"]
-user_segments = ["retail", "high_value", "corporate", "new_customer", "long_term"]
-interaction_types = ["digital", "branch", "phone", "third_party"]
 
 #################################################################
-# THREAD DE ATUALIZAÇÃO DE MÉTRICAS SIMULADAS
+# CACHE DO DICT
 #################################################################
 
-def update_metrics():
-    """Thread que atualiza métricas simuladas periodicamente"""
-    logger.info("Iniciando thread de atualização de métricas...")
-    while True:
-        try:
-            # Atualizar uptime
-            uptime.set(time.time() - start_time)
-            
-            # Simular predições e fraudes
-            for _ in range(random.randint(5, 15)):
-                channel = random.choice(channels)
-                if random.random() < 0.1:  # 10% das transações são classificadas como fraude
-                    prediction_counter.labels(result="fraud", channel=channel).inc()
-                    if random.random() < 0.7:  # 70% das fraudes classificadas são reais
-                        fraud_type = random.choice(fraud_types)
-                        fraud_counter.labels(fraud_type=fraud_type).inc()
-                else:
-                    prediction_counter.labels(result="legitimate", channel=channel).inc()
-            
-            # Simular erros ocasionais de inferência
-            if random.random() < 0.05:  # 5% de chance de erro
-                error_type = random.choice(error_types)
-                inference_errors.labels(error_type=error_type).inc()
-            
-            # Atualizar métricas de qualidade do modelo com pequenas variações
-            # Obter valores atuais de forma segura
-            try:
-                curr_precision = float(model_precision.labels(model_version="1.0", model_type="xgboost")._value)
-            except:
-                curr_precision = 0.94
-                
-            try:
-                curr_recall = float(model_recall.labels(model_version="1.0", model_type="xgboost")._value)
-            except:
-                curr_recall = 0.91
-                
-            try:
-                curr_drift = float(model_drift_score.labels(feature_set="base", model_version="1.0")._value)
-            except:
-                curr_drift = 0.03
-                
-            try:
-                curr_fraud_rate = float(prediction_fraud_rate.labels(channel="PIX", transaction_type="p2p")._value)
-            except:
-                curr_fraud_rate = 0.007
-            
-            # Adicionar pequenas variações aleatórias
-            model_precision.labels(model_version="1.0", model_type="xgboost").set(
-                max(0.7, min(0.99, curr_precision + random.uniform(-0.01, 0.01)))
-            )
-            model_recall.labels(model_version="1.0", model_type="xgboost").set(
-                max(0.7, min(0.99, curr_recall + random.uniform(-0.01, 0.01)))
-            )
-            
-            # Atualizar F1 com base em precision e recall
-            try:
-                new_precision = float(model_precision.labels(model_version="1.0", model_type="xgboost")._value)
-                new_recall = float(model_recall.labels(model_version="1.0", model_type="xgboost")._value)
-                if new_precision + new_recall > 0:  # Evitar divisão por zero
-                    f1 = 2 * (new_precision * new_recall) / (new_precision + new_recall)
-                    model_f1_score.labels(model_version="1.0", model_type="xgboost").set(f1)
-            except:
-                # Se não conseguir calcular, apenas atualiza com uma pequena variação
-                model_f1_score.labels(model_version="1.0", model_type="xgboost").set(
-                    max(0.7, min(0.99, 0.925 + random.uniform(-0.01, 0.01)))
-                )
-            
-            model_drift_score.labels(feature_set="base", model_version="1.0").set(
-                max(0.01, min(0.2, curr_drift + random.uniform(-0.005, 0.01)))
-            )
-            prediction_fraud_rate.labels(channel="PIX", transaction_type="p2p").set(
-                max(0.001, min(0.05, curr_fraud_rate + random.uniform(-0.001, 0.002)))
-            )
-            
-            # Simular contagem de contas bloqueadas
-            for reason in block_reasons:
-                for duration in block_durations:
-                    # Usa .set() diretamente com um valor calculado
-                    # em vez de tentar acessar o valor atual
-                    curr_val = random.randint(1, 20)  # Simplificado
-                    blocked_accounts_total.labels(
-                        block_reason=reason, 
-                        block_duration=duration
-                    ).set(max(0, curr_val + random.randint(-2, 5)))
-            
-            # Simular eventos de segurança
-            if random.random() < 0.2:  # 20% de chance de evento de segurança
-                severity = random.choice(["low", "medium", "high", "critical"])
-                event_type = random.choice([
-                    "suspicious_login", "brute_force", "data_leak", 
-                    "unauthorized_access", "unusual_pattern"
-                ])
-                security_events_total.labels(severity=severity, event_type=event_type).inc()
-            
-            # Simular erros de validação de dados
-            if random.random() < 0.15:  # 15% de chance de erro de validação
-                error_type = random.choice([
-                    "missing_field", "invalid_format", "out_of_range", 
-                    "type_mismatch", "constraint_violation"
-                ])
-                source = random.choice([
-                    "mobile_app", "internet_banking", "partner_api", 
-                    "batch_import", "third_party"
-                ])
-                data_validation_errors.labels(error_type=error_type, source=source).inc()
-            
-            # Simular latências
-            inference_latency.labels(
-                model_name="fraude_pix_principal", 
-                model_version="1.0"
-            ).observe(random.uniform(0.05, 0.3))
-            
-            fraud_detection_trigger_latency.labels(
-                fraud_type=random.choice(fraud_types),
-                action_taken=random.choice(["block", "alert", "additional_auth", "monitor"])
-            ).observe(random.uniform(0.2, 1.0))
-            
-            prediction_latency.labels(
-                model_name="fraude_pix_principal", 
-                prediction_type="real_time"
-            ).observe(random.uniform(0.05, 0.2))
-            
-            dict_query_latency.labels(
-                operation_type="query"
-            ).observe(random.uniform(0.1, 0.5))
-            
-            # Atualizar status de integração DICT ocasionalmente
-            if random.random() < 0.05:  # 5% de chance de problema de integração
-                dict_integration_status.labels(operation_type="query").set(0)  # Falha
-                time.sleep(2)  # Simular falha por 2 segundos
-                dict_integration_status.labels(operation_type="query").set(1)  # Restaurado
-            
-            # Atualizar cache hit ratio com pequenas variações
-            try:
-                current_hit_ratio = float(dict_cache_hit_ratio._value)
-            except:
-                current_hit_ratio = 0.85
-                
-            dict_cache_hit_ratio.set(max(0.7, min(0.95, current_hit_ratio + random.uniform(-0.02, 0.02))))
-            
-            # Atualização para as novas métricas
-            try:
-                curr_explainability = float(model_explainability_score.labels(model_version="1.0", model_type="xgboost")._value)
-            except:
-                curr_explainability = 0.95
-                
-            model_explainability_score.labels(model_version="1.0", model_type="xgboost").set(
-                max(0.7, min(0.99, curr_explainability + random.uniform(-0.01, 0.01)))
-            )
-            
-            # Simulação ocasional de problemas de compliance
-            if random.random() < 0.02:  # 2% de chance
-                data_retention_compliance.set(0)
-                time.sleep(3)  # Simular problema por 3 segundos
-                data_retention_compliance.set(1)
-            
-            # Simulação ocasional de problemas no log de auditoria
-            if random.random() < 0.01:  # 1% de chance
-                audit_log_integrity.set(0)
-                time.sleep(2)  # Simular problema por 2 segundos
-                audit_log_integrity.set(1)
-            
-            # Simulação para as novas métricas MLSecOps
-            # Estabilidade de features
-            for feature_name in ["transaction_amount", "user_activity", "device_fingerprint"]:
-                try:
-                    curr_stability = float(feature_stability_index.labels(feature_name=feature_name, model_version="1.0")._value)
-                except:
-                    curr_stability = 0.9
-                feature_stability_index.labels(feature_name=feature_name, model_version="1.0").set(
-                    max(0.7, min(0.99, curr_stability + random.uniform(-0.01, 0.01)))
-                )
-            
-            # Confiabilidade temporal
-            for period in time_periods[:3]:  # Limitar a 3 períodos para simplificar
-                try:
-                    curr_reliability = float(temporal_reliability.labels(time_period=period, model_version="1.0")._value)
-                except:
-                    curr_reliability = 0.9
-                temporal_reliability.labels(time_period=period, model_version="1.0").set(
-                    max(0.7, min(0.99, curr_reliability + random.uniform(-0.01, 0.01)))
-                )
-            
-            # Métricas de equidade e viés
-            demo_pairs = [("low_income", "high_income"), ("urban", "rural")]
-            for group_a, group_b in demo_pairs:
-                try:
-                    curr_parity = float(demographic_parity.labels(demographic_group_a=group_a, demographic_group_b=group_b, model_version="1.0")._value)
-                except:
-                    curr_parity = 0.05
-                demographic_parity.labels(demographic_group_a=group_a, demographic_group_b=group_b, model_version="1.0").set(
-                    max(0.01, min(0.15, curr_parity + random.uniform(-0.01, 0.01)))
-                )
-            
-            # Equidade nas decisões financeiras
-            for profile in profile_types[:2]:  # Limitar a 2 perfis
-                for decision in decision_types[:2]:  # Limitar a 2 tipos de decisão
-                    try:
-                        curr_fairness = float(financial_fairness.labels(profile_type=profile, decision_type=decision)._value)
-                    except:
-                        curr_fairness = 0.95
-                    financial_fairness.labels(profile_type=profile, decision_type=decision).set(
-                        max(0.8, min(0.99, curr_fairness + random.uniform(-0.01, 0.01)))
-                    )
-            
-            # Incerteza das predições
-            prediction_uncertainty.labels(
-                model_name="fraude_pix_principal",
-                decision_threshold="0.5"
-            ).observe(random.uniform(0.1, 0.4))
-            
-            # Simulação de tentativas adversariais
-            if random.random() < 0.1:  # 10% de chance de detectar tentativa adversarial
-                attack_type = random.choice(attack_types)
-                detection_method = random.choice(detection_methods)
-                severity = random.choice(severity_levels)
-                adversarial_attempt_counter.labels(
-                    attack_type=attack_type,
-                    detection_method=detection_method,
-                    severity=severity
-                ).inc()
-            
-            # Atualização de robustez do modelo
-            for perturbation in perturbation_types[:2]:
-                try:
-                    curr_robustness = float(model_robustness_score.labels(perturbation_type=perturbation, model_version="1.0")._value)
-                except:
-                    curr_robustness = 0.8
-                model_robustness_score.labels(perturbation_type=perturbation, model_version="1.0").set(
-                    max(0.6, min(0.95, curr_robustness + random.uniform(-0.02, 0.02)))
-                )
-            
-            # Índice de confiabilidade de segurança
-            try:
-                curr_reliability = float(security_reliability_index.labels(model_name="fraude_pix_principal", model_version="1.0")._value)
-            except:
-                curr_reliability = 0.92
-            security_reliability_index.labels(model_name="fraude_pix_principal", model_version="1.0").set(
-                max(0.7, min(0.99, curr_reliability + random.uniform(-0.02, 0.02)))
-            )
-            
-            # Consistência das explicações
-            for method in explanation_methods[:2]:
-                try:
-                    curr_consistency = float(explanation_consistency.labels(explanation_method=method, decision_type="fraud_detection")._value)
-                except:
-                    curr_consistency = 0.85
-                explanation_consistency.labels(explanation_method=method, decision_type="fraud_detection").set(
-                    max(0.7, min(0.95, curr_consistency + random.uniform(-0.03, 0.03)))
-                )
-            
-            # Alinhamento de importância de features
-            for category in feature_categories[:2]:
-                try:
-                    curr_alignment = float(feature_importance_alignment.labels(feature_category=category, business_rule_set="bcb403")._value)
-                except:
-                    curr_alignment = 0.9
-                feature_importance_alignment.labels(feature_category=category, business_rule_set="bcb403").set(
-                    max(0.75, min(0.98, curr_alignment + random.uniform(-0.02, 0.02)))
-                )
-            
-            # Idade do modelo
-            try:
-                curr_days = float(model_freshness_days.labels(model_name="fraud_detection", environment="production")._value)
-            except:
-                curr_days = 3
-            model_freshness_days.labels(model_name="fraud_detection", environment="production").set(
-                curr_days + (1/24)  # Aumenta aproximadamente 1 hora a cada 5 segundos para simulação
-            )
-            
-            # Eficiência de retreinamento
-            if random.random() < 0.05:  # 5% de chance de simular um retreinamento
-                retraining_efficiency.labels(
-                    trigger_reason=random.choice(["scheduled", "drift_detected", "performance_drop", "new_data"])
-                ).observe(random.uniform(1800, 7200))  # Entre 30min e 2h
-            
-            # Taxa de sucesso de deployments
-            for stage in deployment_stages:
-                try:
-                    curr_success = float(automated_deployment_success.labels(deployment_stage=stage, model_type="xgboost")._value)
-                except:
-                    curr_success = 0.95
-                automated_deployment_success.labels(deployment_stage=stage, model_type="xgboost").set(
-                    max(0.7, min(0.99, curr_success + random.uniform(-0.03, 0.03)))
-                )
-            
-            # Completude de linhagem de dados
-            for source in data_sources[:2]:
-                for stage in processing_stages[:2]:
-                    try:
-                        curr_completeness = float(data_lineage_completeness.labels(data_source=source, processing_stage=stage)._value)
-                    except:
-                        curr_completeness = 0.95
-                    data_lineage_completeness.labels(data_source=source, processing_stage=stage).set(
-                        max(0.8, min(0.99, curr_completeness + random.uniform(-0.02, 0.02)))
-                    )
-            
-            # Compliance de governança
-            for policy in policy_categories[:2]:
-                try:
-                    curr_compliance = float(governance_compliance.labels(policy_category=policy, compliance_framework="bcb403")._value)
-                except:
-                    curr_compliance = 0.95
-                governance_compliance.labels(policy_category=policy, compliance_framework="bcb403").set(
-                    max(0.8, min(0.99, curr_compliance + random.uniform(-0.02, 0.02)))
-                )
-            
-            # Qualidade da documentação
-            for aspect in documentation_aspects[:2]:
-                try:
-                    curr_quality = float(documentation_quality.labels(documentation_aspect=aspect)._value)
-                except:
-                    curr_quality = 0.9
-                documentation_quality.labels(documentation_aspect=aspect).set(
-                    max(0.7, min(0.98, curr_quality + random.uniform(-0.02, 0.02)))
-                )
-            
-            # Eficiência de hardware
-            for accel_type in accelerator_types[:2]:
-                for op_type in operation_types[:2]:
-                    try:
-                        curr_efficiency = float(hardware_acceleration_efficiency.labels(accelerator_type=accel_type, operation_type=op_type)._value)
-                    except:
-                        curr_efficiency = 0.8
-                    hardware_acceleration_efficiency.labels(accelerator_type=accel_type, operation_type=op_type).set(
-                        max(0.6, min(0.95, curr_efficiency + random.uniform(-0.03, 0.03)))
-                    )
-            
-            # Pegada de carbono
-            ml_carbon_footprint.labels(
-                operation_type=random.choice(operation_types),
-                energy_source=random.choice(["grid", "renewable", "mixed"])
-            ).inc(random.uniform(10, 100))
-            
-            # ROI do modelo
-            for impact in impact_categories[:2]:
-                for period in time_periods_business[:2]:
-                    try:
-                        curr_roi = float(model_roi_gauge.labels(impact_category=impact, time_period=period)._value)
-                    except:
-                        curr_roi = 200000
-                    model_roi_gauge.labels(impact_category=impact, time_period=period).set(
-                        max(100000, min(500000, curr_roi + random.uniform(-10000, 15000)))
-                    )
-            
-            # Economia de esforço humano
-            human_effort_saved.labels(
-                task_category=random.choice(["review", "investigation", "reporting", "monitoring"]),
-                department=random.choice(["fraud", "compliance", "operations", "customer_service"])
-            ).inc(random.uniform(5, 30))
-            
-            # Compliance com regulações BCB
-            for article in article_numbers[:2]:
-                for req_type in requirement_types[:2]:
-                    try:
-                        curr_score = float(bcb_compliance_score.labels(article_number=article, requirement_type=req_type)._value)
-                    except:
-                        curr_score = 0.93
-                    bcb_compliance_score.labels(article_number=article, requirement_type=req_type).set(
-                        max(0.8, min(0.99, curr_score + random.uniform(-0.02, 0.02)))
-                    )
-            
-            # Tempo para atender requisições regulatórias
-            regulatory_request_fulfillment_time.labels(
-                request_type=random.choice(["audit", "data_access", "report", "explanation"]),
-                requesting_entity=random.choice(["bcb", "internal", "external_audit", "customer"])
-            ).observe(random.uniform(900, 14400))  # Entre 15min e 4h
-            
-            # Score de confiança do usuário
-            for segment in user_segments[:2]:
-                for interaction in interaction_types[:2]:
-                    try:
-                        curr_trust = float(user_trust_score.labels(user_segment=segment, interaction_type=interaction)._value)
-                    except:
-                        curr_trust = 0.85
-                    user_trust_score.labels(user_segment=segment, interaction_type=interaction).set(
-                        max(0.6, min(0.95, curr_trust + random.uniform(-0.03, 0.03)))
-                    )
-            
-            # Taxa de contestação de decisões
-            for decision in decision_types[:2]:
-                try:
-                    curr_rate = float(decision_contestation_rate.labels(decision_type=decision, user_segment="retail")._value)
-                except:
-                    curr_rate = 0.05
-                decision_contestation_rate.labels(decision_type=decision, user_segment="retail").set(
-                    max(0.01, min(0.2, curr_rate + random.uniform(-0.01, 0.01)))
-                )
-            
-            # Pausa entre atualizações
-            time.sleep(5)
-        except Exception as e:
-            logger.error(f"Erro na thread de atualização de métricas: {e}")
-            time.sleep(5)  # Continua tentando em caso de erro
+# O DICT é simulado por DictStub (latência e falhas configuráveis); as
+# consultas de /simulate/dict e da tarefa periódica passam pelo cache real
+dict_stub = DictStub(
+    num_keys=int(os.environ.get('DICT_STUB_KEYS', '10000')),
+    error_rate=float(os.environ.get('DICT_STUB_ERROR_RATE', '0.05'))
+)
+
+def record_dict_fetch(seconds, success):
+    """Latência e estado de cada chamada ao DICT feita pelo cache"""
+    dict_query_latency.labels(operation_type="query").observe(seconds)
+    dict_integration_status.labels(operation_type="query").set(1 if success else 0)
+
+dict_cache = DictCache(
+    dict_stub.lookup,
+    ttl=float(os.environ.get('DICT_CACHE_TTL', '300')),
+    negative_ttl=float(os.environ.get('DICT_CACHE_NEGATIVE_TTL', '60')),
+    stale_ttl=float(os.environ.get('DICT_CACHE_STALE_TTL', '600')),
+    max_entries=int(os.environ.get('DICT_CACHE_MAX_ENTRIES', '100000')),
+    on_fetch=record_dict_fetch
+)
+
+def dict_lookup(pix_key):
+    """Consulta uma chave Pix pelo cache; retorna (dados ou None, resultado)"""
+    try:
+        record, outcome = dict_cache.get(pix_key)
+    except DictUnavailable as e:
+        logger.warning(f"Falha ao consultar o DICT: {str(e)}")
+        record, outcome = None, DICT_ERROR
+    dict_cache_lookups.labels(outcome).inc()
+    dict_cache_hit_ratio.set(dict_cache.hit_ratio())
+    return record, outcome
+
+#################################################################
+# ESTADO-SOMBRA DOS GAUGES SIMULADOS
+#################################################################
+
+# Valores correntes dos gauges simulados por passeio aleatório, em arrays
+# NumPy por grupo; cada tarefa de atualização aplica um passo vetorizado ao
+# seu grupo e publica os valores, sem ler o estado interno das métricas
+shadow_state = ShadowStateStore()
+
+def register_random_walk(group, metric, labelsets, initial, step, bounds):
+    """Registra as séries de um gauge (uma por conjunto de rótulos) em um grupo"""
+    walk = shadow_state.group(group)
+    return [walk.add(metric.labels(**labels), initial, step, bounds) for labels in labelsets]
+
+# Qualidade do modelo
+MODEL_PRECISION_SERIES, = register_random_walk(
+    "model_quality", model_precision, [{"model_version": MODEL_VERSION, "model_type": "xgboost"}],
+    0.94, (-0.01, 0.01), (0.7, 0.99))
+MODEL_RECALL_SERIES, = register_random_walk(
+    "model_quality", model_recall, [{"model_version": MODEL_VERSION, "model_type": "xgboost"}],
+    0.91, (-0.01, 0.01), (0.7, 0.99))
+register_random_walk(
+    "model_quality", model_drift_score, [{"feature_set": "base", "model_version": MODEL_VERSION}],
+    0.03, (-0.005, 0.01), (0.01, 0.2))
+register_random_walk(
+    "model_quality", prediction_fraud_rate, [{"channel": "PIX", "transaction_type": "p2p"}],
+    0.007, (-0.001, 0.002), (0.001, 0.05))
+register_random_walk(
+    "model_quality", model_explainability_score, [{"model_version": MODEL_VERSION, "model_type": "xgboost"}],
+    0.95, (-0.01, 0.01), (0.7, 0.99))
+register_random_walk(
+    "model_quality", feature_stability_index,
+    [{"feature_name": feature_name, "model_version": MODEL_VERSION}
+     for feature_name in ["transaction_amount", "user_activity", "device_fingerprint"]],
+    0.9, (-0.01, 0.01), (0.7, 0.99))
+register_random_walk(
+    "model_quality", temporal_reliability,
+    [{"time_period": period, "model_version": MODEL_VERSION} for period in time_periods[:3]],
+    0.9, (-0.01, 0.01), (0.7, 0.99))
+
+# Segurança
+register_random_walk(
+    "security", model_robustness_score,
+    [{"perturbation_type": perturbation, "model_version": MODEL_VERSION} for perturbation in perturbation_types[:2]],
+    0.8, (-0.02, 0.02), (0.6, 0.95))
+register_random_walk(
+    "security", security_reliability_index,
+    [{"model_name": "fraude_pix_principal", "model_version": MODEL_VERSION}],
+    0.92, (-0.02, 0.02), (0.7, 0.99))
+
+# Compliance regulatório
+register_random_walk(
+    "compliance", bcb_compliance_score,
+    [{"article_number": article, "requirement_type": req_type}
+     for article in article_numbers[:2] for req_type in requirement_types[:2]],
+    0.93, (-0.02, 0.02), (0.8, 0.99))
+
+# Equidade, explicabilidade e confiança
+register_random_walk(
+    "fairness", demographic_parity,
+    [{"demographic_group_a": group_a, "demographic_group_b": group_b, "model_version": MODEL_VERSION}
+     for group_a, group_b in [("low_income", "high_income"), ("urban", "rural")]],
+    0.05, (-0.01, 0.01), (0.01, 0.15))
+register_random_walk(
+    "fairness", financial_fairness,
+    [{"profile_type": profile, "decision_type": decision}
+     for profile in profile_types[:2] for decision in decision_types[:2]],
+    0.95, (-0.01, 0.01), (0.8, 0.99))
+register_random_walk(
+    "fairness", explanation_consistency,
+    [{"explanation_method": method, "decision_type": "fraud_detection"} for method in explanation_methods[:2]],
+    0.85, (-0.03, 0.03), (0.7, 0.95))
+register_random_walk(
+    "fairness", feature_importance_alignment,
+    [{"feature_category": category, "business_rule_set": "bcb403"} for category in feature_categories[:2]],
+    0.9, (-0.02, 0.02), (0.75, 0.98))
+register_random_walk(
+    "fairness", user_trust_score,
+    [{"user_segment": segment, "interaction_type": interaction}
+     for segment in user_segments[:2] for interaction in interaction_types[:2]],
+    0.85, (-0.03, 0.03), (0.6, 0.95))
+register_random_walk(
+    "fairness", decision_contestation_rate,
+    [{"decision_type": decision, "user_segment": "retail"} for decision in decision_types[:2]],
+    0.05, (-0.01, 0.01), (0.01, 0.2))
+
+# Ciclo de vida e governança. A idade do modelo aumenta aproximadamente
+# 1 hora a cada atualização para simulação
+register_random_walk(
+    "governance", model_freshness_days, [{"model_name": "fraud_detection", "environment": "production"}],
+    3, (1/24, 1/24), (0, float("inf")))
+register_random_walk(
+    "governance", automated_deployment_success,
+    [{"deployment_stage": stage, "model_type": "xgboost"} for stage in deployment_stages],
+    0.95, (-0.03, 0.03), (0.7, 0.99))
+register_random_walk(
+    "governance", data_lineage_completeness,
+    [{"data_source": source, "processing_stage": stage}
+     for source in data_sources[:2] for stage in processing_stages[:2]],
+    0.95, (-0.02, 0.02), (0.8, 0.99))
+register_random_walk(
+    "governance", governance_compliance,
+    [{"policy_category": policy, "compliance_framework": "bcb403"} for policy in policy_categories[:2]],
+    0.95, (-0.02, 0.02), (0.8, 0.99))
+register_random_walk(
+    "governance", documentation_quality,
+    [{"documentation_aspect": aspect} for aspect in documentation_aspects[:2]],
+    0.9, (-0.02, 0.02), (0.7, 0.98))
+
+# Eficiência de recursos e valor de negócio
+register_random_walk(
+    "cost", hardware_acceleration_efficiency,
+    [{"accelerator_type": accel_type, "operation_type": op_type}
+     for accel_type in accelerator_types[:2] for op_type in operation_types[:2]],
+    0.8, (-0.03, 0.03), (0.6, 0.95))
+register_random_walk(
+    "cost", model_roi_gauge,
+    [{"impact_category": impact, "time_period": period}
+     for impact in impact_categories[:2] for period in time_periods_business[:2]],
+    200000, (-10000, 15000), (100000, 500000))
+
+#################################################################
+# TAREFAS DE ATUALIZAÇÃO DE MÉTRICAS SIMULADAS
+#################################################################
+
+def update_uptime_metrics():
+    """Atualiza o tempo de atividade"""
+    # Atualizar uptime
+    uptime.set(time.time() - start_time)
+
+def update_prediction_metrics():
+    """Simula predições, fraudes, bloqueios e latências de inferência"""
+    # Simular predições e fraudes
+    for _ in range(random.randint(5, 15)):
+        channel = random.choice(channels)
+        if random.random() < 0.1:  # 10% das transações são classificadas como fraude
+            prediction_counter.labels(result="fraud", channel=channel).inc()
+            if random.random() < 0.7:  # 70% das fraudes classificadas são reais
+                fraud_type = random.choice(fraud_types)
+                fraud_counter.labels(fraud_type=fraud_type).inc()
+        else:
+            prediction_counter.labels(result="legitimate", channel=channel).inc()
+    
+    # Simular erros ocasionais de inferência
+    if random.random() < 0.05:  # 5% de chance de erro
+        error_type = random.choice(error_types)
+        inference_errors.labels(error_type=error_type).inc()
+    
+    # Simular contagem de contas bloqueadas
+    for reason in block_reasons:
+        for duration in block_durations:
+            # Usa .set() diretamente com um valor calculado
+            # em vez de tentar acessar o valor atual
+            curr_val = random.randint(1, 20)  # Simplificado
+            blocked_accounts_total.labels(
+                block_reason=reason, 
+                block_duration=duration
+            ).set(max(0, curr_val + random.randint(-2, 5)))
+    
+    # Simular latências
+    inference_latency.labels(
+        model_name="fraude_pix_principal", 
+        model_version=MODEL_VERSION
+    ).observe(random.uniform(0.05, 0.3))
+    
+    fraud_detection_trigger_latency.labels(
+        fraud_type=random.choice(fraud_types),
+        action_taken=random.choice(["block", "alert", "additional_auth", "monitor"])
+    ).observe(random.uniform(0.2, 1.0))
+    
+    prediction_latency.labels(
+        model_name="fraude_pix_principal", 
+        prediction_type="real_time"
+    ).observe(random.uniform(0.05, 0.2))
+
+def update_model_quality_metrics():
+    """Simula a variação das métricas de qualidade e estabilidade do modelo"""
+    # Passo do passeio aleatório de precision, recall, drift, taxa de fraude,
+    # explicabilidade, estabilidade de features e confiabilidade temporal
+    shadow_state.step("model_quality")
+    
+    # Atualizar F1 com base em precision e recall
+    quality = shadow_state.group("model_quality")
+    precision = quality.value(MODEL_PRECISION_SERIES)
+    recall = quality.value(MODEL_RECALL_SERIES)
+    if precision + recall > 0:  # Evitar divisão por zero
+        model_f1_score.labels(model_version=MODEL_VERSION, model_type="xgboost").set(
+            2 * (precision * recall) / (precision + recall)
+        )
+    
+    # Incerteza das predições
+    prediction_uncertainty.labels(
+        model_name="fraude_pix_principal",
+        decision_threshold="0.5"
+    ).observe(random.uniform(0.1, 0.4))
+
+def update_security_metrics():
+    """Simula eventos de segurança, ataques adversariais e robustez"""
+    # Simular eventos de segurança
+    if random.random() < 0.2:  # 20% de chance de evento de segurança
+        severity = random.choice(["low", "medium", "high", "critical"])
+        event_type = random.choice([
+            "suspicious_login", "brute_force", "data_leak", 
+            "unauthorized_access", "unusual_pattern"
+        ])
+        security_events_total.labels(severity=severity, event_type=event_type).inc()
+    
+    # Simular erros de validação de dados
+    if random.random() < 0.15:  # 15% de chance de erro de validação
+        error_type = random.choice([
+            "missing_field", "invalid_format", "out_of_range", 
+            "type_mismatch", "constraint_violation"
+        ])
+        source = random.choice([
+            "mobile_app", "internet_banking", "partner_api", 
+            "batch_import", "third_party"
+        ])
+        data_validation_errors.labels(error_type=error_type, source=source).inc()
+    
+    # Simulação de tentativas adversariais
+    if random.random() < 0.1:  # 10% de chance de detectar tentativa adversarial
+        attack_type = random.choice(attack_types)
+        detection_method = random.choice(detection_methods)
+        severity = random.choice(severity_levels)
+        adversarial_attempt_counter.labels(
+            attack_type=attack_type,
+            detection_method=detection_method,
+            severity=severity
+        ).inc()
+    
+    # Robustez do modelo e índice de confiabilidade de segurança
+    shadow_state.step("security")
+
+def update_dict_metrics():
+    """Simula consultas de fundo ao DICT (latência, falhas e cache reais via dict_lookup)"""
+    for _ in range(5):
+        dict_lookup(dict_stub.sample_key())
+
+def update_compliance_metrics():
+    """Simula indicadores de compliance regulatório e auditoria"""
+    # Simulação ocasional de problemas de compliance
+    if random.random() < 0.02:  # 2% de chance
+        data_retention_compliance.set(0)
+        time.sleep(3)  # Simular problema por 3 segundos
+        data_retention_compliance.set(1)
+    
+    # Simulação ocasional de problemas no log de auditoria
+    if random.random() < 0.01:  # 1% de chance
+        audit_log_integrity.set(0)
+        time.sleep(2)  # Simular problema por 2 segundos
+        audit_log_integrity.set(1)
+    
+    # Compliance com regulações BCB
+    shadow_state.step("compliance")
+    
+    # Tempo para atender requisições regulatórias
+    regulatory_request_fulfillment_time.labels(
+        request_type=random.choice(["audit", "data_access", "report", "explanation"]),
+        requesting_entity=random.choice(["bcb", "internal", "external_audit", "customer"])
+    ).observe(random.uniform(900, 14400))  # Entre 15min e 4h
+
+def update_fairness_metrics():
+    """Simula métricas de equidade, explicabilidade e confiança do usuário"""
+    # Paridade demográfica, equidade nas decisões financeiras, consistência
+    # das explicações, alinhamento de features, confiança do usuário e taxa
+    # de contestação de decisões
+    shadow_state.step("fairness")
+
+def update_governance_metrics():
+    """Simula métricas de ciclo de vida e governança do modelo"""
+    # Idade do modelo, sucesso de deployments, linhagem de dados, compliance
+    # de governança e qualidade da documentação
+    shadow_state.step("governance")
+    
+    # Eficiência de retreinamento
+    if random.random() < 0.05:  # 5% de chance de simular um retreinamento
+        retraining_efficiency.labels(
+            trigger_reason=random.choice(["scheduled", "drift_detected", "performance_drop", "new_data"])
+        ).observe(random.uniform(1800, 7200))  # Entre 30min e 2h
+
+def update_cost_metrics():
+    """Simula métricas de eficiência de recursos e valor de negócio"""
+    # Eficiência de hardware e ROI do modelo
+    shadow_state.step("cost")
+    
+    # Pegada de carbono
+    ml_carbon_footprint.labels(
+        operation_type=random.choice(operation_types),
+        energy_source=random.choice(["grid", "renewable", "mixed"])
+    ).inc(random.uniform(10, 100))
+    
+    # Economia de esforço humano
+    human_effort_saved.labels(
+        task_category=random.choice(["review", "investigation", "reporting", "monitoring"]),
+        department=random.choice(["fraud", "compliance", "operations", "customer_service"])
+    ).inc(random.uniform(5, 30))
+
+# Tarefas de atualização: (nome, função, intervalo em segundos, jitter em segundos).
+# O intervalo de cada grupo pode ser alterado com METRIC_UPDATE_INTERVAL_<NOME>.
+METRIC_UPDATE_TASKS = [
+    ("uptime", update_uptime_metrics, 5, 0),
+    ("predictions", update_prediction_metrics, 5, 1),
+    ("model_quality", update_model_quality_metrics, 5, 1),
+    ("security", update_security_metrics, 5, 1),
+    ("dict", update_dict_metrics, 5, 1),
+    ("compliance", update_compliance_metrics, 10, 2),
+    ("fairness", update_fairness_metrics, 10, 2),
+    ("governance", update_governance_metrics, 5, 1),
+    ("cost", update_cost_metrics, 15, 3),
+]
+
             
 #################################################################
-# ROTAS DA API
+# LÓGICA DOS ENDPOINTS
 #################################################################
 
-@app.route('/')
-def home():
+# Cada endpoint é um gerador: os valores produzidos com yield são as latências
+# simuladas, e o valor de retorno é a tupla (corpo, status). Assim a mesma
+# lógica serve às rotas Flask (time.sleep, ver run_blocking) e às rotas
+# assíncronas de async_app.py (await asyncio.sleep, ver run_async).
+# Um fluxo também pode produzir uma função sem argumentos que bloqueia (ex.:
+# consulta ao DICT): ela é executada (em uma thread, no modo assíncrono) e o
+# seu retorno é devolvido ao fluxo como valor do yield.
+
+def run_blocking(flow):
+    """Executa um fluxo de endpoint bloqueando a thread durante as latências"""
+    try:
+        step = next(flow)
+        while True:
+            if callable(step):
+                step = flow.send(step())
+            else:
+                time.sleep(step)
+                step = next(flow)
+    except StopIteration as done:
+        return done.value
+
+# Threads para as funções bloqueantes dos fluxos no modo assíncrono. O pool
+# padrão do asyncio (núcleos + 4 threads) limitaria as consultas simultâneas
+# ao DICT em máquinas pequenas
+flow_blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('FLOW_BLOCKING_THREADS', '64')),
+    thread_name_prefix='flow-blocking'
+)
+
+async def run_async(flow):
+    """Executa um fluxo de endpoint liberando o event loop durante as latências"""
+    loop = asyncio.get_running_loop()
+    try:
+        step = next(flow)
+        while True:
+            if callable(step):
+                step = flow.send(await loop.run_in_executor(flow_blocking_executor, step))
+            else:
+                await asyncio.sleep(step)
+                step = next(flow)
+    except StopIteration as done:
+        return done.value
+
+HOME_PAGE = """
+    <html>
+        <head><title>MLSecOps - Monitoramento de Fraudes Pix</title></head>
+        <body>
+            <h1>Modelo preditivo MLSecOps para detecção de fraudes Pix</h1>
+            <p>Sistema de monitoramento em execução</p>
+            <p>Versão: 1.0.0</p>
+            <p><a href="/metrics">Métricas Prometheus</a></p>
+            <p><a href="/health">Status de Saúde</a></p>
+            <p><a href="/compliance/history?bucket=1d">Histórico de Compliance</a></p>
+        </body>
+    </html>
+    """
+
+def home_flow(user_id, method):
     """Página inicial da aplicação"""
     # Simular latência HTTP e registrar para métricas
     start_time_req = time.time()
     
     # Simulação de processamento de requisição
     processing_time = random.uniform(0.01, 0.05)
-    time.sleep(processing_time)
+    yield processing_time
     
     # Registrar métrica de auditoria
     request_audit_counter.labels(
         endpoint="/", 
-        user_id=request.headers.get('X-User-ID', 'anonymous'),
+        user_id=user_id,
         request_type="info"
     ).inc()
     
@@ -890,37 +963,20 @@ def home():
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/",
-        method=request.method,
+        method=method,
         status=200
     ).observe(duration)
     
-    return """
-    <html>
-        <head><title>MLSecOps - Monitoramento de Fraudes Pix</title></head>
-        <body>
-            <h1>Modelo preditivo MLSecOps para detecção de fraudes Pix</h1>
-            <p>Sistema de monitoramento em execução</p>
-            <p>Versão: 1.0.0</p>
-            <p><a href="/metrics">Métricas Prometheus</a></p>
-            <p><a href="/health">Status de Saúde</a></p>
-        </body>
-    </html>
-    """
-
-@app.route('/metrics')
-def metrics():
-    """Endpoint para exposição de métricas para o Prometheus"""
-    return Response(generate_latest(REGISTRY), mimetype="text/plain")
+    return HOME_PAGE, 200
 
-@app.route('/health')
-def health():
-    """Endpoint de verificação de saúde do serviço"""
+def health_response(user_id, method):
+    """Verificação de saúde do serviço (sem latência simulada)"""
     # Registrar latência e auditoria
     start_time_req = time.time()
     
     request_audit_counter.labels(
         endpoint="/health", 
-        user_id=request.headers.get('X-User-ID', 'system'),
+        user_id=user_id,
         request_type="health_check"
     ).inc()
     
@@ -941,19 +997,17 @@ def health():
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/health",
-        method=request.method,
+        method=method,
         status=200
     ).observe(duration)
     
-    return jsonify(health_data)
+    return health_data, 200
 
-@app.route('/simulate/prediction', methods=['POST'])
-def simulate_prediction():
-    """Endpoint para simular uma predição de fraude"""
+def prediction_flow(data, method):
+    """Simula uma predição de fraude"""
     start_time_req = time.time()
     
     # Obter dados da requisição ou usar valores padrão
-    data = request.json if request.is_json else {}
     transaction_id = data.get('transaction_id', str(uuid.uuid4()))
     amount = data.get('amount', random.uniform(10, 5000))
     channel = data.get('channel', random.choice(channels))
@@ -961,7 +1015,7 @@ def simulate_prediction():
     
     # Simular processamento de predição
     prediction_time = random.uniform(0.05, 0.2)
-    time.sleep(prediction_time)
+    yield prediction_time
     
     # Decidir resultado da predição
     is_fraud = random.random() < 0.1  # 10% de chance de fraude
@@ -995,7 +1049,7 @@ def simulate_prediction():
     # Registrar decisão para auditoria
     decision_audit_counter.labels(
         decision_type="fraud_prediction" if is_fraud else "legitimate_transaction",
-        model_version="1.0",
+        model_version=MODEL_VERSION,
         explainable="true"
     ).inc()
     
@@ -1028,33 +1082,24 @@ def simulate_prediction():
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/simulate/prediction",
-        method=request.method,
+        method=method,
         status=200
     ).observe(duration)
     
-    return jsonify(response_data)
+    return response_data, 200
 
-@app.route('/simulate/dict', methods=['POST'])
-def simulate_dict_query():
-    """Endpoint para simular consulta ao DICT"""
+def dict_query_flow(data, user_id, method):
+    """Consulta uma chave Pix no DICT (simulado) pelo cache"""
     start_time_req = time.time()
     
-    # Obter dados da requisição ou usar valores padrão
-    data = request.json if request.is_json else {}
-    pix_key = data.get('pix_key', f"+55{random.randint(10000000000, 99999999999)}")
+    # Obter dados da requisição ou sortear uma chave do DICT simulado
+    pix_key = data.get('pix_key') or dict_stub.sample_key()
     operation = data.get('operation', 'query')
     
-    # Simular latência na consulta ao DICT
-    dict_latency = random.uniform(0.1, 0.5)
-    time.sleep(dict_latency)
+    # Consulta pelo cache; em falta, chamada ao DICT (latência real do stub)
+    record, outcome = yield lambda: dict_lookup(pix_key)
     
-    # Registrar métrica de latência de consulta DICT
-    dict_query_latency.labels(operation_type=operation).observe(dict_latency)
-    
-    # Simular ocasionalmente uma falha
-    dict_error = random.random() < 0.05  # 5% de chance de erro
-    
-    if dict_error:
+    if outcome == DICT_ERROR:
         error_response = {
             "status": "error",
             "error_code": "DICT_TIMEOUT",
@@ -1062,39 +1107,30 @@ def simulate_dict_query():
             "timestamp": datetime.datetime.now().isoformat()
         }
         status_code = 500
-        dict_integration_status.labels(operation_type=operation).set(0)  # Marcar como falha
-    else:
-        # Simular resposta de sucesso com dados fictícios
-        status_code = 200
-        dict_integration_status.labels(operation_type=operation).set(1)  # Marcar como sucesso
-        
-        # 10% de chance de ser uma chave suspeita
-        is_suspicious = random.random() < 0.1
-        
+    elif record is None:
         error_response = {
-            "status": "success",
+            "status": "not_found",
+            "error_code": "DICT_KEY_NOT_FOUND",
+            "error_message": "Chave Pix não registrada no DICT",
             "pix_key": pix_key,
-            "key_type": random.choice(["CPF", "CNPJ", "EMAIL", "PHONE"]),
-            "owner_name": "Nome Fictício",
-            "bank_code": str(random.randint(1, 999)).zfill(3),
-            "account_type": random.choice(["CHECKING", "SAVINGS"]),
-            "suspicious_flag": is_suspicious,
-            "block_status": "BLOCKED" if is_suspicious and random.random() < 0.7 else "ACTIVE",
-            "last_updated": datetime.datetime.now().isoformat(),
-            "cache_hit": random.random() < 0.85  # 85% de chance de acerto no cache
+            "cache_hit": outcome != DICT_MISS,
+            "cache_status": outcome,
+            "timestamp": datetime.datetime.now().isoformat()
         }
-        
-        # Atualizar taxa de acerto do cache
-        if error_response["cache_hit"]:
-            # Sempre usa set() diretamente com um valor fixo ou calculado
-            dict_cache_hit_ratio.set(0.85)  # Valor fixo para simplificar
-        else:
-            dict_cache_hit_ratio.set(0.75)  # Valor fixo para simplificar
+        status_code = 404
+    else:
+        status_code = 200
+        error_response = dict(
+            record,
+            status="success",
+            cache_hit=outcome != DICT_MISS,
+            cache_status=outcome
+        )
     
     # Registrar auditoria da requisição
     request_audit_counter.labels(
         endpoint="/simulate/dict", 
-        user_id=request.headers.get('X-User-ID', 'system'),
+        user_id=user_id,
         request_type=f"dict_{operation}"
     ).inc()
     
@@ -1102,17 +1138,16 @@ def simulate_dict_query():
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/simulate/dict",
-        method=request.method,
+        method=method,
         status=status_code
     ).observe(duration)
     
-    return jsonify(error_response), status_code
+    return error_response, status_code
 
-@app.route('/debug/metrics', methods=['GET'])
-def debug_metrics():
-    """Endpoint para depuração de métricas (apenas para desenvolvimento)"""
+def debug_metrics_data():
+    """Informações de depuração de métricas (apenas para desenvolvimento)"""
     # Criar uma resposta simplificada com algumas informações para debugging
-    return jsonify({
+    return {
         "info": "Endpoint para debugging de métricas disponível",
         "uptime_seconds": time.time() - start_time,
         "timestamp": datetime.datetime.now().isoformat(),
@@ -1124,23 +1159,28 @@ def debug_metrics():
             "dict_integration_status",
             "service_health",
             # Listar algumas métricas-chave
-        ]
-    })
+        ],
+        # Séries por métrica e valores mais frequentes dos rótulos limitados
+        "cardinality": {
+            name: stats
+            for name, stats in ((name, limiter.stats()) for name, limiter in LIMITERS.items())
+            if stats["labels"] or stats["series"] >= stats["max_series"]
+        },
+        # Consultas ao cache do DICT por resultado, entradas e consultas em andamento
+        "dict_cache": dict(dict_cache.stats(), hit_ratio=dict_cache.hit_ratio())
+    }
 
-# Adicionar novos endpoints para métricas específicas de MLSecOps
-@app.route('/simulate/adversarial', methods=['POST'])
-def simulate_adversarial_attempt():
-    """Endpoint para simular tentativas de ataques adversariais"""
+def adversarial_attempt_flow(data, method):
+    """Simula tentativas de ataques adversariais"""
     start_time_req = time.time()
     
     # Obter dados da requisição ou usar valores padrão
-    data = request.json if request.is_json else {}
     attack_type = data.get('attack_type', random.choice(attack_types))
     severity = data.get('severity', random.choice(severity_levels))
     
     # Simular latência de processamento
     processing_time = random.uniform(0.05, 0.2)
-    time.sleep(processing_time)
+    yield processing_time
     
     # Registrar a tentativa adversarial
     adversarial_attempt_counter.labels(
@@ -1162,25 +1202,23 @@ def simulate_adversarial_attempt():
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/simulate/adversarial",
-        method=request.method,
+        method=method,
         status=200
     ).observe(duration)
     
-    return jsonify(response_data)
+    return response_data, 200
 
-@app.route('/simulate/compliance_check', methods=['POST'])
-def simulate_compliance_check():
-    """Endpoint para simular verificações de compliance"""
+def compliance_check_flow(data, method):
+    """Simula verificações de compliance"""
     start_time_req = time.time()
     
     # Obter dados da requisição ou usar valores padrão
-    data = request.json if request.is_json else {}
     article_number = data.get('article_number', random.choice(article_numbers))
     requirement_type = data.get('requirement_type', random.choice(requirement_types))
     
     # Simular latência de processamento
     processing_time = random.uniform(0.5, 2.0)
-    time.sleep(processing_time)
+    yield processing_time
     
     # Simular resultado da verificação
     is_compliant = random.random() < 0.9  # 90% de chance de estar conforme
@@ -1206,30 +1244,113 @@ def simulate_compliance_check():
         "timestamp": datetime.datetime.now().isoformat()
     }
     
+    # Guardar o resultado no histórico de compliance (gravação em segundo plano)
+    compliance_history.record(
+        article_number, requirement_type, compliance_score, source="ml-metrics-exporter",
+        is_compliant=is_compliant, details={"issues": response_data["issues"]}
+    )
+    
     # Registrar duração total da requisição HTTP
     duration = time.time() - start_time_req
     http_request_duration.labels(
         endpoint="/simulate/compliance_check",
-        method=request.method,
+        method=method,
         status=200
     ).observe(duration)
     
-    return jsonify(response_data)
+    return response_data, 200
+
+def compliance_history_response(params):
+    """Consulta ao histórico de compliance (ver compliance_history.query_from_params)"""
+    return query_from_params(compliance_history, params)
+
+#################################################################
+# ROTAS DA API
+#################################################################
+
+def _request_data():
+    # Corpo JSON da requisição ou dicionário vazio
+    return request.json if request.is_json else {}
+
+@app.route('/')
+def home():
+    """Página inicial da aplicação"""
+    body, _ = run_blocking(home_flow(request.headers.get('X-User-ID', 'anonymous'), request.method))
+    return body
+
+@app.route('/metrics')
+def metrics():
+    """Endpoint para exposição de métricas para o Prometheus"""
+    body, content_encoding = exposition_cache.response_body(request.headers.get('Accept-Encoding', ''))
+    response = Response(body, content_type=CONTENT_TYPE_LATEST)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    return response
+
+@app.route('/health')
+def health():
+    """Endpoint de verificação de saúde do serviço"""
+    body, status_code = health_response(request.headers.get('X-User-ID', 'system'), request.method)
+    return jsonify(body), status_code
+
+@app.route('/simulate/prediction', methods=['POST'])
+def simulate_prediction():
+    """Endpoint para simular uma predição de fraude"""
+    body, status_code = run_blocking(prediction_flow(_request_data(), request.method))
+    return jsonify(body), status_code
+
+@app.route('/simulate/dict', methods=['POST'])
+def simulate_dict_query():
+    """Endpoint para simular consulta ao DICT"""
+    body, status_code = run_blocking(dict_query_flow(
+        _request_data(), request.headers.get('X-User-ID', 'system'), request.method
+    ))
+    return jsonify(body), status_code
+
+@app.route('/debug/metrics', methods=['GET'])
+def debug_metrics():
+    """Endpoint para depuração de métricas (apenas para desenvolvimento)"""
+    return jsonify(debug_metrics_data())
+
+# Adicionar novos endpoints para métricas específicas de MLSecOps
+@app.route('/simulate/adversarial', methods=['POST'])
+def simulate_adversarial_attempt():
+    """Endpoint para simular tentativas de ataques adversariais"""
+    body, status_code = run_blocking(adversarial_attempt_flow(_request_data(), request.method))
+    return jsonify(body), status_code
+
+@app.route('/simulate/compliance_check', methods=['POST'])
+def simulate_compliance_check():
+    """Endpoint para simular verificações de compliance"""
+    body, status_code = run_blocking(compliance_check_flow(_request_data(), request.method))
+    return jsonify(body), status_code
+
+@app.route('/compliance/history', methods=['GET'])
+def compliance_history_query():
+    """Histórico de scores de compliance por artigo e requisito"""
+    body, status_code = compliance_history_response(request.args)
+    return jsonify(body), status_code
 
 #################################################################
 # INICIALIZAÇÃO DA APLICAÇÃO
 #################################################################
 
+def start_background_updates():
+    """Inicializa as métricas e inicia o agendador das tarefas de atualização simulada"""
+    initialize_metrics()
+
+    scheduler = MetricScheduler()
+    for name, func, interval, jitter in METRIC_UPDATE_TASKS:
+        interval = float(os.environ.get(f'METRIC_UPDATE_INTERVAL_{name.upper()}', interval))
+        scheduler.add_task(name, func, interval, jitter)
+    return scheduler.start()
+
 if __name__ == '__main__':
-   # Inicializar valores de métricas
-   initialize_metrics()
-   
-   # Iniciar thread de atualização de métricas em segundo plano
-   logger.info("Iniciando thread de atualização de métricas...")
-   update_thread = threading.Thread(target=update_metrics, daemon=True)
-   update_thread.start()
+   # Inicializar valores de métricas e as tarefas de atualização em segundo plano
+   start_background_updates()
    
-   # Iniciar servidor web
+   # Iniciar servidor web (desenvolvimento; em produção usar serve.py)
    port = int(os.environ.get('PORT', 8080))
    logger.info(f"Iniciando servidor na porta {port}...")
-   app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+   app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Versão assíncrona (ASGI) das rotas do ml-metrics-exporter.
+#
+# Usa a mesma lógica e as mesmas métricas de app.py; a latência simulada de
+# cada endpoint é um await asyncio.sleep em vez de time.sleep, então um único
+# processo sustenta milhares de transações simuladas concorrentes.
+#
+# Uso: python serve.py --mode async
+import json
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+from starlette.concurrency import run_in_threadpool
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app import (
+    exposition_cache, run_async, start_background_updates,
+    home_flow, health_response, prediction_flow, dict_query_flow,
+    debug_metrics_data, adversarial_attempt_flow, compliance_check_flow,
+    compliance_history_response
+)
+
+
+async def _request_data(request):
+    # Corpo JSON da requisição ou dicionário vazio, como em app.py
+    if not request.headers.get('content-type', '').startswith('application/json'):
+        return {}
+    return await request.json()
+
+
+async def _json_flow(request, flow_factory):
+    try:
+        data = await _request_data(request)
+    except json.JSONDecodeError:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    body, status_code = await run_async(flow_factory(data))
+    return JSONResponse(body, status_code=status_code)
+
+
+async def home(request):
+    """Página inicial da aplicação"""
+    body, status_code = await run_async(home_flow(request.headers.get('X-User-ID', 'anonymous'), request.method))
+    return HTMLResponse(body, status_code=status_code)
+
+
+async def metrics(request):
+    """Endpoint para exposição de métricas para o Prometheus"""
+    body, content_encoding = exposition_cache.response_body(request.headers.get('Accept-Encoding', ''))
+    headers = {'Vary': 'Accept-Encoding'}
+    if content_encoding:
+        headers['Content-Encoding'] = content_encoding
+    return Response(body, headers=headers, media_type=CONTENT_TYPE_LATEST)
+
+
+async def health(request):
+    """Endpoint de verificação de saúde do serviço"""
+    body, status_code = health_response(request.headers.get('X-User-ID', 'system'), request.method)
+    return JSONResponse(body, status_code=status_code)
+
+
+async def simulate_prediction(request):
+    """Endpoint para simular uma predição de fraude"""
+    return await _json_flow(request, lambda data: prediction_flow(data, request.method))
+
+
+async def simulate_dict_query(request):
+    """Endpoint para simular consulta ao DICT"""
+    user_id = request.headers.get('X-User-ID', 'system')
+    return await _json_flow(request, lambda data: dict_query_flow(data, user_id, request.method))
+
+
+async def debug_metrics(request):
+    """Endpoint para depuração de métricas (apenas para desenvolvimento)"""
+    return JSONResponse(debug_metrics_data())
+
+
+async def simulate_adversarial_attempt(request):
+    """Endpoint para simular tentativas de ataques adversariais"""
+    return await _json_flow(request, lambda data: adversarial_attempt_flow(data, request.method))
+
+
+async def simulate_compliance_check(request):
+    """Endpoint para simular verificações de compliance"""
+    return await _json_flow(request, lambda data: compliance_check_flow(data, request.method))
+
+
+async def compliance_history_query(request):
+    """Histórico de scores de compliance por artigo e requisito"""
+    # Consulta ao SQLite fora do event loop
+    body, status_code = await run_in_threadpool(compliance_history_response, request.query_params)
+    return JSONResponse(body, status_code=status_code)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # A simulação periódica roda no agendador em threads, como no modo Flask
+    scheduler = start_background_updates()
+    yield
+    scheduler.stop()
+
+
+routes = [
+    Route('/', home),
+    Route('/metrics', metrics),
+    Route('/health', health),
+    Route('/simulate/prediction', simulate_prediction, methods=['POST']),
+    Route('/simulate/dict', simulate_dict_query, methods=['POST']),
+    Route('/debug/metrics', debug_metrics, methods=['GET']),
+    Route('/simulate/adversarial', simulate_adversarial_attempt, methods=['POST']),
+    Route('/simulate/compliance_check', simulate_compliance_check, methods=['POST']),
+    Route('/compliance/history', compliance_history_query, methods=['GET']),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
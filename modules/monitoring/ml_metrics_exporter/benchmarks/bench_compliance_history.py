@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Benchmark das consultas ao histórico de compliance.
+#
+# Preenche um histórico (compliance_history.ComplianceHistory) com meses de
+# avaliações de vários artigos e requisitos da Resolução BCB n° 403 e mede a
+# latência das consultas usadas em auditoria: registros de um requisito em
+# uma janela de tempo e agregados diários/mensais de um artigo.
+#
+# Uso: python bench_compliance_history.py [--days 180] [--per-hour 60] [--repeat 50]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compliance_history import ComplianceHistory  # noqa: E402
+from simulation_vocabulary import article_numbers, requirement_types  # noqa: E402
+
+DAY = 86400
+
+
+def fill(history, days, per_hour, rng):
+    start = time.time() - days * DAY
+    series = [(article, requirement) for article in article_numbers for requirement in requirement_types]
+    step = 3600 / per_hour
+    rows = 0
+    write_start = time.perf_counter()
+    for index in range(int(days * 24 * per_hour)):
+        ts = start + index * step
+        for article, requirement in series:
+            compliant = rng.random() < 0.9
+            history.record(article, requirement, rng.uniform(0.85, 0.99) if compliant else rng.uniform(0.6, 0.84),
+                           source="bench", ts=ts, is_compliant=compliant)
+            rows += 1
+        if rows % 20000 < len(series):
+            history.flush()
+    history.flush()
+    return rows, time.perf_counter() - write_start
+
+
+def latency_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50": samples[len(samples) // 2], "max": samples[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas ao histórico de compliance")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--per-hour", type=int, default=60, help="avaliações por hora de cada requisito")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        history = ComplianceHistory(os.path.join(directory, "history.db"), max_pending=10 ** 9)
+        rows, write_seconds = fill(history, args.days, args.per_hour, rng)
+        now = time.time()
+        article, requirement = article_numbers[0], requirement_types[0]
+
+        queries = {
+            "registros de 1 requisito, últimas 24h": lambda: history.query(
+                article, requirement, start=now - DAY, limit=10 ** 6),
+            "registros de 1 requisito, 7 dias (limite 1000)": lambda: history.query(
+                article, requirement, start=now - 7 * DAY),
+            "agregado diário de 1 artigo, 30 dias": lambda: history.summary(
+                article, start=now - 30 * DAY, bucket="1d"),
+            "agregado mensal de 1 requisito, período todo": lambda: history.summary(
+                article, requirement, bucket="30d"),
+        }
+        results = {
+            "rows": rows,
+            "insert_rows_per_second": rows / write_seconds,
+            "database_mb": os.path.getsize(history.path) / 1e6,
+            "queries_ms": {name: latency_ms(query, args.repeat) for name, query in queries.items()},
+        }
+        history.close()
+
+    print(f"{rows} registros ({results['insert_rows_per_second']:.0f}/s na gravação, "
+          f"{results['database_mb']:.1f} MB)")
+    print(f"{'consulta':<50}{'p50 (ms)':>10}{'máx (ms)':>10}")
+    for name, latency in results["queries_ms"].items():
+        print(f"{name:<50}{latency['p50']:>10.2f}{latency['max']:>10.2f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
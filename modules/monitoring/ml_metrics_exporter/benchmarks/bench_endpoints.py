@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# Benchmark de carga e latência dos endpoints HTTP do ml-metrics-exporter.
+#
+# Sobe o exporter no próprio processo (Flask/werkzeug com threads ou a versão
+# assíncrona no uvicorn), com o agendador de métricas simuladas ativo, e
+# dispara cada rota com concorrência crescente a partir de um cliente asyncio
+# com conexões keep-alive. Para cada rota e nível de concorrência reporta
+# vazão e latências p50/p95/p99/p999; ao longo da execução acompanha o RSS do
+# processo e o tamanho do payload de /metrics. O resultado é salvo em JSON e
+# pode ser comparado com uma execução anterior (--compare).
+#
+# Cliente e servidor dividem o mesmo processo (e o GIL): os números servem
+# para comparar execuções na mesma máquina, não como capacidade absoluta.
+#
+# Uso: python bench_endpoints.py [--server flask|async] [--concurrency 1,8,32,128]
+#      [--duration 5] [--no-simulated-latency] [--output resultado.json] [--compare base.json]
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import datetime
+import platform
+import threading
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np  # noqa: E402
+
+ROUTES = [
+    ("GET", "/", None),
+    ("GET", "/metrics", None),
+    ("GET", "/health", None),
+    ("GET", "/debug/metrics", None),
+    ("POST", "/simulate/prediction", "traffic"),
+    ("POST", "/simulate/dict", {}),
+    ("POST", "/simulate/adversarial", {}),
+    ("POST", "/simulate/compliance_check", {}),
+]
+
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p999": 99.9}
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def drain_without_sleep(flow):
+    # Executa o fluxo do endpoint ignorando as latências simuladas (funções
+    # produzidas pelo fluxo, como a consulta ao DICT, ainda são executadas)
+    try:
+        step = next(flow)
+        while True:
+            step = flow.send(step()) if callable(step) else next(flow)
+    except StopIteration as done:
+        return done.value
+
+
+async def drain_without_sleep_async(flow):
+    return drain_without_sleep(flow)
+
+
+def start_server(kind, port, simulated_latency):
+    """Sobe o exporter em uma thread do próprio processo."""
+    import app as exporter
+    if not simulated_latency:
+        exporter.run_blocking = drain_without_sleep
+        exporter.dict_stub.latency = (0.0, 0.0)
+    scheduler = exporter.start_background_updates()
+
+    if kind == "flask":
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", port, exporter.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return scheduler, server.shutdown
+
+    import uvicorn
+    import async_app
+    if not simulated_latency:
+        async_app.run_async = drain_without_sleep_async
+    # O agendador já foi iniciado acima; o lifespan do app não é usado
+    config = uvicorn.Config(async_app.app, host="127.0.0.1", port=port, log_level="warning",
+                            access_log=False, lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=5)
+    return scheduler, stop
+
+
+class Connection:
+    """Conexão HTTP/1.1 mínima; reconecta quando o servidor fecha a conexão."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b"", headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        head = [f"{method} {path} HTTP/1.1", "Host: 127.0.0.1", "Connection: keep-alive",
+                f"Content-Length: {len(body)}"]
+        if body:
+            head.append("Content-Type: application/json")
+        for name, value in (headers or {}).items():
+            head.append(f"{name}: {value}")
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("conexão encerrada pelo servidor")
+        status = int(status_line.split()[1])
+        length = None
+        keep_alive = status_line.startswith(b"HTTP/1.1")
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        payload = await self.reader.readexactly(length) if length is not None else await self.reader.read()
+        if not keep_alive or length is None:
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def request_bodies(spec, count, seed):
+    if spec == "traffic":
+        from traffic_generator import TrafficGenerator, TrafficProfile
+        generator = TrafficGenerator(TrafficProfile(events_per_minute=count * 60), seed=seed, start=1747170000)
+        lines = []
+        while len(lines) < count:
+            lines.extend(generator.next_batch(1.0).json_lines())
+        return [line.strip().encode() for line in lines[:count]]
+    if spec is None:
+        return [b""]
+    return [json.dumps(spec).encode()]
+
+
+async def run_step(port, method, path, bodies, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        nonlocal errors
+        connection = Connection(port)
+        position = index
+        while time.perf_counter() < deadline:
+            body = bodies[position % len(bodies)]
+            position += concurrency
+            start = time.perf_counter()
+            try:
+                status, _ = await connection.request(method, path, body)
+                if status >= 500 and path != "/simulate/dict":
+                    # /simulate/dict devolve 500 em 5% das chamadas por simulação
+                    errors += 1
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                errors += 1
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - start)
+        connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "route": f"{method} {path}",
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "latency_ms": {
+            **{name: float(np.percentile(values, q)) for name, q in PERCENTILES.items()},
+            "max": float(values.max()),
+        },
+    }
+
+
+async def sample_metrics(port, started):
+    connection = Connection(port)
+    _, identity = await connection.request("GET", "/metrics")
+    _, compressed = await connection.request("GET", "/metrics", headers={"Accept-Encoding": "gzip"})
+    connection.close()
+    return {
+        "elapsed_s": time.perf_counter() - started,
+        "rss_mb": rss_mb(),
+        "metrics_bytes": len(identity),
+        "metrics_gzip_bytes": len(compressed),
+    }
+
+
+async def run_suite(args):
+    started = time.perf_counter()
+    timeline = [await sample_metrics(args.port, started)]
+    steps = []
+    concurrencies = [int(value) for value in args.concurrency.split(",")]
+    routes = [route for route in ROUTES if not args.routes or route[1] in args.routes.split(",")]
+    for method, path, spec in routes:
+        bodies = request_bodies(spec, 5000, args.seed)
+        for concurrency in concurrencies:
+            step = await run_step(args.port, method, path, bodies, concurrency, args.duration)
+            steps.append(step)
+            timeline.append(await sample_metrics(args.port, started))
+            print(f"{step['route']:<34}{concurrency:>6}{step['throughput_rps']:>12.1f}"
+                  f"{step['latency_ms']['p50']:>10.2f}{step['latency_ms']['p99']:>10.2f}"
+                  f"{step['latency_ms']['p999']:>10.2f}{step['errors']:>8}", flush=True)
+    return steps, timeline
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = {(step["route"], step["concurrency"]): step for step in json.load(baseline_file)["steps"]}
+    print(f"\n{'rota':<34}{'conc.':>6}{'vazão Δ%':>12}{'p99 Δ%':>10}")
+    for step in results["steps"]:
+        previous = baseline.get((step["route"], step["concurrency"]))
+        if previous is None:
+            continue
+        throughput = (step["throughput_rps"] / previous["throughput_rps"] - 1) * 100 if previous["throughput_rps"] else 0.0
+        p99 = (step["latency_ms"]["p99"] / previous["latency_ms"]["p99"] - 1) * 100 if previous["latency_ms"]["p99"] else 0.0
+        print(f"{step['route']:<34}{step['concurrency']:>6}{throughput:>+12.1f}{p99:>+10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints HTTP do ml-metrics-exporter")
+    parser.add_argument("--server", choices=("flask", "async"), default="flask")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--duration", type=float, default=5.0, help="segundos por rota e nível de concorrência")
+    parser.add_argument("--routes", help="lista de caminhos separados por vírgula (padrão: todos)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-simulated-latency", action="store_true",
+                        help="ignorar as latências simuladas das rotas e medir só o overhead")
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    parser.add_argument("--compare", help="resultado anterior para comparação")
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    rss_before = rss_mb()
+    scheduler, stop_server = start_server(args.server, args.port, not args.no_simulated_latency)
+    rss_started = rss_mb()
+
+    print(f"{'rota':<34}{'conc.':>6}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'p999 ms':>10}{'erros':>8}")
+    try:
+        steps, timeline = asyncio.run(run_suite(args))
+    finally:
+        stop_server()
+        scheduler.stop()
+
+    results = {
+        "meta": {
+            "server": args.server,
+            "simulated_latency": not args.no_simulated_latency,
+            "concurrency": args.concurrency,
+            "duration_per_step_s": args.duration,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(),
+        },
+        "rss_mb": {
+            "before_start": rss_before,
+            "after_start": rss_started,
+            "end": timeline[-1]["rss_mb"],
+            "growth": timeline[-1]["rss_mb"] - timeline[0]["rss_mb"],
+        },
+        "steps": steps,
+        "timeline": timeline,
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"endpoints-{args.server}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nRSS: {results['rss_mb']['growth']:+.1f} MB durante a execução; "
+          f"/metrics: {timeline[0]['metrics_bytes']} -> {timeline[-1]['metrics_bytes']} bytes")
+    print(f"Resultado salvo em {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Benchmark de resolução de children de métricas rotuladas.
+#
+# Compara metric.labels(**kwargs) direto com o LabelChildCache (argumentos
+# nomeados e posicionais), em uma thread e com várias threads simulando o
+# volume de requisições do exporter (10k+ requisições/s).
+#
+# Uso: python bench_label_cache.py [--operations 200000] [--threads 8]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from prometheus_client import CollectorRegistry, Counter  # noqa: E402
+from label_cache import LabelChildCache  # noqa: E402
+
+CHANNELS = ["PIX", "TED", "BOLETO", "APP_MOBILE", "INTERNET_BANKING"]
+RESULTS = ["fraud", "legitimate"]
+
+
+def build_metric():
+    return Counter(
+        'bench_predictions_total',
+        'Contador usado no benchmark',
+        ['result', 'channel'],
+        registry=CollectorRegistry()
+    )
+
+
+def workload(operations, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(RESULTS), rng.choice(CHANNELS)) for _ in range(operations)]
+
+
+def run_raw(metric, items):
+    for result, channel in items:
+        metric.labels(result=result, channel=channel).inc()
+
+
+def run_cached_kwargs(cache, items):
+    for result, channel in items:
+        cache.labels(result=result, channel=channel).inc()
+
+
+def run_cached_positional(cache, items):
+    for result, channel in items:
+        cache.labels(result, channel).inc()
+
+
+def throughput(runner, target, items, threads):
+    chunks = [items[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=runner, args=(target, chunk)) for chunk in chunks]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return len(items) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de children de métricas")
+    parser.add_argument("--operations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    items = workload(args.operations, seed=42)
+    results = {}
+    for threads in sorted({1, args.threads}):
+        metric = build_metric()
+        cache = LabelChildCache(build_metric())
+        results[f"threads_{threads}"] = {
+            "raw_labels_ops_s": throughput(run_raw, metric, items, threads),
+            "cached_kwargs_ops_s": throughput(run_cached_kwargs, cache, items, threads),
+            "cached_positional_ops_s": throughput(run_cached_positional, cache, items, threads),
+        }
+
+    print(f"{'cenário':<12}{'labels() (ops/s)':>20}{'cache nomeado':>18}{'cache posicional':>20}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['raw_labels_ops_s']:>20,.0f}"
+              f"{result['cached_kwargs_ops_s']:>18,.0f}{result['cached_positional_ops_s']:>20,.0f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Benchmark do custo de um tick de simulação dos gauges.
+#
+# Compara o passo vetorizado do estado-sombra (shadow_state.RandomWalkGroup)
+# com a abordagem anterior, que lia o valor de cada série pelo atributo
+# privado _value, somava o ruído em Python e escrevia de volta, à medida que o
+# número de séries simuladas cresce de centenas a dezenas de milhares. O
+# custo do estado-sombra é separado em passo NumPy e publicação nos children.
+#
+# Uso: python bench_shadow_state.py [--series 100,1000,10000,50000] [--ticks 20]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np  # noqa: E402
+from prometheus_client import CollectorRegistry, Gauge  # noqa: E402
+from shadow_state import RandomWalkGroup  # noqa: E402
+
+
+def build_children(count):
+    gauge = Gauge(
+        'bench_simulated_gauge',
+        'Gauge usado no benchmark',
+        ['series'],
+        registry=CollectorRegistry()
+    )
+    return [gauge.labels(str(index)) for index in range(count)]
+
+
+def legacy_tick(children):
+    # Leitura do valor atual pelo estado interno do child, como no loop antigo
+    for child in children:
+        try:
+            current = float(child._value.get())
+        except Exception:
+            current = 0.9
+        child.set(max(0.7, min(0.99, current + random.uniform(-0.01, 0.01))))
+
+
+def per_tick_ms(func, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        func()
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do estado-sombra dos gauges simulados")
+    parser.add_argument("--series", default="100,1000,10000,50000")
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'séries':>8}{'passo NumPy (ms)':>18}{'publicação (ms)':>18}{'tick total (ms)':>18}{'anterior (ms)':>16}")
+    for count in [int(value) for value in args.series.split(",")]:
+        group = RandomWalkGroup("bench", np.random.default_rng(42))
+        children = build_children(count)
+        for child in children:
+            group.add(child, 0.9, (-0.01, 0.01), (0.7, 0.99))
+        group.step()
+
+        # Passo isolado, sem publicação, para separar os custos
+        def numpy_step():
+            group._values += group._rng.uniform(group._step_low, group._step_high)
+            np.clip(group._values, group._lower, group._upper, out=group._values)
+
+        numpy_ms = per_tick_ms(numpy_step, args.ticks)
+        total_ms = per_tick_ms(group.step, args.ticks)
+        legacy_ms = per_tick_ms(lambda: legacy_tick(children), args.ticks)
+        results.append({
+            "series": count,
+            "numpy_step_ms": numpy_ms,
+            "publish_ms": total_ms - numpy_ms,
+            "tick_ms": total_ms,
+            "legacy_tick_ms": legacy_ms,
+        })
+        print(f"{count:>8}{numpy_ms:>18.3f}{total_ms - numpy_ms:>18.3f}{total_ms:>18.3f}{legacy_ms:>16.3f}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
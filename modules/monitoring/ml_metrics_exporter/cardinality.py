@@ -0,0 +1,232 @@
+import os
+import heapq
+import hashlib
+import threading
+
+from prometheus_client import Counter
+
+from label_cache import LabelChildCache, DEFAULT_MAX_CHILDREN
+
+# Valor usado no lugar de rótulos acima do limite de cardinalidade
+OVERFLOW_VALUE = "__other__"
+
+# Limites padrão, aplicados a toda métrica rotulada do exporter
+DEFAULT_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES_PER_METRIC", "1000"))
+DEFAULT_MAX_LABEL_VALUES = int(os.getenv("METRICS_MAX_LABEL_VALUES", "100"))
+
+label_values_dropped = Counter(
+    'metric_label_values_dropped_total',
+    'Ocorrências de valores de rótulo substituídos por __other__ pelo limite de cardinalidade '
+    '(cada uso da métrica com o valor conta; label="__series__" para combinações acima do teto de séries)',
+    ['metric', 'label']
+)
+
+
+class LabelPolicy:
+    """
+    Política de cardinalidade de um rótulo.
+
+    mode="overflow": os primeiros max_values valores distintos ganham série
+    própria; os seguintes viram __other__.
+    mode="hash": cada valor é mapeado de forma determinística para um de
+    hash_buckets baldes (hash_00, hash_01, ...).
+    mode="top_k": as frequências são acompanhadas (algoritmo Space-Saving,
+    track contadores) e as max_values séries ficam com os valores mais
+    frequentes que apareceram ao menos min_count vezes. Um valor que passa a
+    ser mais frequente que o menos frequente dos admitidos toma a sua vaga: a
+    série do valor despejado deixa de crescer e as suas próximas ocorrências
+    vão para __other__. Como toda ocorrência precisa ser contada, os
+    mapeamentos de um rótulo top_k nunca são cacheados (cada chamada consulta
+    o limitador, em O(log track)).
+    """
+
+    MODES = ("overflow", "hash", "top_k")
+
+    def __init__(self, max_values=DEFAULT_MAX_LABEL_VALUES, mode="overflow",
+                 hash_buckets=64, min_count=3, track=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Modo de cardinalidade desconhecido '{mode}'")
+        self.max_values = max_values
+        self.mode = mode
+        self.hash_buckets = hash_buckets
+        self.min_count = min_count
+        self.track = track or max_values * 4
+
+
+class _SpaceSaving:
+    """
+    Contagens aproximadas dos valores mais frequentes (Space-Saving) em até
+    capacity contadores. Um valor novo com os contadores cheios herda a
+    contagem do menos frequente, encontrado por um heap com entradas
+    desatualizadas descartadas na leitura.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self._heap = []
+
+    def observe(self, value):
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = 1
+        else:
+            victim = self._least_frequent()
+            counts[value] = counts.pop(victim) + 1
+        heapq.heappush(self._heap, (counts[value], value))
+        # Cada ocorrência deixa uma entrada no heap; reconstruí-lo só com as
+        # contagens atuais mantém o tamanho proporcional a capacity
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, count in counts.items()]
+            heapq.heapify(self._heap)
+        return counts[value]
+
+    def _least_frequent(self):
+        heap, counts = self._heap, self.counts
+        while True:
+            count, value = heap[0]
+            if counts.get(value) == count:
+                return value
+            heapq.heappop(heap)
+
+    def most_common(self, limit):
+        return heapq.nlargest(limit, self.counts.items(), key=lambda item: item[1])
+
+
+class _LabelState:
+    def __init__(self, policy):
+        self.policy = policy
+        self.admitted = set()
+        # Frequências aproximadas para o modo top_k
+        self.frequencies = _SpaceSaving(policy.track) if policy.mode == "top_k" else None
+        # Limite inferior da contagem do admitido menos frequente (as
+        # contagens só crescem); recalculado quando um candidato o supera
+        self._floor = 0
+
+    def map_value(self, value):
+        """Retorna (valor final, foi_substituido, pode_ser_cacheado)."""
+        policy = self.policy
+        if policy.mode == "hash":
+            digest = hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest()
+            return f"hash_{int.from_bytes(digest, 'big') % policy.hash_buckets:02d}", False, True
+
+        if policy.mode == "overflow":
+            if value in self.admitted:
+                return value, False, True
+            if len(self.admitted) < policy.max_values:
+                self.admitted.add(value)
+                return value, False, True
+            return OVERFLOW_VALUE, True, False
+
+        count = self.frequencies.observe(value)
+        if value in self.admitted:
+            return value, False, False
+        if count >= policy.min_count and self._admit(value, count):
+            return value, False, False
+        return OVERFLOW_VALUE, True, False
+
+    def _admit(self, value, count):
+        if len(self.admitted) < self.policy.max_values:
+            self.admitted.add(value)
+            return True
+        if count <= self._floor:
+            return False
+        counts = self.frequencies.counts
+        weakest = min(self.admitted, key=lambda item: counts.get(item, 0))
+        self._floor = counts.get(weakest, 0)
+        if count <= self._floor:
+            return False
+        # O novo mínimo não é menor que a contagem do despejado
+        self.admitted.discard(weakest)
+        self.admitted.add(value)
+        return True
+
+    def heavy_hitters(self, limit=10):
+        if self.frequencies is None:
+            return []
+        return self.frequencies.most_common(limit)
+
+
+class CardinalityLimiter:
+    """
+    Limita as séries de uma métrica: aplica a política de cada rótulo e um
+    teto de séries distintas por métrica. Combinações acima do teto são
+    agregadas na série com todos os rótulos em __other__.
+
+    Mapeamentos para __other__ nunca são cacheados: cada ocorrência passa
+    por admit() e é contada em metric_label_values_dropped_total.
+    """
+
+    def __init__(self, metric_name, labelnames, max_series=DEFAULT_MAX_SERIES, label_policies=None):
+        self.metric_name = metric_name
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self.series = set()
+        self._labels = {
+            index: _LabelState(label_policies[name])
+            for index, name in enumerate(self.labelnames)
+            if label_policies and name in label_policies
+        }
+        self._overflow_series = tuple(OVERFLOW_VALUE for _ in self.labelnames)
+        self._lock = threading.Lock()
+
+    def admit(self, labelvalues):
+        """Retorna (valores a usar, pode_ser_cacheado) para uma combinação de rótulos."""
+        labelvalues = tuple(str(value) for value in labelvalues)
+        cacheable = True
+        with self._lock:
+            if self._labels:
+                mapped = list(labelvalues)
+                for index, state in self._labels.items():
+                    value, dropped, value_cacheable = state.map_value(mapped[index])
+                    mapped[index] = value
+                    cacheable = cacheable and value_cacheable
+                    if dropped:
+                        label_values_dropped.labels(self.metric_name, self.labelnames[index]).inc()
+                labelvalues = tuple(mapped)
+
+            if labelvalues not in self.series:
+                if len(self.series) < self.max_series:
+                    self.series.add(labelvalues)
+                else:
+                    label_values_dropped.labels(self.metric_name, "__series__").inc()
+                    labelvalues = self._overflow_series
+                    cacheable = False
+        return labelvalues, cacheable
+
+    def stats(self):
+        # Retrato consistente: admit() altera as mesmas estruturas em outras threads
+        with self._lock:
+            return {
+                "series": len(self.series),
+                "max_series": self.max_series,
+                "labels": {
+                    self.labelnames[index]: {
+                        "mode": state.policy.mode,
+                        "admitted": len(state.admitted),
+                        "heavy_hitters": state.heavy_hitters(),
+                    }
+                    for index, state in self._labels.items()
+                },
+            }
+
+
+# Limitadores criados pelo exporter, por nome de métrica
+LIMITERS = {}
+
+
+def limited_labels(metric_class, name, documentation, labelnames, max_series=DEFAULT_MAX_SERIES,
+                   label_policies=None, maxsize=DEFAULT_MAX_CHILDREN, **metric_options):
+    """
+    Cria uma métrica rotulada (Counter, Gauge, Histogram ou Summary, com os
+    demais argumentos repassados) envolvida pelo cache de children e pelo
+    limite de cardinalidade. label_policies mapeia nomes de rótulo para
+    LabelPolicy.
+    """
+    metric = metric_class(name, documentation, labelnames, **metric_options)
+    metric_name = metric.describe()[0].name
+    limiter = CardinalityLimiter(metric_name, labelnames, max_series, label_policies)
+    LIMITERS[metric_name] = limiter
+    return LabelChildCache(metric, maxsize=maxsize, limiter=limiter)
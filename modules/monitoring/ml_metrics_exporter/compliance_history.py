@@ -0,0 +1,342 @@
+import json
+import math
+import time
+import sqlite3
+import logging
+import datetime
+import threading
+
+logger = logging.getLogger('compliance-history')
+
+# Intervalo de gravação dos registros pendentes e limite de registros
+# aguardando gravação (acima dele, novos registros são descartados)
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 50000
+
+# Limite padrão de linhas devolvidas por query()
+DEFAULT_QUERY_LIMIT = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compliance_history (
+    ts REAL NOT NULL,
+    article_number TEXT NOT NULL,
+    requirement_type TEXT NOT NULL,
+    score REAL NOT NULL,
+    is_compliant INTEGER,
+    source TEXT NOT NULL,
+    details TEXT
+);
+-- Índice de cobertura: consultas por artigo/requisito e intervalo de tempo
+-- (incluindo os agregados de summary) são resolvidas só pelo índice
+CREATE INDEX IF NOT EXISTS compliance_history_lookup
+    ON compliance_history (article_number, requirement_type, ts, score, is_compliant);
+-- Leituras das horas parciais nas bordas de summary (no máximo uma hora de
+-- registros, de qualquer artigo/requisito)
+CREATE INDEX IF NOT EXISTS compliance_history_time
+    ON compliance_history (ts, article_number, requirement_type, score, is_compliant);
+-- Agregados por hora, mantidos na mesma transação das inserções: resumos de
+-- meses leem poucas linhas em vez de todas as avaliações do período
+CREATE TABLE IF NOT EXISTS compliance_history_hourly (
+    article_number TEXT NOT NULL,
+    requirement_type TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    evaluations INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    score_min REAL NOT NULL,
+    score_max REAL NOT NULL,
+    compliant_sum INTEGER NOT NULL,
+    compliant_count INTEGER NOT NULL,
+    PRIMARY KEY (article_number, requirement_type, hour)
+) WITHOUT ROWID;
+"""
+
+_INSERT = """
+INSERT INTO compliance_history
+    (ts, article_number, requirement_type, score, is_compliant, source, details)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPSERT_HOURLY = """
+INSERT INTO compliance_history_hourly VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (article_number, requirement_type, hour) DO UPDATE SET
+    evaluations = evaluations + excluded.evaluations,
+    score_sum = score_sum + excluded.score_sum,
+    score_min = MIN(score_min, excluded.score_min),
+    score_max = MAX(score_max, excluded.score_max),
+    compliant_sum = compliant_sum + excluded.compliant_sum,
+    compliant_count = compliant_count + excluded.compliant_count
+"""
+
+_HOUR = 3600
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": _HOUR, "d": 86400}
+
+
+def to_timestamp(value):
+    """Aceita segundos Unix (número ou texto) ou data/hora ISO 8601."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def to_seconds(value):
+    """Aceita segundos ou durações como "1h", "1d", "30d"."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    unit = value[-1:]
+    if unit in _DURATION_UNITS:
+        return float(value[:-1]) * _DURATION_UNITS[unit]
+    return float(value)
+
+
+class ComplianceHistory:
+    """
+    Histórico de scores de compliance por artigo e requisito da Resolução
+    BCB n° 403, em SQLite (modo WAL).
+
+    A tabela só recebe inserções. record() apenas acumula o registro em
+    memória; uma thread grava os pendentes em lote a cada flush_interval, então
+    o caminho da requisição não espera o disco. Consultas gravam os pendentes
+    antes de ler. Vários processos podem gravar no mesmo arquivo.
+    """
+
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self):
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def record(self, article_number, requirement_type, score, source,
+               ts=None, is_compliant=None, details=None):
+        """Acrescenta um registro ao histórico (gravado em segundo plano)."""
+        row = (
+            time.time() if ts is None else to_timestamp(ts),
+            str(article_number),
+            str(requirement_type),
+            float(score),
+            None if is_compliant is None else int(bool(is_compliant)),
+            source,
+            None if details is None else json.dumps(details, default=str),
+        )
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(row)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="compliance-history", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Grava os registros pendentes em uma única transação."""
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            with self._connection() as connection:
+                connection.executemany(_INSERT, rows)
+                connection.executemany(_UPSERT_HOURLY, _hourly_rollup(rows))
+            return len(rows)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar histórico de compliance: {str(e)}")
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def _where(self, article_number, requirement_type, start, end):
+        clauses, params = [], []
+        for column, value in (("article_number", article_number), ("requirement_type", requirement_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(to_timestamp(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(to_timestamp(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, article_number=None, requirement_type=None, start=None, end=None,
+              limit=DEFAULT_QUERY_LIMIT):
+        """Registros do intervalo [start, end), em ordem cronológica."""
+        self.flush()
+        where, params = self._where(article_number, requirement_type, start, end)
+        rows = self._connection().execute(
+            "SELECT ts, article_number, requirement_type, score, is_compliant, source, details"
+            f" FROM compliance_history{where} ORDER BY ts LIMIT ?",
+            params + [int(limit)]
+        ).fetchall()
+        return [{
+            "timestamp": datetime.datetime.fromtimestamp(ts).isoformat(),
+            "article_number": article,
+            "requirement_type": requirement,
+            "score": score,
+            "is_compliant": None if compliant is None else bool(compliant),
+            "source": source,
+            "details": None if details is None else json.loads(details),
+        } for ts, article, requirement, score, compliant, source, details in rows]
+
+    def summary(self, article_number=None, requirement_type=None, start=None, end=None, bucket="1d"):
+        """
+        Agregados por artigo, requisito e janela de tempo (bucket): quantidade
+        de avaliações, score médio, mínimo e máximo e fração conforme.
+
+        Com bucket múltiplo de uma hora, as horas completas do intervalo vêm
+        da tabela horária e só as horas parciais das bordas são agregadas a
+        partir dos registros; o resultado é o mesmo, lendo bem menos linhas.
+        """
+        self.flush()
+        bucket_seconds = to_seconds(bucket)
+        if bucket_seconds <= 0:
+            raise ValueError(f"bucket deve ser positivo: {bucket}")
+        start, end = to_timestamp(start), to_timestamp(end)
+        groups = {}
+        hour_start = None if start is None else math.ceil(start / _HOUR)
+        hour_end = None if end is None else math.floor(end / _HOUR)
+        use_hourly = bucket_seconds % _HOUR == 0 and (
+            hour_start is None or hour_end is None or hour_start < hour_end
+        )
+        if use_hourly:
+            self._aggregate_hourly(groups, article_number, requirement_type, hour_start, hour_end,
+                                   int(bucket_seconds // _HOUR))
+            if start is not None:
+                self._aggregate_raw(groups, article_number, requirement_type, start, hour_start * _HOUR,
+                                    bucket_seconds, index="compliance_history_time")
+            if end is not None:
+                self._aggregate_raw(groups, article_number, requirement_type, hour_end * _HOUR, end,
+                                    bucket_seconds, index="compliance_history_time")
+        else:
+            self._aggregate_raw(groups, article_number, requirement_type, start, end, bucket_seconds)
+
+        return [{
+            "article_number": article,
+            "requirement_type": requirement,
+            "bucket_start": datetime.datetime.fromtimestamp(bucket_index * bucket_seconds).isoformat(),
+            "evaluations": count,
+            "score_avg": score_sum / count,
+            "score_min": score_min,
+            "score_max": score_max,
+            "compliant_ratio": compliant_sum / compliant_count if compliant_count else None,
+        } for (article, requirement, bucket_index), (count, score_sum, score_min, score_max,
+                                                     compliant_sum, compliant_count) in sorted(groups.items())]
+
+    def _aggregate_raw(self, groups, article_number, requirement_type, start, end, bucket_seconds,
+                       index=None):
+        where, params = self._where(article_number, requirement_type, start, end)
+        indexed_by = f" INDEXED BY {index}" if index else ""
+        rows = self._connection().execute(
+            "SELECT article_number, requirement_type, CAST(ts / ? AS INTEGER) AS bucket,"
+            " COUNT(*), SUM(score), MIN(score), MAX(score), SUM(is_compliant), COUNT(is_compliant)"
+            f" FROM compliance_history{indexed_by}{where}"
+            " GROUP BY article_number, requirement_type, bucket",
+            [bucket_seconds] + params
+        )
+        _merge_groups(groups, rows)
+
+    def _aggregate_hourly(self, groups, article_number, requirement_type, hour_start, hour_end, bucket_hours):
+        clauses, params = [], []
+        for column, value in (("article_number", article_number), ("requirement_type", requirement_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if hour_start is not None:
+            clauses.append("hour >= ?")
+            params.append(hour_start)
+        if hour_end is not None:
+            clauses.append("hour < ?")
+            params.append(hour_end)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self._connection().execute(
+            "SELECT article_number, requirement_type, hour / ? AS bucket, SUM(evaluations),"
+            " SUM(score_sum), MIN(score_min), MAX(score_max), SUM(compliant_sum), SUM(compliant_count)"
+            f" FROM compliance_history_hourly{where}"
+            " GROUP BY article_number, requirement_type, bucket",
+            [bucket_hours] + params
+        )
+        _merge_groups(groups, rows)
+
+
+def _hourly_rollup(rows):
+    # Agregados por (artigo, requisito, hora) de um lote de registros
+    hourly = {}
+    for ts, article, requirement, score, compliant, _, _ in rows:
+        key = (article, requirement, int(ts // _HOUR))
+        entry = hourly.get(key)
+        if entry is None:
+            entry = hourly[key] = [0, 0.0, score, score, 0, 0]
+        entry[0] += 1
+        entry[1] += score
+        entry[2] = min(entry[2], score)
+        entry[3] = max(entry[3], score)
+        if compliant is not None:
+            entry[4] += compliant
+            entry[5] += 1
+    return [key + tuple(entry) for key, entry in hourly.items()]
+
+
+def _merge_groups(groups, rows):
+    for article, requirement, bucket, count, score_sum, score_min, score_max, compliant_sum, compliant_count in rows:
+        key = (article, requirement, bucket)
+        current = groups.get(key)
+        if current is None:
+            groups[key] = [count, score_sum, score_min, score_max, compliant_sum or 0, compliant_count]
+        else:
+            current[0] += count
+            current[1] += score_sum
+            current[2] = min(current[2], score_min)
+            current[3] = max(current[3], score_max)
+            current[4] += compliant_sum or 0
+            current[5] += compliant_count
+
+
+def query_from_params(history, params):
+    """
+    Consulta a partir dos parâmetros de uma requisição HTTP (article,
+    requirement, start, end, limit e bucket). Com bucket, devolve os
+    agregados de summary(); sem, os registros. Retorna (corpo, status).
+    """
+    try:
+        filters = {
+            "article_number": params.get("article"),
+            "requirement_type": params.get("requirement"),
+            "start": to_timestamp(params.get("start")),
+            "end": to_timestamp(params.get("end")),
+        }
+        if params.get("bucket"):
+            return {"buckets": history.summary(bucket=params["bucket"], **filters)}, 200
+        records = history.query(limit=int(params.get("limit", DEFAULT_QUERY_LIMIT)), **filters)
+        return {"records": records, "count": len(records)}, 200
+    except ValueError as e:
+        return {"error": f"parâmetro inválido: {str(e)}"}, 400
@@ -0,0 +1,246 @@
+import time
+import random
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Validade das entradas (segundos): chaves encontradas, chaves desconhecidas
+# (cache negativo) e janela após a expiração em que a entrada ainda é servida
+# enquanto é revalidada em segundo plano
+DEFAULT_TTL = 300.0
+DEFAULT_NEGATIVE_TTL = 60.0
+DEFAULT_STALE_TTL = 600.0
+DEFAULT_MAX_ENTRIES = 100000
+
+# Resultados de DictCache.get
+HIT = "hit"
+NEGATIVE_HIT = "negative_hit"
+STALE = "stale"
+COALESCED = "coalesced"
+MISS = "miss"
+ERROR = "error"
+OUTCOMES = (HIT, NEGATIVE_HIT, STALE, COALESCED, MISS, ERROR)
+
+# Resultados atendidos sem uma chamada própria ao DICT
+SERVED_WITHOUT_UPSTREAM = (HIT, NEGATIVE_HIT, STALE, COALESCED)
+
+
+class DictUnavailable(Exception):
+    """Falha (timeout, erro de rede ou 5xx) ao consultar o DICT."""
+
+
+class _Flight:
+    # Consulta ao DICT em andamento para uma chave
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DictCache:
+    """
+    Cache em processo das consultas ao DICT por chave Pix.
+
+    fetch(chave) consulta o DICT e retorna os dados da chave, None para chave
+    desconhecida ou levanta uma exceção em falha. Chaves encontradas valem por
+    ttl segundos e desconhecidas por negative_ttl; acima de max_entries a
+    entrada usada há mais tempo é despejada (LRU).
+
+    Consultas simultâneas à mesma chave ausente fazem uma única chamada ao
+    DICT: as demais aguardam o resultado (coalescência). Uma entrada expirada
+    há menos de stale_ttl segundos continua sendo servida enquanto uma thread
+    a revalida; se a revalidação falhar, a entrada antiga é mantida até o fim
+    da janela. Falhas nunca são guardadas no cache.
+
+    on_fetch(segundos, sucesso), se informado, é chamado após cada chamada
+    ao DICT (inclusive revalidações).
+    """
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 stale_ttl=DEFAULT_STALE_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 on_fetch=None, revalidate_workers=4):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.on_fetch = on_fetch
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        # chave -> (valor, expira_em, servir_até), em ordem de uso
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._revalidator = ThreadPoolExecutor(max_workers=revalidate_workers,
+                                               thread_name_prefix="dict-revalidate")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Retorna (valor, resultado), em que resultado é um de OUTCOMES. Falhas
+        do DICT sem entrada utilizável no cache são propagadas.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, stale_until = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    return self._count(value, NEGATIVE_HIT if value is None else HIT)
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        self._revalidator.submit(self._fetch, key, flight)
+                    return self._count(value, STALE)
+                del self._entries[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._fetch(key, flight)
+        else:
+            flight.done.wait()
+        with self._lock:
+            if flight.error is not None:
+                self.counts[ERROR] += 1
+                raise flight.error
+            return self._count(flight.value, MISS if leader else COALESCED)
+
+    def _count(self, value, outcome):
+        # Chamado com self._lock adquirido
+        self.counts[outcome] += 1
+        return value, outcome
+
+    def _fetch(self, key, flight):
+        start = time.perf_counter()
+        try:
+            flight.value = self.fetch(key)
+        except Exception as e:
+            flight.error = e
+        else:
+            self._store(key, flight.value)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+            if self.on_fetch is not None:
+                self.on_fetch(time.perf_counter() - start, flight.error is None)
+
+    def _store(self, key, value):
+        now = time.monotonic()
+        if value is None:
+            # Chaves desconhecidas não são servidas após expirar: a chave pode
+            # ter acabado de ser registrada
+            expires_at = stale_until = now + self.negative_ttl
+        else:
+            expires_at = now + self.ttl
+            stale_until = expires_at + self.stale_ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at, stale_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Remove uma chave (ou todas) do cache."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def hit_ratio(self):
+        """Fração das consultas atendidas sem uma chamada própria ao DICT."""
+        with self._lock:
+            total = sum(self.counts.values())
+            served = sum(self.counts[outcome] for outcome in SERVED_WITHOUT_UPSTREAM)
+        return served / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self._entries), in_flight=len(self._flights))
+
+
+class DictStub:
+    """
+    DICT simulado, usado no lugar do DICT real pelo exporter e nos testes.
+
+    Mantém um diretório de num_keys chaves registradas; as demais são
+    desconhecidas (lookup retorna None). Cada consulta espera uma latência
+    uniforme em latency = (mínimo, máximo) segundos e falha com
+    DictUnavailable com probabilidade error_rate. calls conta as consultas
+    recebidas.
+    """
+
+    KEY_BASE = 11900000000
+    UNKNOWN_KEY_BASE = 21900000000
+
+    def __init__(self, num_keys=10000, latency=(0.1, 0.5), error_rate=0.05, seed=None):
+        self.num_keys = num_keys
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def key(self, index):
+        """Chave registrada de número index (telefone fictício)."""
+        return f"+55{self.KEY_BASE + index}"
+
+    def sample_key(self, unknown_rate=0.02, rng=None):
+        """
+        Chave para gerar tráfego: poucas chaves concentram a maior parte das
+        consultas, como contas recebedoras frequentes, e uma fração
+        unknown_rate não está registrada.
+        """
+        rng = rng or self._rng
+        if rng.random() < unknown_rate:
+            return f"+55{self.UNKNOWN_KEY_BASE + rng.randrange(self.num_keys)}"
+        return self.key(int(self.num_keys * rng.random() ** 3))
+
+    def register(self, pix_key, **record):
+        """Registra (ou substitui) os dados de uma chave."""
+        with self._lock:
+            self._records[pix_key] = dict(record, pix_key=pix_key)
+
+    def lookup(self, pix_key):
+        with self._lock:
+            self.calls += 1
+            record = self._records.get(pix_key)
+        low, high = self.latency
+        if high > 0:
+            time.sleep(self._rng.uniform(low, high))
+        if self._rng.random() < self.error_rate:
+            raise DictUnavailable("Timeout ao consultar o DICT")
+        if record is None:
+            record = self._generated_record(pix_key)
+        return None if record is None else dict(record, last_updated=datetime.datetime.now().isoformat())
+
+    def _generated_record(self, pix_key):
+        # Dados fixos por chave, derivados do número da chave
+        try:
+            index = int(pix_key.lstrip("+")) - 55 * 10 ** 11 - self.KEY_BASE
+        except ValueError:
+            return None
+        if not 0 <= index < self.num_keys:
+            return None
+        rng = random.Random(index)
+        suspicious = rng.random() < 0.1
+        return {
+            "pix_key": pix_key,
+            "key_type": "PHONE",
+            "owner_name": "Nome Fictício",
+            "bank_code": str(rng.randint(1, 999)).zfill(3),
+            "account_type": rng.choice(["CHECKING", "SAVINGS"]),
+            "suspicious_flag": suspicious,
+            "block_status": "BLOCKED" if suspicious and rng.random() < 0.7 else "ACTIVE",
+        }
@@ -0,0 +1,144 @@
+import os
+import gzip
+import time
+import threading
+
+from prometheus_client import Counter, Histogram, CollectorRegistry, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+# Idade máxima (segundos) em que o payload é servido sem nova coleta; absorve
+# scrapes simultâneos de várias réplicas do Prometheus
+EXPOSITION_MAX_AGE = float(os.environ.get('METRICS_EXPOSITION_MAX_AGE', 1.0))
+EXPOSITION_GZIP_LEVEL = int(os.environ.get('METRICS_EXPOSITION_GZIP_LEVEL', 6))
+
+exposition_cache_counter = Counter(
+    'metrics_exposition_cache_total',
+    'Resultado do cache de exposição de métricas (payload ou família)',
+    ['result']
+)
+
+exposition_render_seconds = Histogram(
+    'metrics_exposition_render_seconds',
+    'Tempo para montar o payload de /metrics',
+    ['encoding'],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25]
+)
+
+
+class _SingleFamily:
+    # Coletor mínimo para serializar uma única família com generate_latest
+    def __init__(self, family):
+        self.family = family
+
+    def collect(self):
+        return [self.family]
+
+
+def _signature(family):
+    # Os rótulos de um child saem sempre na mesma ordem, então a tupla de
+    # valores identifica a série sem precisar ordenar
+    return tuple(
+        (sample.name, tuple(sample.labels.values()), sample.value, sample.timestamp)
+        for sample in family.samples
+    )
+
+
+def metrics_registry():
+    """
+    Registry a ser exposto: o padrão do processo ou, quando
+    PROMETHEUS_MULTIPROC_DIR está definido (vários workers), um registry que
+    agrega os arquivos de métricas de todos os processos.
+    """
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def accepts_gzip(accept_encoding):
+    for token in (accept_encoding or "").split(","):
+        parts = [part.strip() for part in token.split(";")]
+        if parts[0].lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            return True
+    return False
+
+
+class ExpositionCache:
+    """
+    Cache da exposição de métricas no formato texto do Prometheus.
+
+    A cada coleta, apenas as famílias cujas amostras mudaram desde o último
+    scrape são serializadas novamente; as demais reaproveitam os bytes já
+    codificados. Dentro de max_age segundos o payload completo é servido sem
+    nova coleta, e a versão gzip é comprimida uma única vez por payload.
+    """
+
+    def __init__(self, registry=REGISTRY, max_age=EXPOSITION_MAX_AGE, gzip_level=EXPOSITION_GZIP_LEVEL):
+        self.registry = registry
+        self.max_age = max_age
+        self.gzip_level = gzip_level
+        self._families = {}
+        self._payload = b""
+        self._payload_gzip = None
+        self._rendered_at = None
+        self._lock = threading.Lock()
+
+    def render(self):
+        """Retorna o payload atual, serializando só as famílias alteradas."""
+        with self._lock:
+            now = time.monotonic()
+            if self._rendered_at is not None and now - self._rendered_at < self.max_age:
+                exposition_cache_counter.labels("payload_hit").inc()
+                return self._payload
+
+            families = {}
+            parts = []
+            hits = renders = 0
+            for family in self.registry.collect():
+                signature = _signature(family)
+                cached = self._families.get(family.name)
+                if cached is not None and cached[0] == signature:
+                    data = cached[1]
+                    hits += 1
+                else:
+                    data = generate_latest(_SingleFamily(family))
+                    renders += 1
+                families[family.name] = (signature, data)
+                parts.append(data)
+
+            if renders or families.keys() != self._families.keys():
+                self._payload = b"".join(parts)
+                self._payload_gzip = None
+            self._families = families
+            self._rendered_at = now
+
+        exposition_cache_counter.labels("family_hit").inc(hits)
+        exposition_cache_counter.labels("family_render").inc(renders)
+        return self._payload
+
+    def response_body(self, accept_encoding=""):
+        """
+        Retorna (corpo, content_encoding) negociando gzip pelo header
+        Accept-Encoding. content_encoding é None para o payload sem compressão.
+        """
+        use_gzip = accepts_gzip(accept_encoding)
+        encoding = "gzip" if use_gzip else "identity"
+        with exposition_render_seconds.labels(encoding).time():
+            payload = self.render()
+            if not use_gzip:
+                return payload, None
+            with self._lock:
+                if self._payload_gzip is None or self._payload_gzip[0] is not payload:
+                    self._payload_gzip = (payload, gzip.compress(payload, compresslevel=self.gzip_level))
+                return self._payload_gzip[1], "gzip"
+
@@ -0,0 +1,89 @@
+# Configuração do gunicorn para o modo de produção do ml-metrics-exporter.
+# Uso: python serve.py --mode production (ou gunicorn -c gunicorn.conf.py app:app)
+import os
+import sys
+import time
+import fcntl
+import shutil
+import signal
+import subprocess
+import threading
+
+# O diretório precisa estar no ambiente antes de qualquer processo importar o
+# prometheus_client; os workers herdam esta variável do master
+MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/ml-metrics-exporter')
+
+# Porta do servidor dedicado de /metrics (0 desativa). Os scrapes não
+# disputam threads com os endpoints de simulação, que usam time.sleep
+METRICS_PORT = int(os.environ.get('EXPORTER_METRICS_PORT', 8081))
+
+# Intervalo para um worker tentar assumir a simulação de métricas
+SIMULATION_LEADER_POLL = float(os.environ.get('EXPORTER_SIMULATION_LEADER_POLL', 5))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('EXPORTER_WORKERS', 2))
+threads = int(os.environ.get('EXPORTER_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.environ.get('EXPORTER_WORKER_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('EXPORTER_GRACEFUL_TIMEOUT', 10))
+keepalive = 5
+accesslog = os.environ.get('EXPORTER_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    # Arquivos de uma execução anterior fariam os contadores recomeçarem de
+    # valores antigos
+    shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+
+def when_ready(server):
+    server.metrics_process = None
+    if METRICS_PORT:
+        serve_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+        server.metrics_process = subprocess.Popen(
+            [sys.executable, serve_script, '--mode', 'metrics', '--port', str(METRICS_PORT)]
+        )
+        server.log.info(f"Servidor de métricas iniciado na porta {METRICS_PORT}")
+
+
+def post_worker_init(worker):
+    threading.Thread(target=_elect_simulation_leader, args=(worker,), daemon=True).start()
+
+
+def _elect_simulation_leader(worker):
+    """
+    Apenas um worker executa o agendador de métricas simuladas. Cada worker tenta
+    obter um lock exclusivo; se o líder morrer, o lock é liberado junto com o
+    processo e outro worker assume.
+    """
+    lock_file = open(os.path.join(MULTIPROC_DIR, 'simulation.lock'), 'w')
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            time.sleep(SIMULATION_LEADER_POLL)
+
+    # Manter a referência: fechar o arquivo liberaria o lock
+    worker.simulation_lock = lock_file
+    worker.log.info(f"Worker {worker.pid} assumiu a simulação de métricas")
+
+    from app import start_background_updates
+    start_background_updates()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    metrics_process = getattr(server, 'metrics_process', None)
+    if metrics_process is not None and metrics_process.poll() is None:
+        metrics_process.send_signal(signal.SIGTERM)
+        try:
+            metrics_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            metrics_process.kill()
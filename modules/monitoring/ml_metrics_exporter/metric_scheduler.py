@@ -0,0 +1,152 @@
+import os
+import time
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger('ml-metrics-exporter')
+
+# Threads compartilhadas pelas tarefas de atualização; uma tarefa travada
+# ocupa apenas uma delas
+DEFAULT_WORKERS = int(os.environ.get('METRIC_UPDATE_WORKERS', 4))
+
+task_duration = Histogram(
+    'metric_update_task_duration_seconds',
+    'Duração de cada execução de uma tarefa de atualização de métricas',
+    ['task'],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10]
+)
+
+task_overruns = Counter(
+    'metric_update_task_overruns_total',
+    'Execuções de uma tarefa que não terminaram dentro do intervalo previsto',
+    ['task']
+)
+
+task_errors = Counter(
+    'metric_update_task_errors_total',
+    'Execuções de uma tarefa de atualização que terminaram em erro',
+    ['task']
+)
+
+
+class _Task:
+    def __init__(self, name, func, interval, jitter):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.running = False
+        # Children pré-resolvidos: a tarefa aparece em /metrics antes da
+        # primeira execução
+        self.duration = task_duration.labels(name)
+        self.overruns = task_overruns.labels(name)
+        self.errors = task_errors.labels(name)
+
+    def next_delay(self):
+        return self.interval + random.uniform(0, self.jitter)
+
+
+class MetricScheduler:
+    """
+    Agenda tarefas periódicas de atualização de métricas, cada uma com seu
+    intervalo e jitter, executadas em um pool de threads compartilhado.
+
+    Uma tarefa nunca roda em paralelo consigo mesma: se ainda estiver em
+    execução quando vencer, a rodada é pulada, e execuções mais longas que o
+    intervalo são contadas como overrun. Tarefas lentas ou travadas não
+    atrasam as demais enquanto houver threads livres no pool.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._tasks = []
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._dispatcher = None
+        self._stopped = False
+
+    def add_task(self, name, func, interval, jitter=0.0):
+        """Registra func para ser executada a cada interval (+ até jitter) segundos."""
+        task = _Task(name, func, interval, jitter)
+        with self._condition:
+            self._tasks.append(task)
+            # Primeira execução espalhada dentro do jitter para as tarefas não
+            # vencerem todas juntas
+            self._push(time.monotonic() + random.uniform(0, jitter), task)
+            self._condition.notify()
+        return task
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='metric-update')
+        self._dispatcher = threading.Thread(target=self._dispatch, name='metric-scheduler', daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Agendador de métricas iniciado com {len(self._tasks)} tarefas")
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _push(self, due, task):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, task))
+
+    def _dispatch(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, task = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                next_due = due + task.next_delay()
+                if next_due <= now:
+                    # Atrasada (execução longa ou pool ocupado): não acumular
+                    # rodadas perdidas
+                    next_due = now + task.next_delay()
+                self._push(next_due, task)
+                if task.running:
+                    # A execução anterior ainda não terminou; o overrun é
+                    # contabilizado quando ela acabar
+                    continue
+                task.running = True
+                self._executor.submit(self._run, task)
+
+    def _run(self, task):
+        start = time.monotonic()
+        try:
+            task.func()
+        except Exception as e:
+            task.errors.inc()
+            logger.error(f"Erro na tarefa de atualização de métricas '{task.name}': {e}")
+        finally:
+            elapsed = time.monotonic() - start
+            task.duration.observe(elapsed)
+            if elapsed > task.interval:
+                task.overruns.inc()
+            with self._condition:
+                task.running = False
+
+    def stats(self):
+        with self._condition:
+            return {
+                "tasks": {
+                    task.name: {"interval": task.interval, "jitter": task.jitter, "running": task.running}
+                    for task in self._tasks
+                },
+                "workers": self.max_workers,
+            }
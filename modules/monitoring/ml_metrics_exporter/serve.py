@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Inicialização do ml-metrics-exporter.
+#
+# Modos:
+#   dev        - servidor embutido do Flask em um único processo (app.py)
+#   production - gunicorn com vários workers e threads (gunicorn.conf.py), com
+#                as métricas dos workers agregadas via PROMETHEUS_MULTIPROC_DIR
+#   async      - rotas ASGI (async_app.py) no uvicorn, em um único processo; a
+#                latência simulada não ocupa threads
+#   metrics    - apenas o /metrics agregado; iniciado pelo master do gunicorn
+#                em uma porta dedicada
+#
+# Uso: python serve.py [--mode dev|production|async|metrics] [--port 8081]
+import os
+import sys
+import signal
+import logging
+import argparse
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_MODES = ("dev", "production", "async", "metrics")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('ml-metrics-exporter')
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _SilentHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        # Scrapes a cada poucos segundos não devem poluir o log
+        pass
+
+
+def metrics_wsgi_app(cache):
+    """Aplicação WSGI que serve apenas /metrics a partir de um ExpositionCache."""
+    from prometheus_client import CONTENT_TYPE_LATEST
+
+    def application(environ, start_response):
+        if environ.get('PATH_INFO', '/') not in ('/', '/metrics'):
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return [b'Not Found']
+        body, content_encoding = cache.response_body(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        headers = [('Content-Type', CONTENT_TYPE_LATEST), ('Vary', 'Accept-Encoding')]
+        if content_encoding:
+            headers.append(('Content-Encoding', content_encoding))
+        start_response('200 OK', headers)
+        return [body]
+
+    return application
+
+
+def run_dev():
+    os.execv(sys.executable, [sys.executable, os.path.join(BASE_DIR, 'app.py')])
+
+
+def run_production():
+    config = os.path.join(BASE_DIR, 'gunicorn.conf.py')
+    os.execvp('gunicorn', ['gunicorn', '--config', config, '--chdir', BASE_DIR, 'app:app'])
+
+
+def run_async():
+    import uvicorn
+    port = int(os.environ.get('PORT', 8080))
+    logger.info(f"Iniciando servidor assíncrono na porta {port}...")
+    uvicorn.run('async_app:app', host='0.0.0.0', port=port,
+                access_log=False, backlog=int(os.environ.get('EXPORTER_BACKLOG', 4096)))
+
+
+def run_metrics(port):
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        logger.error("Modo metrics requer PROMETHEUS_MULTIPROC_DIR definido")
+        sys.exit(1)
+
+    from exposition_cache import ExpositionCache, metrics_registry
+    cache = ExpositionCache(metrics_registry())
+    server = make_server('0.0.0.0', port, metrics_wsgi_app(cache),
+                         server_class=_ThreadingWSGIServer, handler_class=_SilentHandler)
+    # Encerrar de forma limpa quando o master do gunicorn parar
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Servindo /metrics agregado na porta {port}...")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inicialização do ml-metrics-exporter")
+    parser.add_argument("--mode", choices=SERVER_MODES,
+                        default=os.environ.get('EXPORTER_SERVER_MODE', 'dev'))
+    parser.add_argument("--port", type=int,
+                        default=int(os.environ.get('EXPORTER_METRICS_PORT', 8081)))
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    if args.mode == "dev":
+        run_dev()
+    elif args.mode == "production":
+        run_production()
+    elif args.mode == "async":
+        run_async()
+    else:
+        run_metrics(args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import os
+import threading
+
+import numpy as np
+
+# Semente opcional para reproduzir uma simulação
+SIMULATION_SEED = os.environ.get('SIMULATION_SEED')
+
+
+class RandomWalkGroup:
+    """
+    Estado-sombra de um grupo de gauges simulados.
+
+    Cada série registrada guarda valor atual, passo mínimo/máximo e limites em
+    arrays NumPy. step() aplica um passo de passeio aleatório a todas as
+    séries de uma vez (valor + uniforme(passo_min, passo_max), limitado a
+    [mínimo, máximo]) e publica os novos valores nos children do
+    prometheus_client, sem ler o estado interno das métricas.
+    """
+
+    def __init__(self, name, rng):
+        self.name = name
+        self._rng = rng
+        self._children = []
+        self._specs = []
+        self._values = np.empty(0)
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, child, initial, step, bounds=(-np.inf, np.inf)):
+        """
+        Registra uma série. step é a tupla (passo_min, passo_max) e bounds a
+        tupla (mínimo, máximo). Retorna o índice da série no grupo.
+        """
+        with self._lock:
+            self._children.append(child)
+            self._specs.append((step[0], step[1], bounds[0], bounds[1]))
+            # Valores iniciais entram nos arrays no próximo passo
+            self._pending.append(float(initial))
+            return len(self._children) - 1
+
+    def _build(self):
+        specs = np.array(self._specs, dtype=np.float64).reshape(-1, 4)
+        self._step_low, self._step_high, self._lower, self._upper = specs.T.copy()
+        self._values = np.concatenate([self._values, self._pending])
+        self._pending = []
+
+    def step(self):
+        """Aplica um passo a todas as séries e publica os valores."""
+        with self._lock:
+            if self._pending:
+                self._build()
+            self._values += self._rng.uniform(self._step_low, self._step_high)
+            np.clip(self._values, self._lower, self._upper, out=self._values)
+            values = self._values.tolist()
+        for child, value in zip(self._children, values):
+            child.set(value)
+
+    def value(self, index):
+        """Valor atual de uma série."""
+        with self._lock:
+            if index >= len(self._values):
+                return self._pending[index - len(self._values)]
+            return float(self._values[index])
+
+    def __len__(self):
+        return len(self._children)
+
+
+class ShadowStateStore:
+    """Grupos de passeio aleatório, um por tarefa de atualização de métricas."""
+
+    def __init__(self, seed=SIMULATION_SEED):
+        self._seed_sequence = np.random.SeedSequence(None if seed is None else int(seed))
+        self.groups = {}
+        self._lock = threading.Lock()
+
+    def group(self, name):
+        with self._lock:
+            group = self.groups.get(name)
+            if group is None:
+                # Gerador independente por grupo: as tarefas rodam em threads
+                # diferentes do agendador
+                rng = np.random.default_rng(self._seed_sequence.spawn(1)[0])
+                group = self.groups[name] = RandomWalkGroup(name, rng)
+            return group
+
+    def step(self, name):
+        self.groups[name].step()
+
+    def stats(self):
+        return {name: len(group) for name, group in self.groups.items()}
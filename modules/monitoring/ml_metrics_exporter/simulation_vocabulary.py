@@ -0,0 +1,35 @@
+# Vocabulário da simulação de transações PIX, compartilhado pelo exporter
+# (app.py) e pelo gerador de tráfego sintético (traffic_generator.py)
+
+fraud_types = ["MULA_FINANCEIRA", "ENGENHARIA_SOCIAL", "INVASAO_CONTA", "GOLPE_FALSO_FUNCIONARIO", "PHISHING"]
+channels = ["PIX", "TED", "BOLETO", "APP_MOBILE", "INTERNET_BANKING"]
+transaction_types = ["p2p", "ecommerce", "bill_payment", "withdrawal", "deposit"]
+error_types = ["timeout", "model_error", "feature_missing", "validation_error", "authentication_error"]
+block_durations = ["72h", "30d", "indefinido"]
+block_reasons = ["fraude_confirmada", "suspeita_alta", "multiplas_denuncias", "ordem_judicial", "atividade_atipica"]
+attack_types = ["input_manipulation", "model_inversion", "membership_inference", "evasion_attack", "data_poisoning"]
+detection_methods = ["input_analysis", "behavioral_patterns", "anomaly_detection", "model_specific_defense"]
+severity_levels = ["low", "medium", "high", "critical"]
+time_periods = ["business_hours", "after_hours", "weekend", "holiday"]
+demographic_groups = ["low_income", "medium_income", "high_income", "urban", "rural", "young", "elderly"]
+profile_types = ["individual", "business", "government", "non_profit"]
+decision_types = ["transaction_block", "limit_increase", "authentication_challenge"]
+perturbation_types = ["noise", "targeted", "boundary", "transfer"]
+explanation_methods = ["shap", "lime", "counterfactual", "feature_importance"]
+feature_categories = ["temporal", "behavioral", "transactional", "demographic", "device"]
+business_rule_sets = ["bcb403", "internal_policy", "fraud_prevention", "aml"]
+deployment_stages = ["dev", "test", "staging", "production"]
+model_types = ["xgboost", "lightgbm", "neural_network", "ensemble"]
+data_sources = ["transactional", "customer", "external", "derived"]
+processing_stages = ["raw", "processed", "feature", "model_input"]
+policy_categories = ["data_access", "model_governance", "security", "privacy", "operational"]
+compliance_frameworks = ["bcb403", "iso27001", "gdpr", "pci_dss"]
+documentation_aspects = ["model_card", "data_dictionary", "risk_assessment", "monitoring_plan"]
+accelerator_types = ["cpu", "gpu", "tpu", "fpga"]
+operation_types = ["training", "inference", "feature_extraction", "data_processing"]
+impact_categories = ["fraud_prevention", "operational_efficiency", "customer_experience", "regulatory"]
+time_periods_business = ["daily", "weekly", "monthly", "quarterly", "yearly"]
+article_numbers = ["89", "91", "93", "95", "97"]
+requirement_types = ["monitoramento_tempo_real", "deteccao_anomalias", "seguranca_dados", "auditoria"]
+user_segments = ["retail", "high_value", "corporate", "new_customer", "long_term"]
+interaction_types = ["digital", "branch", "phone", "third_party"]
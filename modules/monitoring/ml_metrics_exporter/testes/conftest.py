@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos do exporter são importados a partir do diretório do app, como
+# no container
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,121 @@
+import random
+from collections import Counter as Occurrences
+
+from prometheus_client import CollectorRegistry, Counter
+
+from prometheus_client import REGISTRY
+
+from label_cache import LabelChildCache
+from cardinality import LIMITERS, OVERFLOW_VALUE, CardinalityLimiter, LabelPolicy, _SpaceSaving, limited_labels
+
+
+def _limiter(**policy):
+    return CardinalityLimiter("request_audit_total", ["endpoint", "user_id"],
+                              label_policies={"user_id": LabelPolicy(**policy)})
+
+
+def _user(limiter, user_id):
+    return limiter.admit(("/predict", user_id))[0][1]
+
+
+def _dropped(label):
+    return REGISTRY.get_sample_value("metric_label_values_dropped_total",
+                                     {"metric": "request_audit_total", "label": label}) or 0.0
+
+
+def test_overflow_admite_os_primeiros_valores_e_nao_cacheia_o_excedente():
+    limiter = _limiter(max_values=2, mode="overflow")
+    assert limiter.admit(("/predict", "a")) == (("/predict", "a"), True)
+    assert _user(limiter, "b") == "b"
+    assert limiter.admit(("/predict", "c")) == (("/predict", OVERFLOW_VALUE), False)
+
+
+def test_cada_ocorrencia_substituida_e_contada():
+    limiter = _limiter(max_values=1, mode="overflow")
+    before = _dropped("user_id")
+    metric = LabelChildCache(Counter("teste_descartes_total", "Métrica de teste", ["endpoint", "user_id"],
+                                     registry=CollectorRegistry()), limiter=limiter)
+    for user_id in ["a", "b", "b", "c", "b"]:
+        metric.labels("/predict", user_id).inc()
+    assert _dropped("user_id") - before == 4
+
+
+def test_stats_e_um_retrato_do_limitador():
+    limiter = _limiter(max_values=2, mode="top_k", min_count=1)
+    for user_id in ["a", "a", "b", "c"]:
+        limiter.admit(("/predict", user_id))
+    stats = limiter.stats()
+    assert stats["series"] == 3  # a, b e __other__
+    assert stats["labels"]["user_id"]["admitted"] == 2
+    assert stats["labels"]["user_id"]["heavy_hitters"][0] == ("a", 2)
+
+
+def test_hash_e_deterministico():
+    limiter = _limiter(mode="hash", hash_buckets=8)
+    assert _user(limiter, "cliente-1") == _user(limiter, "cliente-1")
+    assert {_user(limiter, f"cliente-{index}") for index in range(1000)} <= {f"hash_{b:02d}" for b in range(8)}
+
+
+def test_top_k_exige_min_count():
+    limiter = _limiter(max_values=2, mode="top_k", min_count=3)
+    assert [_user(limiter, "a") for _ in range(3)] == [OVERFLOW_VALUE, OVERFLOW_VALUE, "a"]
+
+
+def test_top_k_valor_frequente_posterior_toma_a_vaga():
+    limiter = _limiter(max_values=2, mode="top_k", min_count=2)
+    for _ in range(5):
+        _user(limiter, "a")
+        _user(limiter, "b")
+    assert _user(limiter, "c") == OVERFLOW_VALUE
+
+    # c passa a ser mais frequente que os admitidos e desaloja um deles
+    mapped = [_user(limiter, "c") for _ in range(10)]
+    assert mapped[-1] == "c"
+    assert sorted([_user(limiter, "a"), _user(limiter, "b")]).count(OVERFLOW_VALUE) == 1
+    assert limiter.stats()["labels"]["user_id"]["heavy_hitters"][0] == ("c", 11)
+
+
+def test_top_k_nunca_e_cacheado():
+    limiter = _limiter(max_values=1, mode="top_k", min_count=1)
+    assert limiter.admit(("/predict", "a")) == (("/predict", "a"), False)
+    assert limiter.admit(("/predict", "b")) == (("/predict", OVERFLOW_VALUE), False)
+
+
+def test_top_k_mantem_os_mais_frequentes_de_um_fluxo_zipf():
+    rng = random.Random(3)
+    limiter = _limiter(max_values=10, mode="top_k", min_count=3, track=200)
+    stream = [f"u{int(5000 * rng.random() ** 4)}" for _ in range(50000)]
+    # Os usuários mais frequentes só aparecem depois de um trecho de cauda longa
+    stream = [f"t{index}" for index in range(2000) for _ in range(3)] + stream
+    for user_id in stream:
+        _user(limiter, user_id)
+
+    true_top = {user_id for user_id, _ in Occurrences(stream).most_common(10)}
+    assert len(limiter._labels[1].admitted & true_top) >= 8
+
+
+def test_space_saving_conta_os_mais_frequentes():
+    rng = random.Random(7)
+    summary = _SpaceSaving(200)
+    stream = [int(1000 * rng.random() ** 3) for _ in range(20000)]
+    for value in stream:
+        summary.observe(value)
+
+    assert len(summary.counts) == 200
+    exact = Occurrences(stream)
+    for value, count in summary.most_common(5):
+        # Space-Saving só superestima, em no máximo a menor contagem
+        assert exact[value] <= count <= exact[value] + min(summary.counts.values())
+    assert {value for value, _ in summary.most_common(5)} == {value for value, _ in exact.most_common(5)}
+
+
+def test_limited_labels_recebe_os_nomes_dos_rotulos():
+    registry = CollectorRegistry()
+    metric = limited_labels(Counter, "teste_cardinalidade_total", "Métrica de teste", ["endpoint", "user_id"],
+                            max_series=3, registry=registry)
+    for index in range(5):
+        metric.labels("/predict", f"u{index}").inc()
+
+    assert LIMITERS["teste_cardinalidade"].labelnames == ("endpoint", "user_id")
+    assert registry.get_sample_value("teste_cardinalidade_total",
+                                     {"endpoint": OVERFLOW_VALUE, "user_id": OVERFLOW_VALUE}) == 2.0
@@ -0,0 +1,156 @@
+import time
+import threading
+
+import pytest
+
+from dict_cache import (
+    COALESCED, HIT, MISS, NEGATIVE_HIT, STALE, DictCache, DictStub, DictUnavailable
+)
+
+
+def _stub(latency=0.0, **options):
+    return DictStub(num_keys=100, latency=(latency, latency), error_rate=0.0, seed=1, **options)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida"
+        time.sleep(0.005)
+
+
+def test_entrada_vale_ate_o_ttl():
+    stub = _stub()
+    cache = DictCache(stub.lookup, ttl=0.05, stale_ttl=0.0)
+    key = stub.key(1)
+
+    value, outcome = cache.get(key)
+    assert outcome == MISS and value["pix_key"] == key
+    assert cache.get(key)[1] == HIT
+    assert stub.calls == 1
+
+    time.sleep(0.06)
+    assert cache.get(key)[1] == MISS
+    assert stub.calls == 2
+
+
+def test_chave_desconhecida_fica_em_cache_negativo():
+    stub = _stub()
+    cache = DictCache(stub.lookup, ttl=10, negative_ttl=0.05, stale_ttl=10)
+    key = "+5500000000000"
+
+    assert cache.get(key) == (None, MISS)
+    assert cache.get(key) == (None, NEGATIVE_HIT)
+    assert stub.calls == 1
+
+    # Sem janela de stale: a chave pode ter sido registrada
+    stub.register(key, key_type="PHONE")
+    time.sleep(0.06)
+    value, outcome = cache.get(key)
+    assert outcome == MISS and value["key_type"] == "PHONE"
+
+
+def test_entrada_expirada_e_servida_enquanto_revalida():
+    stub = _stub()
+    cache = DictCache(stub.lookup, ttl=0.05, stale_ttl=10)
+    key = stub.key(1)
+    stub.register(key, block_status="ACTIVE")
+    cache.get(key)
+
+    stub.register(key, block_status="BLOCKED")
+    stub.latency = (0.05, 0.05)
+    time.sleep(0.06)
+    value, outcome = cache.get(key)
+    assert outcome == STALE and value["block_status"] == "ACTIVE"
+    # A revalidação em segundo plano é única por chave
+    assert cache.get(key)[1] == STALE
+
+    _wait_for(lambda: cache.get(key)[1] == HIT)
+    assert cache.get(key)[0]["block_status"] == "BLOCKED"
+    assert stub.calls == 2
+
+
+def test_revalidacao_com_falha_mantem_a_entrada():
+    stub = _stub()
+    cache = DictCache(stub.lookup, ttl=0.05, stale_ttl=10)
+    key = stub.key(1)
+    cache.get(key)
+
+    stub.error_rate = 1.0
+    time.sleep(0.06)
+    assert cache.get(key)[1] == STALE
+    _wait_for(lambda: cache.stats()["in_flight"] == 0)
+    assert cache.get(key)[1] == STALE
+    assert len(cache) == 1
+
+
+def test_falhas_nao_ficam_em_cache():
+    stub = _stub()
+    stub.error_rate = 1.0
+    cache = DictCache(stub.lookup)
+    key = stub.key(1)
+
+    with pytest.raises(DictUnavailable):
+        cache.get(key)
+    stub.error_rate = 0.0
+    assert cache.get(key)[1] == MISS
+    assert stub.calls == 2
+
+
+def test_consultas_simultaneas_fazem_uma_chamada():
+    stub = _stub(latency=0.1)
+    cache = DictCache(stub.lookup)
+    key = stub.key(1)
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def worker():
+        barrier.wait()
+        outcomes.append(cache.get(key)[1])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.calls == 1
+    assert sorted(outcomes) == sorted([MISS] + [COALESCED] * 7)
+    assert cache.hit_ratio() == 7 / 8
+
+
+def test_falha_e_propagada_a_todas_as_consultas_agrupadas():
+    stub = _stub(latency=0.1)
+    stub.error_rate = 1.0
+    cache = DictCache(stub.lookup)
+    key = stub.key(1)
+    errors = []
+
+    def worker():
+        try:
+            cache.get(key)
+        except DictUnavailable as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stub.calls == 1
+    assert len(errors) == 4
+
+
+def test_lru_despeja_a_entrada_usada_ha_mais_tempo():
+    stub = _stub()
+    cache = DictCache(stub.lookup, max_entries=2)
+    first, second, third = stub.key(1), stub.key(2), stub.key(3)
+    cache.get(first)
+    cache.get(second)
+    cache.get(first)
+    cache.get(third)
+
+    assert len(cache) == 2
+    assert cache.get(first)[1] == HIT
+    assert cache.get(second)[1] == MISS
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+# Gerador de tráfego PIX sintético para testes de capacidade.
+#
+# Produz fluxos de transações reprodutíveis (semente fixa) com o vocabulário
+# da simulação do exporter, gerados em lotes vetorizados com NumPy: volume com
+# padrão diurno e de fim de semana, fraude mais frequente de madrugada,
+# rajadas de fraude concentradas em um tipo e canal, fraudes recebidas por
+# contas recentes e pagadores com atividade atípica nas últimas 24h. Os eventos podem ser
+# gravados em arquivo (JSON lines), enviados por socket ou postados em
+# /simulate/prediction.
+#
+# Uso:
+#   python traffic_generator.py --rate 1000000 --duration 60 --sink file --output trafego.jsonl.gz
+#   python traffic_generator.py --rate 6000 --duration 300 --realtime --sink http --url http://localhost:8080/simulate/prediction
+import sys
+import json
+import gzip
+import time
+import queue
+import socket
+import logging
+import argparse
+import datetime
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from simulation_vocabulary import channels, fraud_types, transaction_types, user_segments
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('traffic-generator')
+
+# Fuso de Brasília, usado para o padrão diurno
+TIMEZONE_OFFSET = -3 * 3600
+
+# Multiplicador de volume por hora do dia (0h a 23h): vale de madrugada, picos
+# no almoço e no início da noite
+DIURNAL_CURVE = [
+    0.25, 0.15, 0.10, 0.08, 0.08, 0.12, 0.30, 0.60, 0.95, 1.15, 1.25, 1.35,
+    1.45, 1.35, 1.25, 1.20, 1.20, 1.30, 1.45, 1.55, 1.40, 1.10, 0.75, 0.45,
+]
+
+# Distribuições das dimensões categóricas, na ordem do vocabulário
+CHANNEL_WEIGHTS = [0.55, 0.05, 0.05, 0.25, 0.10]
+TRANSACTION_TYPE_WEIGHTS = [0.55, 0.20, 0.15, 0.05, 0.05]
+USER_SEGMENT_WEIGHTS = [0.60, 0.08, 0.07, 0.10, 0.15]
+
+
+class TrafficProfile:
+    """
+    Parâmetros do tráfego simulado.
+
+    events_per_minute é o volume médio de um dia útil; o volume instantâneo
+    segue DIURNAL_CURVE e cai para weekend_factor nos fins de semana. A
+    probabilidade de fraude parte de fraud_rate, é multiplicada por
+    night_fraud_factor entre 23h e 5h e por burst_fraud_factor durante as
+    rajadas (em média bursts_per_hour, com duração média de burst_duration
+    segundos). As fraudes são recebidas por mule_accounts contas abertas há
+    até mule_max_age_days dias, e o pagador de uma fraude tem em média
+    fraud_tx_count_24h transações nas últimas 24h (tx_count_24h nas demais).
+    """
+
+    def __init__(self, events_per_minute=60000, fraud_rate=0.005, weekend_factor=0.8,
+                 night_fraud_factor=3.0, bursts_per_hour=2.0, burst_duration=120.0,
+                 burst_fraud_factor=20.0, accounts=1_000_000, mule_accounts=500,
+                 mule_max_age_days=60, tx_count_24h=2.0, fraud_tx_count_24h=8.0):
+        self.events_per_minute = events_per_minute
+        self.fraud_rate = fraud_rate
+        self.weekend_factor = weekend_factor
+        self.night_fraud_factor = night_fraud_factor
+        self.bursts_per_hour = bursts_per_hour
+        self.burst_duration = burst_duration
+        self.burst_fraud_factor = burst_fraud_factor
+        self.accounts = accounts
+        self.mule_accounts = mule_accounts
+        self.mule_max_age_days = mule_max_age_days
+        self.tx_count_24h = tx_count_24h
+        self.fraud_tx_count_24h = fraud_tx_count_24h
+        # Normaliza a curva para que a média do dia seja events_per_minute
+        curve = np.asarray(DIURNAL_CURVE, dtype=np.float64)
+        self.diurnal = curve / curve.mean()
+
+
+class TrafficBatch:
+    """Lote de transações em colunas NumPy (uma posição por evento)."""
+
+    def __init__(self, first_sequence, timestamps, amount, channel, transaction_type,
+                 user_segment, payer_id, payee_id, payee_age_days, payer_tx_count_24h,
+                 is_fraud, fraud_type):
+        self.first_sequence = first_sequence
+        self.timestamps = timestamps
+        self.amount = amount
+        self.channel = channel
+        self.transaction_type = transaction_type
+        self.user_segment = user_segment
+        self.payer_id = payer_id
+        self.payee_id = payee_id
+        self.payee_age_days = payee_age_days
+        self.payer_tx_count_24h = payer_tx_count_24h
+        self.is_fraud = is_fraud
+        self.fraud_type = fraud_type
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def fraud_count(self):
+        return int(self.is_fraud.sum())
+
+    def _iso_times(self):
+        local = (self.timestamps + TIMEZONE_OFFSET) * 1000
+        return np.datetime_as_string(local.astype('datetime64[ms]'), unit='ms')
+
+    def payloads(self):
+        """
+        Eventos no formato aceito por /simulate/prediction e pelo middleware
+        de inferência; 'label' traz a verdade da simulação.
+        """
+        times = self._iso_times()
+        columns = zip(
+            times.tolist(), self.amount.tolist(), self.channel.tolist(),
+            self.transaction_type.tolist(), self.user_segment.tolist(),
+            self.payer_id.tolist(), self.payee_id.tolist(),
+            self.payee_age_days.tolist(), self.payer_tx_count_24h.tolist(),
+            self.is_fraud.tolist(), self.fraud_type.tolist(),
+        )
+        for offset, (iso_time, amount, channel, tx_type, segment, payer, payee,
+                     payee_age, tx_count, is_fraud, fraud) in enumerate(columns):
+            yield {
+                "transaction_id": f"sim-{self.first_sequence + offset:012d}",
+                "time": iso_time,
+                "amount": amount,
+                "channel": channels[channel],
+                "transaction_type": transaction_types[tx_type],
+                "user_segment": user_segments[segment],
+                "payer": {"account_id": f"acc-{payer:07d}"},
+                "payee": {"account_id": f"acc-{payee:07d}", "account_age_days": payee_age},
+                "history": {"tx_count_24h": tx_count},
+                "label": {
+                    "is_fraud": is_fraud,
+                    "fraud_type": fraud_types[fraud] if is_fraud else None,
+                },
+            }
+
+    def json_lines(self):
+        """
+        Eventos serializados, um JSON por linha. Os campos são fixos e os
+        textos vêm do vocabulário (sem caracteres a escapar), então a linha é
+        montada por template, bem mais rápido que json.dumps por evento.
+        """
+        times = self._iso_times().tolist()
+        channel_names = [json.dumps(name) for name in channels]
+        type_names = [json.dumps(name) for name in transaction_types]
+        segment_names = [json.dumps(name) for name in user_segments]
+        fraud_names = [json.dumps(name) for name in fraud_types]
+        first = self.first_sequence
+        lines = []
+        append = lines.append
+        columns = zip(
+            times, self.amount.tolist(), self.channel.tolist(),
+            self.transaction_type.tolist(), self.user_segment.tolist(),
+            self.payer_id.tolist(), self.payee_id.tolist(),
+            self.payee_age_days.tolist(), self.payer_tx_count_24h.tolist(),
+            self.is_fraud.tolist(), self.fraud_type.tolist(),
+        )
+        for offset, (iso_time, amount, channel, tx_type, segment, payer, payee,
+                     payee_age, tx_count, is_fraud, fraud) in enumerate(columns):
+            append(
+                f'{{"transaction_id":"sim-{first + offset:012d}","time":"{iso_time}","amount":{amount!r},'
+                f'"channel":{channel_names[channel]},"transaction_type":{type_names[tx_type]},'
+                f'"user_segment":{segment_names[segment]},"payer":{{"account_id":"acc-{payer:07d}"}},'
+                f'"payee":{{"account_id":"acc-{payee:07d}","account_age_days":{payee_age}}},'
+                f'"history":{{"tx_count_24h":{tx_count}}},"label":{{"is_fraud":'
+                f'{"true" if is_fraud else "false"},"fraud_type":{fraud_names[fraud] if is_fraud else "null"}}}}}\n'
+            )
+        return lines
+
+
+class TrafficGenerator:
+    """
+    Gera lotes de transações a partir de um instante simulado (epoch em
+    segundos), avançando o relógio a cada lote. Com a mesma semente, perfil e
+    instante inicial, a sequência de eventos é idêntica.
+    """
+
+    def __init__(self, profile=None, seed=None, start=None):
+        self.profile = profile or TrafficProfile()
+        self.rng = np.random.default_rng(seed)
+        self.clock = float(int(start if start is not None else time.time()))
+        self.sequence = 0
+        # Rajadas ativas: (início, fim, tipo de fraude, canal)
+        self.bursts = []
+
+    def rate_per_second(self, seconds):
+        """Taxa esperada de eventos em cada segundo (epoch) informado."""
+        profile = self.profile
+        local = seconds + TIMEZONE_OFFSET
+        hour = (local % 86400) / 3600.0
+        # Interpolação circular da curva horária
+        curve = np.append(profile.diurnal, profile.diurnal[0])
+        diurnal = np.interp(hour, np.arange(25), curve)
+        # 1970-01-01 foi uma quinta-feira (segunda = 0)
+        weekday = ((local // 86400) + 3) % 7
+        weekend = np.where(weekday >= 5, profile.weekend_factor, 1.0)
+        return profile.events_per_minute / 60.0 * diurnal * weekend
+
+    def _update_bursts(self, window_start, window_end):
+        profile = self.profile
+        self.bursts = [burst for burst in self.bursts if burst[1] > window_start]
+        new_bursts = self.rng.poisson(profile.bursts_per_hour * (window_end - window_start) / 3600.0)
+        for _ in range(new_bursts):
+            start = self.rng.uniform(window_start, window_end)
+            self.bursts.append((
+                start,
+                start + self.rng.exponential(profile.burst_duration),
+                int(self.rng.integers(len(fraud_types))),
+                int(self.rng.integers(len(channels))),
+            ))
+
+    def next_batch(self, duration=1.0):
+        """Gera os eventos dos próximos duration segundos simulados."""
+        profile = self.profile
+        rng = self.rng
+        window_start = self.clock
+        window_end = window_start + duration
+        self.clock = window_end
+
+        seconds = window_start + np.arange(int(np.ceil(duration)), dtype=np.float64)
+        counts = rng.poisson(self.rate_per_second(seconds))
+        total = int(counts.sum())
+        timestamps = np.sort(np.repeat(seconds, counts) + rng.random(total))
+
+        # Probabilidade de fraude por evento: base, madrugada e rajadas
+        hour = ((timestamps + TIMEZONE_OFFSET) % 86400) / 3600.0
+        fraud_probability = np.full(total, profile.fraud_rate)
+        fraud_probability[(hour >= 23) | (hour < 5)] *= profile.night_fraud_factor
+        self._update_bursts(window_start, window_end)
+        burst_fraud_type = np.full(total, -1)
+        burst_channel = np.full(total, -1)
+        for start, end, fraud_type, channel in self.bursts:
+            in_burst = (timestamps >= start) & (timestamps < end)
+            fraud_probability[in_burst] *= profile.burst_fraud_factor
+            burst_fraud_type[in_burst] = fraud_type
+            burst_channel[in_burst] = channel
+        np.minimum(fraud_probability, 1.0, out=fraud_probability)
+        is_fraud = rng.random(total) < fraud_probability
+
+        channel = rng.choice(len(channels), size=total, p=CHANNEL_WEIGHTS)
+        transaction_type = rng.choice(len(transaction_types), size=total, p=TRANSACTION_TYPE_WEIGHTS)
+        user_segment = rng.choice(len(user_segments), size=total, p=USER_SEGMENT_WEIGHTS)
+        fraud_type = rng.integers(len(fraud_types), size=total)
+
+        # Fraudes dentro de uma rajada compartilham o tipo e o canal da rajada
+        burst_fraud = is_fraud & (burst_fraud_type >= 0)
+        fraud_type[burst_fraud] = burst_fraud_type[burst_fraud]
+        channel[burst_fraud] = burst_channel[burst_fraud]
+
+        # Valores com cauda longa; fraudes concentradas em valores mais altos
+        amount = np.where(
+            is_fraud,
+            rng.lognormal(np.log(1500.0), 1.0, size=total),
+            rng.lognormal(np.log(150.0), 1.2, size=total),
+        )
+        amount = np.round(np.clip(amount, 0.01, 1_000_000.0), 2)
+
+        payer_id = rng.integers(profile.accounts, size=total)
+        payee_id = rng.integers(profile.accounts, size=total)
+        # Fraudes recebidas por um conjunto pequeno de contas (mulas)
+        payee_id[is_fraud] = profile.accounts + rng.integers(profile.mule_accounts, size=int(is_fraud.sum()))
+
+        # Idade da conta fixa por conta (derivada do identificador): até 10
+        # anos para as contas comuns, até mule_max_age_days para as mulas
+        mule = payee_id >= profile.accounts
+        payee_age_days = np.where(
+            mule,
+            (payee_id - profile.accounts) * 7919 % profile.mule_max_age_days,
+            payee_id * 2654435761 % 3650,
+        )
+        # Pagadores de fraudes (contas tomadas) concentram transações em 24h
+        payer_tx_count_24h = rng.poisson(np.where(is_fraud, profile.fraud_tx_count_24h, profile.tx_count_24h))
+
+        batch = TrafficBatch(
+            self.sequence, timestamps, amount, channel, transaction_type,
+            user_segment, payer_id, payee_id, payee_age_days, payer_tx_count_24h,
+            is_fraud, fraud_type,
+        )
+        self.sequence += total
+        return batch
+
+
+#################################################################
+# DESTINOS DOS EVENTOS
+#################################################################
+
+class FileSink:
+    """Grava JSON lines em arquivo (comprimido quando termina em .gz; '-' para stdout)."""
+
+    def __init__(self, path):
+        if path == '-':
+            self._file = sys.stdout
+        else:
+            opener = gzip.open if path.endswith('.gz') else open
+            self._file = opener(path, 'wt', encoding='utf-8')
+        self.sent = 0
+
+    def send(self, batch):
+        self._file.writelines(batch.json_lines())
+        self.sent += len(batch)
+
+    def close(self):
+        if self._file is sys.stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+    def stats(self):
+        return {"sent": self.sent}
+
+
+class SocketSink:
+    """Envia JSON lines por TCP (fluxo contínuo) ou UDP (um datagrama por evento)."""
+
+    def __init__(self, host, port, protocol='tcp'):
+        self.protocol = protocol
+        self.address = (host, port)
+        if protocol == 'udp':
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self._socket = socket.create_connection(self.address)
+        self.sent = 0
+
+    def send(self, batch):
+        lines = batch.json_lines()
+        if self.protocol == 'udp':
+            for line in lines:
+                self._socket.sendto(line.encode('utf-8'), self.address)
+        else:
+            self._socket.sendall(''.join(lines).encode('utf-8'))
+        self.sent += len(lines)
+
+    def close(self):
+        self._socket.close()
+
+    def stats(self):
+        return {"sent": self.sent}
+
+
+class HttpSink:
+    """
+    Posta cada evento em /simulate/prediction (ou outra URL) com um pool de
+    conexões keep-alive. Quando o servidor não acompanha a taxa gerada, os
+    eventos excedentes são descartados e contabilizados, para que o ritmo do
+    gerador não dependa do alvo.
+    """
+
+    def __init__(self, url, workers=32, queue_size=100000, timeout=10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.path = parts.path or '/'
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.sent = self.errors = self.dropped = 0
+        self.status_codes = {}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'http-sink-{index}', daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _worker(self):
+        connection = self._connect()
+        headers = {'Content-Type': 'application/json'}
+        while True:
+            body = self._queue.get()
+            if body is None:
+                break
+            try:
+                connection.request('POST', self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                with self._lock:
+                    self.sent += 1
+                    self.status_codes[response.status] = self.status_codes.get(response.status, 0) + 1
+            except (OSError, http.client.HTTPException):
+                with self._lock:
+                    self.errors += 1
+                connection.close()
+                connection = self._connect()
+        connection.close()
+
+    def send(self, batch):
+        for line in batch.json_lines():
+            try:
+                self._queue.put_nowait(line.encode('utf-8'))
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "status_codes": dict(self.status_codes),
+            }
+
+
+def run(generator, sink, duration, batch_seconds=1.0, realtime=False):
+    """
+    Gera duration segundos simulados de tráfego em lotes de batch_seconds e
+    os entrega ao sink. Em modo realtime cada lote é liberado no seu
+    instante; caso contrário, o mais rápido possível.
+    """
+    started = time.monotonic()
+    events = frauds = 0
+    elapsed_simulated = 0.0
+    while elapsed_simulated < duration:
+        window = min(batch_seconds, duration - elapsed_simulated)
+        batch = generator.next_batch(window)
+        elapsed_simulated += window
+        sink.send(batch)
+        events += len(batch)
+        frauds += batch.fraud_count
+        if realtime:
+            delay = started + elapsed_simulated - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    wall_seconds = time.monotonic() - started
+    return {
+        "events": events,
+        "frauds": frauds,
+        "simulated_seconds": duration,
+        "wall_seconds": wall_seconds,
+        "events_per_minute": events / wall_seconds * 60 if wall_seconds else 0.0,
+    }
+
+
+def _parse_start(value):
+    if value is None:
+        return None
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone(datetime.timedelta(seconds=TIMEZONE_OFFSET)))
+    return moment.timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de tráfego PIX sintético")
+    parser.add_argument("--rate", type=float, default=60000, help="eventos por minuto (média de dia útil)")
+    parser.add_argument("--duration", type=float, default=60, help="segundos simulados")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", help="instante simulado inicial (ISO 8601, padrão: agora)")
+    parser.add_argument("--fraud-rate", type=float, default=0.005)
+    parser.add_argument("--bursts-per-hour", type=float, default=2.0)
+    parser.add_argument("--batch-seconds", type=float, default=1.0)
+    parser.add_argument("--realtime", action="store_true", help="liberar os eventos no ritmo simulado")
+    parser.add_argument("--sink", choices=("file", "socket", "http"), default="file")
+    parser.add_argument("--output", default="-", help="arquivo de saída do sink file ('-' para stdout)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--protocol", choices=("tcp", "udp"), default="tcp")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/simulate/prediction")
+    parser.add_argument("--http-workers", type=int, default=32)
+    args = parser.parse_args()
+
+    profile = TrafficProfile(
+        events_per_minute=args.rate,
+        fraud_rate=args.fraud_rate,
+        bursts_per_hour=args.bursts_per_hour,
+    )
+    generator = TrafficGenerator(profile, seed=args.seed, start=_parse_start(args.start))
+
+    if args.sink == "file":
+        sink = FileSink(args.output)
+    elif args.sink == "socket":
+        sink = SocketSink(args.host, args.port, args.protocol)
+    else:
+        sink = HttpSink(args.url, workers=args.http_workers)
+
+    try:
+        summary = run(generator, sink, args.duration, args.batch_seconds, args.realtime)
+    finally:
+        sink.close()
+    summary["sink"] = sink.stats()
+    logger.info(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
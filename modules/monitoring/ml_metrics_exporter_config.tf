@@ -11,10 +11,24 @@ resource "kubernetes_config_map" "ml_metrics_exporter_config" {
 
   data = {
     "app.py" = file("${path.module}/ml_metrics_exporter/app.py")
+    "label_cache.py" = file("${path.module}/ml_metrics_exporter/label_cache.py")
+    "cardinality.py" = file("${path.module}/ml_metrics_exporter/cardinality.py")
+    "exposition_cache.py" = file("${path.module}/ml_metrics_exporter/exposition_cache.py")
+    "async_app.py" = file("${path.module}/ml_metrics_exporter/async_app.py")
+    "simulation_vocabulary.py" = file("${path.module}/ml_metrics_exporter/simulation_vocabulary.py")
+    "shadow_state.py" = file("${path.module}/ml_metrics_exporter/shadow_state.py")
+    "metric_scheduler.py" = file("${path.module}/ml_metrics_exporter/metric_scheduler.py")
+    "serve.py" = file("${path.module}/ml_metrics_exporter/serve.py")
+    "gunicorn.conf.py" = file("${path.module}/ml_metrics_exporter/gunicorn.conf.py")
+    "compliance_history.py" = file("${path.module}/ml_metrics_exporter/compliance_history.py")
+    "dict_cache.py" = file("${path.module}/ml_metrics_exporter/dict_cache.py")
     "requirements.txt" = <<-EOF
       flask>=2.0.0
-      prometheus-client>=0.16.0
+      prometheus-client>=0.18.0
       gunicorn>=20.1.0
+      starlette>=0.26.0
+      uvicorn>=0.20.0
+      numpy>=1.22.0
     EOF
   }
 }
\ No newline at end of file
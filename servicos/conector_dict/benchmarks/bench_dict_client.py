@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Benchmark offline do cliente DICT contra o DICT simulado (dict_stub.py).
+#
+# Várias threads consultam chaves Pix (popularidade concentrada, como contas
+# recebedoras frequentes) durante um período fixo, em três modos:
+#   por_chave  - uma conexão nova e uma chamada GET por chave (sem pool)
+#   pool       - DictClient sem micro-batching (lotes de uma chave)
+#   pool_lote  - DictClient com micro-batching (janela DICT_BATCH_WINDOW_MS)
+# e compara vazão, latência por consulta e chamadas feitas ao DICT.
+#
+# Uso: python bench_dict_client.py [--callers 64] [--duration 5] [--latency 0.1,0.5]
+#      [--modes por_chave,pool,pool_lote] [--output resultado.json]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dict_client import DictClient, DictUnavailable  # noqa: E402
+from dict_stub import registered_key, start_stub  # noqa: E402
+
+PERCENTILES = {"p50": 50, "p99": 99}
+
+
+def sample_key(rng, num_keys):
+    return registered_key(int(num_keys * rng.random() ** 3))
+
+
+def per_key_lookup(port):
+    def lookup(pix_key):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            connection.request("GET", f"/entries/{pix_key}")
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                raise DictUnavailable(f"Resposta {response.status} do DICT")
+        except OSError as e:
+            raise DictUnavailable(f"Falha de rede ao consultar o DICT: {e}") from e
+        finally:
+            connection.close()
+    return lookup
+
+
+def run_mode(lookup, args, seed):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def caller(index):
+        rng = random.Random(seed * 1000 + index)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                lookup(sample_key(rng, args.keys))
+            except DictUnavailable:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(args.callers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {"lookups_per_second": len(latencies) / elapsed, "errors": errors[0]}
+    for name, percentile in PERCENTILES.items():
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        result[f"{name}_ms"] = latencies[index] * 1000 if latencies else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cliente DICT")
+    parser.add_argument("--callers", type=int, default=64, help="threads consultando em paralelo")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--latency", default="0.1,0.5", help="latência mínima,máxima do DICT simulado (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--modes", default="por_chave,pool,pool_lote")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    low, high = (float(value) for value in args.latency.split(","))
+    server, state = start_stub(num_keys=args.keys, latency=(low, high), error_rate=args.error_rate, seed=args.seed)
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {}
+    print(f"{'modo':<12}{'consultas/s':>14}{'p50 ms':>10}{'p99 ms':>10}{'chamadas':>10}{'chaves/chamada':>16}{'erros':>8}")
+    for mode in args.modes.split(","):
+        client = None
+        if mode == "por_chave":
+            lookup = per_key_lookup(server.server_port)
+        elif mode == "pool":
+            client = DictClient(url, batch_window=0, batch_max_keys=1)
+            lookup = client.lookup
+        elif mode == "pool_lote":
+            client = DictClient(url)
+            lookup = client.lookup
+        else:
+            parser.error(f"modo desconhecido: {mode}")
+
+        calls_before, keys_before = state.calls, state.keys_requested
+        result = run_mode(lookup, args, args.seed)
+        if client is not None:
+            client.close()
+        result["dict_calls"] = state.calls - calls_before
+        result["keys_per_call"] = (state.keys_requested - keys_before) / max(1, result["dict_calls"])
+        results[mode] = result
+        print(f"{mode:<12}{result['lookups_per_second']:>14.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+              f"{result['dict_calls']:>10}{result['keys_per_call']:>16.1f}{result['errors']:>8}")
+
+    server.shutdown()
+    output = {"callers": args.callers, "duration_s": args.duration, "latency_s": [low, high],
+              "error_rate": args.error_rate, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Resultado salvo em {args.output}")
+    else:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
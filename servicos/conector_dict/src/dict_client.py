@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from prometheus_client import Counter, Gauge, Histogram
+
+# Configuração do cliente DICT
+DICT_API_URL = os.getenv("DICT_API_URL", "http://dict-api:8080")
+DICT_TIMEOUT_SECONDS = float(os.getenv("DICT_TIMEOUT", "2"))
+
+# Conexões persistentes mantidas abertas e chamadas simultâneas ao DICT
+DICT_POOL_SIZE = int(os.getenv("DICT_POOL_SIZE", "16"))
+DICT_MAX_CONCURRENCY = int(os.getenv("DICT_MAX_CONCURRENCY", "16"))
+
+# Micro-batching: janela de espera por outras chaves e tamanho máximo do lote
+DICT_BATCH_WINDOW_SECONDS = float(os.getenv("DICT_BATCH_WINDOW_MS", "5")) / 1000
+DICT_BATCH_MAX_KEYS = int(os.getenv("DICT_BATCH_MAX_KEYS", "100"))
+
+# Circuit breaker: falhas consecutivas até abrir e tempo aberto antes de testar
+DICT_BREAKER_FAILURES = int(os.getenv("DICT_BREAKER_FAILURES", "5"))
+DICT_BREAKER_RESET_SECONDS = float(os.getenv("DICT_BREAKER_RESET", "30"))
+
+# Mesmos nomes usados pelo ml-metrics-exporter
+dict_query_latency = Histogram(
+    'dict_query_latency_seconds',
+    'Latência das consultas ao DICT',
+    ['operation_type'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+dict_integration_status = Gauge(
+    'dict_integration_status',
+    'Status da integração com o DICT (1=operacional, 0=falha)',
+    ['operation_type']
+)
+
+dict_batch_size = Histogram(
+    'dict_client_batch_size',
+    'Chaves distintas por chamada ao DICT',
+    buckets=[1, 2, 5, 10, 20, 50, 100, 200]
+)
+
+dict_client_lookups = Counter(
+    'dict_client_lookups_total',
+    'Consultas de chaves pelo cliente DICT por resultado',
+    ['result']
+)
+
+dict_circuit_state = Gauge(
+    'dict_circuit_breaker_state',
+    'Estado do circuit breaker do DICT (0=fechado, 1=meio-aberto, 2=aberto)'
+)
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+
+class DictUnavailable(Exception):
+    """Falha (timeout, erro de rede ou 5xx) ao consultar o DICT."""
+
+
+class DictRequestRejected(Exception):
+    """
+    Requisição recusada pelo DICT com 4xx (ex.: chave malformada). O DICT
+    respondeu, então não conta como falha para o circuit breaker.
+    """
+
+
+class CircuitOpen(DictUnavailable):
+    """Consulta recusada sem chamar o DICT porque o circuito está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Abre após failure_threshold falhas consecutivas e recusa chamadas por
+    reset_timeout segundos; depois deixa passar uma única chamada de teste
+    (meio-aberto), que fecha o circuito em caso de sucesso ou o reabre.
+    """
+
+    def __init__(self, failure_threshold=DICT_BREAKER_FAILURES, reset_timeout=DICT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        dict_circuit_state.set(CLOSED)
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            self._trial = False
+            if success:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        dict_circuit_state.set(state)
+
+
+class ConnectionPool:
+    """
+    Conexões HTTP/1.1 persistentes (http.client) para um único host. Até size
+    conexões ficam abertas entre as chamadas; uma conexão reaproveitada que o
+    servidor fechou é reaberta e a requisição repetida uma vez.
+    """
+
+    def __init__(self, base_url, size=DICT_POOL_SIZE, timeout=DICT_TIMEOUT_SECONDS):
+        url = urlsplit(base_url)
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """Retorna (status, corpo em bytes)."""
+        try:
+            connection, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            connection, reused = self._connect(), False
+        try:
+            try:
+                status, data = self._send(connection, method, path, body, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                connection.close()
+                connection = self._connect()
+                status, data = self._send(connection, method, path, body, headers)
+        except Exception:
+            connection.close()
+            raise
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return status, data
+
+    def _send(self, connection, method, path, body, headers):
+        connection.request(method, self.base_path + path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class DictClient:
+    """
+    Cliente das consultas de chaves Pix ao DICT.
+
+    Consultas feitas em até batch_window segundos são agrupadas (no máximo
+    batch_max_keys chaves distintas) em uma única chamada POST /entries/batch;
+    chaves repetidas no lote são consultadas uma vez. No máximo
+    max_concurrency lotes ficam em andamento, sobre um pool de conexões
+    persistentes. Falhas de rede, timeouts e respostas 5xx contam para o
+    circuit breaker, que recusa as consultas enquanto o DICT estiver
+    indisponível.
+
+    lookup() e lookup_many() bloqueiam a thread; lookup_async() é para código
+    asyncio. Todos retornam os dados da chave ou None para chave não
+    registrada, e levantam DictUnavailable em falha ou se a resposta não
+    chega em wait_timeout segundos, e DictRequestRejected se o DICT recusa o
+    lote com 4xx.
+    """
+
+    def __init__(self, base_url=DICT_API_URL, pool_size=DICT_POOL_SIZE,
+                 max_concurrency=DICT_MAX_CONCURRENCY, timeout=DICT_TIMEOUT_SECONDS,
+                 batch_window=DICT_BATCH_WINDOW_SECONDS, batch_max_keys=DICT_BATCH_MAX_KEYS,
+                 breaker=None):
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.batch_max_keys = batch_max_keys
+        self.pool = ConnectionPool(base_url, size=pool_size, timeout=timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self._pending = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="dict-client")
+        self._closed = False
+        self._batcher = threading.Thread(target=self._run_batcher, name="dict-batcher", daemon=True)
+        self._batcher.start()
+
+    def submit(self, pix_key):
+        """Enfileira a consulta de uma chave; retorna um Future."""
+        if self._closed:
+            raise RuntimeError("DictClient encerrado")
+        future = Future()
+        self._pending.put((pix_key, future))
+        return future
+
+    @property
+    def wait_timeout(self):
+        """Espera máxima por uma resposta: janela do lote, chamada e folga."""
+        return self.timeout + self.batch_window + 1
+
+    def lookup(self, pix_key):
+        try:
+            return self.submit(pix_key).result(timeout=self.wait_timeout)
+        except FutureTimeout:
+            # Antes do Python 3.11, concurrent.futures.TimeoutError não é o
+            # TimeoutError embutido
+            raise DictUnavailable("Timeout ao consultar o DICT") from None
+
+    def lookup_many(self, pix_keys):
+        """Consulta várias chaves; retorna {chave: dados ou None}."""
+        futures = {key: self.submit(key) for key in set(pix_keys)}
+        # Um único prazo para todas as chaves, como em lookup()
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            return {key: future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    for key, future in futures.items()}
+        except FutureTimeout:
+            raise DictUnavailable("Timeout ao consultar o DICT") from None
+
+    async def lookup_async(self, pix_key):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(pix_key)), self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise DictUnavailable("Timeout ao consultar o DICT") from None
+
+    def close(self):
+        self._closed = True
+        self._pending.put(None)
+        self._batcher.join()
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+    #################################################################
+    # MICRO-BATCHING
+    #################################################################
+
+    def _run_batcher(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            # A janela começa na primeira chave do lote
+            batch = {}
+            deadline = time.monotonic() + self.batch_window
+            while item is not None:
+                batch.setdefault(item[0], []).append(item[1])
+                if len(batch) >= self.batch_max_keys:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pending.put(None)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        if not self.breaker.allow():
+            dict_client_lookups.labels("circuit_open").inc(len(batch))
+            self._fail(batch, CircuitOpen("Circuito do DICT aberto"))
+            return
+        # Limita os lotes em andamento; enquanto todos os slots estão
+        # ocupados, novas chaves se acumulam no próximo lote
+        self._slots.acquire()
+        self._executor.submit(self._call, batch)
+
+    def _call(self, batch):
+        start = time.perf_counter()
+        try:
+            entries = self._fetch_batch(list(batch))
+        except DictRequestRejected as e:
+            self.breaker.record(True)
+            dict_integration_status.labels(operation_type="query").set(1)
+            dict_client_lookups.labels("rejected").inc(len(batch))
+            self._fail(batch, e)
+        except Exception as e:
+            self.breaker.record(False)
+            dict_integration_status.labels(operation_type="query").set(0)
+            dict_client_lookups.labels("error").inc(len(batch))
+            error = e if isinstance(e, DictUnavailable) else DictUnavailable(f"Falha ao consultar o DICT: {e}")
+            self._fail(batch, error)
+        else:
+            self.breaker.record(True)
+            dict_integration_status.labels(operation_type="query").set(1)
+            found = sum(1 for key in batch if entries.get(key) is not None)
+            dict_client_lookups.labels("found").inc(found)
+            dict_client_lookups.labels("not_found").inc(len(batch) - found)
+            # Futures cancelados (lookup_async que desistiu da consulta) são
+            # ignorados; os demais deixam de poder ser cancelados
+            for key, futures in batch.items():
+                for future in futures:
+                    if future.set_running_or_notify_cancel():
+                        future.set_result(entries.get(key))
+        finally:
+            dict_query_latency.labels(operation_type="query").observe(time.perf_counter() - start)
+            dict_batch_size.observe(len(batch))
+            self._slots.release()
+
+    def _fetch_batch(self, keys):
+        try:
+            status, data = self.pool.request(
+                "POST", "/entries/batch", body=json.dumps({"keys": keys}),
+                headers={"Content-Type": "application/json"}
+            )
+        except OSError as e:
+            # Inclui timeouts de conexão e leitura (socket.timeout)
+            raise DictUnavailable(f"Falha de rede ao consultar o DICT: {e}") from e
+        if 400 <= status < 500:
+            raise DictRequestRejected(f"Resposta {status} do DICT: {data[:200].decode('utf-8', 'replace')}")
+        if status != 200:
+            raise DictUnavailable(f"Resposta {status} do DICT")
+        return json.loads(data)["entries"]
+
+    @staticmethod
+    def _fail(batch, error):
+        for futures in batch.values():
+            for future in futures:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
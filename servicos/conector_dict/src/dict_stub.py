@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# DICT simulado para desenvolvimento e benchmarks offline do conector.
+#
+# Atende GET /entries/<chave> (200 com os dados ou 404) e POST /entries/batch
+# ({"keys": [...]} -> {"entries": {chave: dados ou null}}), com conexões
+# persistentes, latência por chamada e taxa de falhas (503) configuráveis.
+# Chaves "+55<11900000000 + i>" com i < --keys estão registradas; as demais
+# são desconhecidas.
+#
+# Uso: python dict_stub.py [--port 8080] [--latency 0.1,0.5] [--per-key-latency 0.0002]
+#      [--error-rate 0.05] [--keys 10000]
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KEY_BASE = 11900000000
+
+
+def registered_key(index):
+    """Chave registrada de número index (telefone fictício)."""
+    return f"+55{KEY_BASE + index}"
+
+
+class DictStubState:
+    """Diretório de chaves, latência e falhas simuladas; calls conta as chamadas."""
+
+    def __init__(self, num_keys=10000, latency=(0.1, 0.5), per_key_latency=0.0002, error_rate=0.05, seed=None):
+        self.num_keys = num_keys
+        self.latency = latency
+        self.per_key_latency = per_key_latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.keys_requested = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def begin_call(self, key_count):
+        """Espera a latência simulada; retorna False se a chamada deve falhar."""
+        with self._lock:
+            self.calls += 1
+            self.keys_requested += key_count
+            delay = self._rng.uniform(*self.latency) + self.per_key_latency * key_count
+            failed = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return not failed
+
+    def entry(self, pix_key):
+        try:
+            index = int(pix_key.lstrip("+")) - 55 * 10 ** 11 - KEY_BASE
+        except ValueError:
+            return None
+        if not 0 <= index < self.num_keys:
+            return None
+        rng = random.Random(index)
+        suspicious = rng.random() < 0.1
+        return {
+            "pix_key": pix_key,
+            "key_type": "PHONE",
+            "owner_name": "Nome Fictício",
+            "bank_code": str(rng.randint(1, 999)).zfill(3),
+            "account_type": rng.choice(["CHECKING", "SAVINGS"]),
+            "suspicious_flag": suspicious,
+            "block_status": "BLOCKED" if suspicious and rng.random() < 0.7 else "ACTIVE",
+            "last_updated": datetime.datetime.now().isoformat(),
+        }
+
+
+class DictStubServer(ThreadingHTTPServer):
+    # Fila de conexões maior que a padrão (5) para clientes sem pool
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class DictStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self.path.startswith("/entries/"):
+            return self._send_json(404, {"error": "rota não encontrada"})
+        if not self.state.begin_call(1):
+            return self._send_json(503, {"error": "DICT indisponível"})
+        entry = self.state.entry(unquote(self.path[len("/entries/"):]))
+        if entry is None:
+            return self._send_json(404, {"error": "chave não registrada"})
+        self._send_json(200, entry)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/entries/batch":
+            return self._send_json(404, {"error": "rota não encontrada"})
+        try:
+            keys = json.loads(body)["keys"]
+        except (ValueError, KeyError):
+            return self._send_json(400, {"error": "corpo inválido"})
+        if not self.state.begin_call(len(keys)):
+            return self._send_json(503, {"error": "DICT indisponível"})
+        self._send_json(200, {"entries": {key: self.state.entry(key) for key in keys}})
+
+
+def start_stub(host="127.0.0.1", port=0, **state_options):
+    """
+    Sobe o stub em uma thread do processo. Retorna (servidor, estado); a URL
+    é http://host:servidor.server_port.
+    """
+    state = DictStubState(**state_options)
+    handler = type("BoundDictStubHandler", (DictStubHandler,), {"state": state})
+    server = DictStubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="dict-stub", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DICT simulado")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="0.1,0.5", help="latência mínima,máxima por chamada (s)")
+    parser.add_argument("--per-key-latency", type=float, default=0.0002)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--keys", type=int, default=10000, help="chaves registradas")
+    args = parser.parse_args()
+
+    low, high = (float(value) for value in args.latency.split(","))
+    server, _ = start_stub(args.host, args.port, num_keys=args.keys, latency=(low, high),
+                           per_key_latency=args.per_key_latency, error_rate=args.error_rate)
+    print(f"DICT simulado em http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# dict_client e dict_stub são importados a partir de src/, como no benchmark
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,115 @@
+import time
+import asyncio
+
+import pytest
+
+from dict_client import CLOSED, OPEN, CircuitBreaker, DictClient, DictRequestRejected, DictUnavailable
+from dict_stub import registered_key, start_stub
+
+
+@pytest.fixture
+def stub():
+    server, state = start_stub(num_keys=100, latency=(0.3, 0.3), per_key_latency=0.0, error_rate=0.0, seed=1)
+    yield server, state
+    server.shutdown()
+    server.server_close()
+
+
+def _client(server, **options):
+    return DictClient(f"http://127.0.0.1:{server.server_port}", **options)
+
+
+def test_chaves_da_janela_saem_em_uma_chamada(stub):
+    server, state = stub
+    client = _client(server, batch_window=0.05)
+    try:
+        keys = [registered_key(index) for index in range(10)] + ["+5500000000000"]
+        result = client.lookup_many(keys + keys)
+    finally:
+        client.close()
+    assert state.calls == 1
+    assert result["+5500000000000"] is None
+    assert all(result[key]["pix_key"] == key for key in keys[:-1])
+
+
+def test_chamador_cancelado_nao_impede_os_demais(stub):
+    server, _ = stub
+    client = _client(server, batch_window=0.05)
+
+    async def run():
+        key = registered_key(1)
+        abandoned = asyncio.ensure_future(client.lookup_async(key))
+        waiting = asyncio.ensure_future(client.lookup_async(key))
+        await asyncio.sleep(0.1)
+        abandoned.cancel()
+        start = time.monotonic()
+        entry = await waiting
+        return entry, time.monotonic() - start
+
+    try:
+        entry, elapsed = asyncio.run(run())
+    finally:
+        client.close()
+    assert entry["pix_key"] == registered_key(1)
+    assert elapsed < 1.0
+
+
+def test_lookups_respeitam_o_prazo(stub, monkeypatch):
+    server, _ = stub
+    # Prazo de espera menor que a latência do stub (0,3 s), com o socket sem
+    # timeout próprio: quem encerra a espera é o prazo dos lookups
+    monkeypatch.setattr(DictClient, "wait_timeout", property(lambda self: 0.1))
+    client = _client(server, timeout=5.0, batch_window=0.0)
+    try:
+        start = time.monotonic()
+        with pytest.raises(DictUnavailable):
+            client.lookup_many([registered_key(index) for index in range(5)])
+        with pytest.raises(DictUnavailable):
+            client.lookup(registered_key(1))
+        assert time.monotonic() - start < 0.5
+    finally:
+        client.close()
+
+
+def test_lookup_async_sem_resposta_levanta_dict_unavailable(stub, monkeypatch):
+    server, _ = stub
+    monkeypatch.setattr(DictClient, "wait_timeout", property(lambda self: 0.1))
+    # Um lote de uma chave por vez: as demais esperam na fila além do prazo
+    client = _client(server, timeout=5.0, batch_window=0.0, max_concurrency=1, batch_max_keys=1)
+
+    async def run():
+        return await asyncio.gather(*(client.lookup_async(registered_key(index)) for index in range(4)),
+                                    return_exceptions=True)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        client.close()
+    assert results and all(isinstance(result, DictUnavailable) for result in results)
+
+
+def test_resposta_4xx_nao_abre_o_circuito(stub):
+    server, _ = stub
+    # Caminho inexistente no stub: todo lote recebe 404
+    client = DictClient(f"http://127.0.0.1:{server.server_port}/inexistente", batch_window=0.0,
+                        breaker=CircuitBreaker(failure_threshold=1))
+    try:
+        for _ in range(3):
+            with pytest.raises(DictRequestRejected):
+                client.lookup(registered_key(1))
+        assert client.breaker.state == CLOSED
+    finally:
+        client.close()
+
+
+def test_resposta_5xx_abre_o_circuito(stub):
+    server, state = stub
+    state.error_rate = 1.0
+    client = _client(server, batch_window=0.0, breaker=CircuitBreaker(failure_threshold=2))
+    try:
+        for _ in range(2):
+            with pytest.raises(DictUnavailable):
+                client.lookup(registered_key(1))
+        assert client.breaker.state == OPEN
+    finally:
+        client.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Benchmark dos métodos de explicação do serviço de inferência.
+#
+# Pontua um fluxo de transações do gerador de tráfego em lotes (como os do
+# MicroBatcher) e compara, por método, o custo adicional da explicação por
+# lote e por transação com a exatidão em relação aos valores SHAP exatos
+# (TreeSHAP path-dependent):
+#
+#   decision_path   atribuição pelo caminho de decisão (calculada com o score)
+#   tree_shap       tabelas TreeSHAP pré-computadas, sem cache
+#   cache r=N       cache por vetor quantizado com N cortes por feature
+#                   (0 = todos os thresholds, sem perda) e tabelas nas faltas
+#
+# A concordância é a fração dos --top fatores servidos presentes nos top
+# fatores exatos; o erro é o erro relativo L1 das contribuições. São as
+# mesmas medidas de ml_explanation_consistency e
+# ml_explanation_attribution_error (que usam EXPLANATION_TOP_FACTORS).
+#
+# Uso: python bench_explanations.py [--model /models/fraude_pix_principal/1.0]
+#      [--events 20000] [--batch 64] [--resolutions 0,64,32,16,8] [--top 3] [--output resultado.json]
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import numpy as np  # noqa: E402
+from bench_micro_batching import build_model  # noqa: E402
+from model.features import FeatureEncoder  # noqa: E402
+from model.train import synthetic_events  # noqa: E402
+from model.tree_ensemble import TreeEnsemble  # noqa: E402
+from serving.explanations import ExplanationEngine, consistency  # noqa: E402
+
+
+def batches(X, payloads, size):
+    for start in range(0, len(X), size):
+        yield X[start:start + size], payloads[start:start + size]
+
+
+def measure(name, X, payloads, exact, args, explain):
+    """Custo de explain por lote e exatidão das contribuições servidas."""
+    served = np.empty_like(exact)
+    elapsed = 0.0
+    cached = 0
+    for index, (X_batch, payload_batch) in enumerate(batches(X, payloads, args.batch)):
+        start = time.perf_counter()
+        contributions, methods = explain(X_batch, payload_batch)
+        elapsed += time.perf_counter() - start
+        served[index * args.batch:index * args.batch + len(X_batch)] = contributions
+        cached += sum(1 for method in methods if method == "tree_shap_cached")
+
+    agreement, error = zip(*(consistency(s, e, args.top) for s, e in zip(served, exact)))
+    n_batches = -(-len(X) // args.batch)
+    return {
+        "method": name,
+        "ms_per_batch": elapsed / n_batches * 1000,
+        "us_per_transaction": elapsed / len(X) * 1e6,
+        "cache_hit_ratio": cached / len(X),
+        "top_factor_agreement": float(np.mean(agreement)),
+        "attribution_error": float(np.mean(error)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo x exatidão das explicações")
+    parser.add_argument("--model", help="diretório do modelo (sem ele, um modelo é treinado)")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--resolutions", default="0,64,32,16,8")
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = args.model
+        if model_path is None:
+            model_path = os.path.join(directory, "bench")
+            print(f"Treinando modelo ({args.trees} árvores, profundidade {args.max_depth})...")
+            build_model(model_path, synthetic_events(60000, args.seed), args.trees, args.max_depth, args.seed)
+        model = TreeEnsemble.load(model_path, mmap=False)
+
+    encoder = FeatureEncoder.from_spec(model.metadata.get("features", {}))
+    # Sem transaction_id: as explicações não são guardadas para consulta
+    payloads = [{key: value for key, value in event.items() if key not in ("label", "transaction_id")}
+                for event in synthetic_events(args.events, args.seed + 1)]
+    X = encoder.encode(payloads)
+
+    reference = ExplanationEngine(model, "bench", encoder.raw_values, mode="shap", sample_rate=0)
+    reference.prepare()
+    exact = reference.tables.shap_values(X)
+    print(f"Modelo: {model.n_trees} árvores, profundidade {model.max_depth}; tabelas SHAP "
+          f"{reference.tables.nbytes / 2 ** 20:.1f} MB; {len(X)} transações em lotes de {args.batch}")
+
+    results = []
+
+    # decision_path sai junto com o score: o custo é o de
+    # predict_with_contributions menos o de predict
+    start = time.perf_counter()
+    for X_batch, _ in batches(X, payloads, args.batch):
+        model.predict(X_batch)
+    predict_ms = (time.perf_counter() - start) / -(-len(X) // args.batch) * 1000
+    result = measure("decision_path", X, payloads, exact, args,
+                     lambda X_batch, _: (model.predict_with_contributions(X_batch)[1],
+                                         ["decision_path"] * len(X_batch)))
+    result["ms_per_batch"] -= predict_ms
+    result["us_per_transaction"] = result["ms_per_batch"] * 1000 / args.batch
+    results.append(result)
+
+    results.append(measure("tree_shap", X, payloads, exact, args,
+                           lambda X_batch, _: (reference.tables.shap_values(X_batch),
+                                               ["tree_shap"] * len(X_batch))))
+
+    for resolution in (int(value) for value in args.resolutions.split(",")):
+        engine = ExplanationEngine(model, "bench", encoder.raw_values, mode="shap",
+                                   resolution=resolution, cache_size=len(X), sample_rate=0)
+        engine.prepare()
+        results.append(measure(f"cache r={resolution}", X, payloads, exact, args,
+                               lambda X_batch, payload_batch: engine.explain(X_batch, payload_batch, None)))
+
+    print(f"{'método':>14}{'ms/lote':>10}{'µs/transação':>14}{'acerto cache':>14}"
+          f"{'concordância':>14}{'erro L1':>10}")
+    for r in results:
+        print(f"{r['method']:>14}{r['ms_per_batch']:>10.2f}{r['us_per_transaction']:>14.1f}"
+              f"{r['cache_hit_ratio']:>14.1%}{r['top_factor_agreement']:>14.3f}{r['attribution_error']:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"events": len(X), "batch": args.batch, "trees": model.n_trees, "results": results}, f,
+                      indent=2)
+        print(f"Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Benchmark de vazão x latência do serviço de inferência com micro-batching.
+#
+# Sobe a aplicação de src/app.py no próprio processo (lifespan, middleware de
+# métricas, MicroBatcher e modelo real) e a chama diretamente pela interface
+# ASGI, sem servidor HTTP, com N clientes concorrentes em laço fechado durante
+# um período fixo. Repete para cada janela de agrupamento (0 = sem
+# micro-batching, lotes de uma requisição) e cada nível de concorrência, e
+# reporta requisições/s, p50/p99 e o tamanho médio dos lotes. O Push Gateway
+# é substituído pelo stub de bench_middleware_overhead.py.
+#
+# Sem --model, treina antes um modelo com transações do gerador de tráfego.
+#
+# Uso: python bench_micro_batching.py [--model /models/fraude_pix_principal/1.0]
+#      [--windows 0,0.5,1,2,5] [--concurrency 1,16,64,256] [--duration 3] [--output resultado.json]
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import numpy as np  # noqa: E402
+from app import create_app  # noqa: E402
+from middleware.metrics_pusher import MetricsPusher  # noqa: E402
+from model.features import FeatureEncoder  # noqa: E402
+from model.train import synthetic_events, train  # noqa: E402
+from serving.micro_batcher import inference_batch_size  # noqa: E402
+from bench_middleware_overhead import start_push_gateway_stub  # noqa: E402
+
+
+def build_model(path, events, trees, max_depth, seed):
+    encoder = FeatureEncoder.fit(events)
+    X = encoder.encode(events)
+    y = np.array([1.0 if event["label"]["is_fraud"] else 0.0 for event in events])
+    model = train(X, y, encoder.feature_names, trees=trees, max_depth=max_depth,
+                  metadata={"features": encoder.spec()})
+    model.save(path)
+
+
+async def _null_send(message):
+    pass
+
+
+def _batch_count():
+    return sum(sample.value for metric in inference_batch_size.collect()
+               for sample in metric.samples if sample.name.endswith("_count"))
+
+
+async def run_step(app, bodies, concurrency, duration):
+    latencies = []
+    stop_at = time.perf_counter() + duration
+
+    async def client(offset):
+        index = offset
+        while time.perf_counter() < stop_at:
+            body = bodies[index % len(bodies)]
+            index += concurrency
+
+            async def receive(body=body):
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            scope = {"type": "http", "method": "POST", "path": "/predict", "raw_path": b"/predict",
+                     "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+                     "headers": [(b"content-type", b"application/json")], "app": app}
+            start = time.perf_counter()
+            await app(scope, receive, _null_send)
+            latencies.append(time.perf_counter() - start)
+
+    batches_before = _batch_count()
+    started = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    batches = _batch_count() - batches_before
+
+    samples = np.array(latencies) * 1000
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_batch_size": len(latencies) / batches if batches else None,
+    }
+
+
+async def run_window(model_path, window_ms, bodies, args, pusher):
+    max_batch_size = 1 if window_ms == 0 else args.max_batch_size
+    root, version = os.path.split(os.path.normpath(model_path))
+    app = create_app(root, version=version, max_batch_size=max_batch_size, max_wait=window_ms / 1000,
+                     pusher=pusher, poll_interval=0)
+    results = []
+    async with app.router.lifespan_context(app):
+        # Aquecimento (imports tardios, caches do NumPy)
+        await run_step(app, bodies, 4, 0.3)
+        for concurrency in args.concurrency:
+            result = await run_step(app, bodies, concurrency, args.duration)
+            result.update(window_ms=window_ms, concurrency=concurrency)
+            results.append(result)
+            print(f"{window_ms:>10}{concurrency:>8}{result['requests_per_second']:>12.0f}"
+                  f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['mean_batch_size'] or 0:>12.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão x latência do micro-batching de inferência")
+    parser.add_argument("--model", help="diretório do modelo (sem ele, um modelo é treinado)")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--windows", default="0,0.5,1,2,5", help="janelas em ms; 0 = sem micro-batching")
+    parser.add_argument("--concurrency", default="1,16,64,256")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    events = synthetic_events(60000, args.seed)
+    bodies = [json.dumps({key: value for key, value in event.items() if key != "label"}).encode()
+              for event in events[:5000]]
+
+    gateway = start_push_gateway_stub()
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = args.model
+        if model_path is None:
+            model_path = os.path.join(directory, "bench")
+            print(f"Treinando modelo ({args.trees} árvores, profundidade {args.max_depth})...")
+            build_model(model_path, events, args.trees, args.max_depth, args.seed)
+
+        print(f"{'janela ms':>10}{'conc.':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'lote médio':>12}")
+        results = []
+        for window in args.windows.split(","):
+            pusher = MetricsPusher(f"127.0.0.1:{gateway.server_port}", interval=1.0)
+            results.extend(asyncio.run(run_window(model_path, float(window), bodies, args, pusher)))
+    gateway.shutdown()
+
+    output = {"duration_per_step_s": args.duration, "max_batch_size": args.max_batch_size,
+              "cpu_count": os.cpu_count(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# Benchmark e verificação de regressão do overhead do MetricsMiddleware.
+#
+# Envolve uma aplicação que não faz nada além do que um handler sempre faz
+# (decodificar o payload uma vez, deixando-o em request.state, e responder com
+# o header de veredito) com o middleware e compara com a mesma aplicação sem
+# middleware. Mede, por requisição, a latência adicionada (mediana, média e p99),
+# o CPU da thread do event loop e o pico de memória alocada (tracemalloc),
+# variando a cardinalidade dos rótulos (model_name/model_version distintos),
+# o tamanho do payload e se as regras adversariais disparam. São medidas as
+# duas versões do middleware: ASGI (ASGIMetricsMiddleware) e
+# request/response (MetricsMiddleware).
+#
+# O Push Gateway é substituído por um stub HTTP local, então o envio em
+# segundo plano acontece de verdade durante a medição, sem rede externa.
+#
+# Termina com código 1 quando algum cenário ultrapassa o orçamento
+# (--max-overhead-us, --max-alloc-bytes) ou, com --baseline, quando o overhead
+# piora mais que --max-regression em relação a um resultado salvo.
+#
+# Uso: python bench_middleware_overhead.py [--requests 5000] [--cardinality 1,100,5000]
+#      [--payload-sizes 512,4096,65536] [--output resultado.json] [--baseline base.json]
+import os
+import sys
+import gc
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import tracemalloc
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np  # noqa: E402
+from middleware.metrics_middleware import (  # noqa: E402
+    ASGIMetricsMiddleware, MetricsMiddleware, FRAUD_VERDICT_HEADER, REQUEST_PAYLOAD_STATE,
+    get_request_payload, set_fraud_verdict
+)
+from middleware.metrics_pusher import MetricsPusher  # noqa: E402
+
+# Requisições amostradas com o tracemalloc ativo (ele torna tudo mais lento)
+ALLOC_SAMPLE = 500
+
+
+class PushGatewayStub(BaseHTTPRequestHandler):
+    """Aceita qualquer push e apenas contabiliza requisições e bytes."""
+
+    pushes = 0
+    received_bytes = 0
+
+    def _accept(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        PushGatewayStub.pushes += 1
+        PushGatewayStub.received_bytes += len(body)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_PUT = do_POST = do_DELETE = _accept
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_push_gateway_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PushGatewayStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Payload de inferência com tamanho aproximado e disparo opcional das regras
+def build_payloads(count, cardinality, payload_size, adversarial):
+    bodies = []
+    for index in range(count):
+        series = index % cardinality
+        payload = {
+            "transaction_id": str(uuid.uuid4()),
+            "model_name": f"fraude_pix_{series}",
+            "model_version": f"1.{series % 10}",
+            "amount": 150000.0 if adversarial else 1523.47,
+            "channel": "PIX",
+            "time": "2025-05-13T02:41:09",
+            "payer": {"pix_key": "+5511987654321", "bank_code": "341", "account_age_days": 812},
+            "payee": {"pix_key": "fulano@example.com", "bank_code": "260", "account_age_days": 14},
+            "history": {"tx_count_24h": 7, "tx_amount_24h": 4210.9, "distinct_payees_7d": 5},
+        }
+        body = json.dumps(payload)
+        padding = payload_size - len(body)
+        if padding > 0:
+            # Histórico recente como preenchimento, para payloads maiores
+            event = {"amount": 87.5, "payee_bank": "260", "ts": "2025-05-12T19:03:11"}
+            event_size = len(json.dumps(event)) + 2
+            payload["history"]["events"] = [event] * (padding // event_size)
+            body = json.dumps(payload)
+        bodies.append(body.encode())
+    return bodies
+
+
+#################################################################
+# APLICAÇÕES SEM TRABALHO
+#################################################################
+
+RESPONSE_START = {
+    "type": "http.response.start",
+    "status": 200,
+    "headers": [(b"content-type", b"application/json"), (FRAUD_VERDICT_HEADER.encode(), b"legitimate")],
+}
+RESPONSE_BODY = {"type": "http.response.body", "body": b'{"is_fraud": false}'}
+
+
+async def noop_asgi_app(scope, receive, send):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    # Como get_request_payload em um handler Starlette
+    scope.setdefault("state", {})[REQUEST_PAYLOAD_STATE] = json.loads(b"".join(chunks))
+    await send(RESPONSE_START)
+    await send(RESPONSE_BODY)
+
+
+async def noop_request_app(request):
+    await get_request_payload(request)
+    return set_fraud_verdict(SimpleNamespace(headers={}), False)
+
+
+class BenchRequest:
+    """Requisição mínima no formato usado por MetricsMiddleware."""
+
+    def __init__(self, body):
+        self._body = body
+        self.state = SimpleNamespace()
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+async def _null_send(message):
+    pass
+
+
+def asgi_call(app):
+    async def call(body):
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+        scope = {"type": "http", "method": "POST", "path": "/predict", "headers": []}
+        await app(scope, receive, _null_send)
+    return call
+
+
+def request_call(app):
+    async def call(body):
+        await app(BenchRequest(body))
+    return call
+
+
+#################################################################
+# MEDIÇÃO
+#################################################################
+
+def _summary(latencies, cpu, peaks):
+    return {
+        "latency_us_p50": float(np.percentile(latencies, 50) * 1e6),
+        "latency_us_mean": float(latencies.mean() * 1e6),
+        "latency_us_p99": float(np.percentile(latencies, 99) * 1e6),
+        "cpu_us_per_request": float(cpu.mean() * 1e6),
+        # Mediana: o tracemalloc também conta alocações da thread de envio
+        "peak_alloc_bytes_per_request": float(np.median(peaks)),
+    }
+
+
+async def measure(bare_call, wrapped_call, bodies):
+    """
+    Executa cada requisição alternadamente sem e com o middleware, para que
+    variações da máquina ao longo da medição afetem os dois lados igualmente.
+    """
+    calls = (bare_call, wrapped_call)
+    latencies = np.empty((2, len(bodies)))
+    cpu = np.empty((2, len(bodies)))
+    # Sem coletas do gc no meio da medição, como no timeit
+    gc.collect()
+    gc.disable()
+    for index, body in enumerate(bodies):
+        for side, call in enumerate(calls):
+            cpu_start = time.thread_time()
+            start = time.perf_counter()
+            await call(body)
+            latencies[side, index] = time.perf_counter() - start
+            cpu[side, index] = time.thread_time() - cpu_start
+        if index % 256 == 0:
+            # Deixar a tarefa de envio do pusher rodar, como em um servidor real
+            await asyncio.sleep(0)
+    gc.enable()
+
+    peaks = ([], [])
+    tracemalloc.start()
+    for body in bodies[:ALLOC_SAMPLE]:
+        for side, call in enumerate(calls):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await call(body)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[side].append(peak - baseline)
+    tracemalloc.stop()
+
+    return tuple(_summary(latencies[side], cpu[side], peaks[side]) for side in (0, 1))
+
+
+async def run_scenarios(args, pusher):
+    variants = {
+        "asgi": (asgi_call(noop_asgi_app), asgi_call(ASGIMetricsMiddleware(noop_asgi_app, pusher=pusher))),
+        "request": (request_call(noop_request_app),
+                    request_call(MetricsMiddleware(noop_request_app, pusher=pusher))),
+    }
+    results = []
+    for cardinality in [int(value) for value in args.cardinality.split(",")]:
+        for payload_size in [int(value) for value in args.payload_sizes.split(",")]:
+            for adversarial in (False, True):
+                bodies = build_payloads(args.requests, cardinality, payload_size, adversarial)
+                for variant, (bare_call, wrapped_call) in variants.items():
+                    # Aquecimento: cria os children e preenche os caches de rótulos
+                    for body in bodies[:cardinality]:
+                        await wrapped_call(body)
+                    bare, wrapped = await measure(bare_call, wrapped_call, bodies)
+                    result = {
+                        "variant": variant,
+                        "cardinality": cardinality,
+                        "payload_bytes": len(bodies[0]),
+                        "adversarial": adversarial,
+                        "bare": bare,
+                        "middleware": wrapped,
+                        "overhead_us_p50": wrapped["latency_us_p50"] - bare["latency_us_p50"],
+                        "overhead_us_mean": wrapped["latency_us_mean"] - bare["latency_us_mean"],
+                        "overhead_us_p99": wrapped["latency_us_p99"] - bare["latency_us_p99"],
+                        "overhead_cpu_us": wrapped["cpu_us_per_request"] - bare["cpu_us_per_request"],
+                        "overhead_alloc_bytes": (wrapped["peak_alloc_bytes_per_request"]
+                                                 - bare["peak_alloc_bytes_per_request"]),
+                    }
+                    results.append(result)
+                    print(f"{variant:<9}{cardinality:>7}{result['payload_bytes']:>9}{str(adversarial):>7}"
+                          f"{result['overhead_us_p50']:>12.2f}{result['overhead_us_mean']:>12.2f}"
+                          f"{result['overhead_us_p99']:>12.2f}"
+                          f"{result['overhead_cpu_us']:>12.2f}{result['overhead_alloc_bytes']:>12.0f}",
+                          flush=True)
+    await pusher.stop(flush=True)
+    return results
+
+
+def scenario_key(result):
+    return (result["variant"], result["cardinality"], result["payload_bytes"], result["adversarial"])
+
+
+def check_budget(results, args):
+    violations = []
+    for result in results:
+        name = "{}/card={}/payload={}/adv={}".format(*scenario_key(result))
+        if result["overhead_us_p50"] > args.max_overhead_us:
+            violations.append(f"{name}: overhead mediano {result['overhead_us_p50']:.2f} us "
+                              f"> {args.max_overhead_us} us")
+        if result["overhead_alloc_bytes"] > args.max_alloc_bytes:
+            violations.append(f"{name}: alocação {result['overhead_alloc_bytes']:.0f} B "
+                              f"> {args.max_alloc_bytes} B")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            previous = {scenario_key(result): result for result in json.load(baseline_file)["scenarios"]}
+        for result in results:
+            before = previous.get(scenario_key(result))
+            if before is None or before["overhead_us_p50"] <= 0:
+                continue
+            regression = result["overhead_us_p50"] / before["overhead_us_p50"] - 1
+            if regression > args.max_regression:
+                name = "{}/card={}/payload={}/adv={}".format(*scenario_key(result))
+                violations.append(f"{name}: overhead {regression:+.0%} em relação ao baseline")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do overhead por requisição do MetricsMiddleware")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--cardinality", default="1,100,5000")
+    parser.add_argument("--payload-sizes", default="512,4096,65536")
+    parser.add_argument("--max-overhead-us", type=float, default=200.0,
+                        help="orçamento de latência mediana adicionada por requisição")
+    parser.add_argument("--max-alloc-bytes", type=float, default=16384,
+                        help="orçamento de pico de memória adicionada por requisição")
+    parser.add_argument("--baseline", help="resultado anterior para verificação de regressão")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="piora relativa máxima do overhead em relação ao baseline")
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    stub = start_push_gateway_stub()
+    pusher = MetricsPusher(f"127.0.0.1:{stub.server_address[1]}", interval=0.2)
+
+    print(f"{'versão':<9}{'card.':>7}{'payload':>9}{'adv.':>7}{'Δ p50 us':>12}{'Δ média us':>12}{'Δ p99 us':>12}"
+          f"{'Δ CPU us':>12}{'Δ alloc B':>12}")
+    results = asyncio.run(run_scenarios(args, pusher))
+    stub.shutdown()
+
+    report = {
+        "requests": args.requests,
+        "push_gateway_stub": {"pushes": PushGatewayStub.pushes, "bytes": PushGatewayStub.received_bytes},
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    print(f"\nPushes recebidos pelo stub: {PushGatewayStub.pushes}")
+
+    violations = check_budget(results, args)
+    if violations:
+        print("\nOrçamento de overhead excedido:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("Overhead dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Benchmark da troca de versões de modelo sob carga.
+#
+# Sobe a aplicação de src/app.py no próprio processo com um registro de
+# modelos em diretório temporário e mantém N clientes concorrentes em laço
+# fechado chamando /predict pela interface ASGI. Durante a carga publica
+# novas versões no diretório (cópia de modelos treinados antes) e as ativa
+# com POST /models/reload, alternando entre elas. Reporta, por troca, a
+# duração da carga e do aquecimento, o pico de memória residente, a latência
+# p99 na janela da troca e as versões que responderam; ao final, requisições
+# com erro (devem ser zero) e a latência fora das trocas.
+#
+# Uso: python bench_model_swap.py [--swaps 6] [--concurrency 64] [--trees 200]
+#      [--max-depth 6] [--output resultado.json]
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import numpy as np  # noqa: E402
+from app import create_app  # noqa: E402
+from middleware.metrics_pusher import MetricsPusher  # noqa: E402
+from bench_micro_batching import build_model  # noqa: E402
+from bench_middleware_overhead import start_push_gateway_stub  # noqa: E402
+from model.train import synthetic_events  # noqa: E402
+
+
+async def call(app, method, path, body=b""):
+    """Requisição ASGI; retorna (status, corpo)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+             "headers": [(b"content-type", b"application/json")], "app": app}
+    await app(scope, receive, send)
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+async def run(args, root, sources, bodies, pusher):
+    app = create_app(root, max_batch_size=args.max_batch_size, pusher=pusher, poll_interval=0)
+    samples = []  # (fim, latência, status, versão)
+    stop = asyncio.Event()
+
+    async def client(offset):
+        index = offset
+        while not stop.is_set():
+            start = time.perf_counter()
+            status, body = await call(app, "POST", "/predict", bodies[index % len(bodies)])
+            end = time.perf_counter()
+            version = json.loads(body).get("model_version") if status == 200 else None
+            samples.append((end, end - start, status, version))
+            index += args.concurrency
+
+    swaps = []
+    async with app.router.lifespan_context(app):
+        clients = [asyncio.get_running_loop().create_task(client(offset)) for offset in range(args.concurrency)]
+        await asyncio.sleep(args.interval)
+        for swap in range(args.swaps):
+            version = f"2.{swap}"
+            # Publicação como faria o pipeline de treino: cópia em diretório
+            # temporário e rename atômico para o registro
+            staging = os.path.join(root, f".{version}.tmp")
+            shutil.copytree(sources[swap % len(sources)], staging)
+            os.rename(staging, os.path.join(root, version))
+
+            requested = time.perf_counter()
+            status, body = await call(app, "POST", "/models/reload", json.dumps({"version": version}).encode())
+            swapped = time.perf_counter()
+            active = json.loads(body)["active"]
+            swaps.append({"version": version, "status": status, "requested": requested, "swapped": swapped,
+                          "reload_seconds": swapped - requested, **active["load"]})
+            await asyncio.sleep(args.interval)
+        stop.set()
+        await asyncio.gather(*clients)
+
+    results = []
+    for swap in swaps:
+        window = [s for s in samples if swap["requested"] <= s[0] <= swap["swapped"] + 0.5]
+        latencies = np.array([s[1] for s in window]) * 1000
+        results.append({
+            "version": swap["version"], "status": swap["status"],
+            "reload_ms": round(swap["reload_seconds"] * 1000, 1),
+            "load_ms": round(swap["load_seconds"] * 1000, 1),
+            "warmup_ms": round(swap["warmup_seconds"] * 1000, 1),
+            "peak_rss_mb": round(swap["peak_rss_bytes"] / 2 ** 20, 1),
+            "rss_delta_mb": round(swap["rss_delta_bytes"] / 2 ** 20, 1),
+            "p99_ms_during_swap": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            "versions_served": dict(Counter(s[3] for s in window)),
+        })
+
+    in_swap = [(swap["requested"], swap["swapped"] + 0.5) for swap in swaps]
+    steady = np.array([s[1] for s in samples
+                       if not any(start <= s[0] <= end for start, end in in_swap)]) * 1000
+    return results, {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[2] != 200),
+        "p50_ms_steady": float(np.percentile(steady, 50)),
+        "p99_ms_steady": float(np.percentile(steady, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Troca de versões de modelo sob carga")
+    parser.add_argument("--swaps", type=int, default=6)
+    parser.add_argument("--interval", type=float, default=1.5, help="segundos entre trocas")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    events = synthetic_events(60000, args.seed)
+    bodies = [json.dumps({key: value for key, value in event.items() if key != "label"}).encode()
+              for event in events[:5000]]
+
+    gateway = start_push_gateway_stub()
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "registry")
+        sources = [os.path.join(directory, "a"), os.path.join(directory, "b")]
+        print(f"Treinando 2 modelos ({args.trees} árvores, profundidade {args.max_depth})...")
+        build_model(sources[0], events[:30000], args.trees, args.max_depth, args.seed)
+        build_model(sources[1], events[30000:], args.trees, args.max_depth, args.seed)
+        shutil.copytree(sources[0], os.path.join(root, "1.0"))
+
+        pusher = MetricsPusher(f"127.0.0.1:{gateway.server_port}", interval=1.0)
+        results, summary = asyncio.run(run(args, root, sources, bodies, pusher))
+    gateway.shutdown()
+
+    print(f"{'versão':>8}{'troca ms':>10}{'carga ms':>10}{'aquec. ms':>11}{'pico RSS MB':>13}"
+          f"{'+RSS MB':>9}{'p99 ms':>9}  versões que responderam")
+    for r in results:
+        print(f"{r['version']:>8}{r['reload_ms']:>10}{r['load_ms']:>10}{r['warmup_ms']:>11}{r['peak_rss_mb']:>13}"
+              f"{r['rss_delta_mb']:>9}{r['p99_ms_during_swap'] or 0:>9.1f}  {r['versions_served']}")
+    print(f"Requisições: {summary['requests']}, erros: {summary['errors']}, fora das trocas "
+          f"p50 {summary['p50_ms_steady']:.1f} ms / p99 {summary['p99_ms_steady']:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"concurrency": args.concurrency, "trees": args.trees, "summary": summary,
+                       "swaps": results}, f, indent=2)
+        print(f"Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
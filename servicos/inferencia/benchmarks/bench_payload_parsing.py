@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Benchmark do custo de decodificação de payloads no MetricsMiddleware.
+#
+# Compara o fluxo anterior (handler decodifica a requisição, o middleware
+# decodifica de novo a requisição e também o corpo da resposta) com o fluxo de
+# decodificação única (payload compartilhado via request.state e veredito lido
+# do header da resposta). Reporta CPU e alocações por requisição.
+#
+# Uso: python bench_payload_parsing.py [--requests 20000]
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from middleware.metrics_middleware import (  # noqa: E402
+    get_request_payload, set_fraud_verdict, get_inference_result
+)
+
+
+# Payload típico de uma transação Pix enviada para inferência
+def build_pix_payload():
+    return {
+        "transaction_id": str(uuid.uuid4()),
+        "model_name": "fraude_pix_principal",
+        "model_version": "1.0",
+        "amount": 1523.47,
+        "channel": "PIX",
+        "transaction_type": "p2p",
+        "time": "2025-05-13T02:41:09",
+        "payer": {"pix_key": "+5511987654321", "bank_code": "341", "account_age_days": 812},
+        "payee": {"pix_key": "fulano@example.com", "bank_code": "260", "account_age_days": 14},
+        "device": {"fingerprint": uuid.uuid4().hex, "os": "android", "known": False},
+        "history": {"tx_count_24h": 7, "tx_amount_24h": 4210.9, "distinct_payees_7d": 5},
+    }
+
+
+def build_response_body(is_fraud):
+    return json.dumps({
+        "transaction_id": str(uuid.uuid4()),
+        "is_fraud": is_fraud,
+        "fraud_score": 0.91 if is_fraud else 0.07,
+        "explainability": {"top_factors": [
+            {"feature": "transaction_amount", "importance": 0.3, "value": 1523.47},
+            {"feature": "user_history", "importance": 0.25, "value": "limited"},
+            {"feature": "transaction_time", "importance": 0.2, "value": "off_hours"},
+        ]},
+    }).encode()
+
+
+class FakeRequest:
+    """Requisição mínima: cada chamada a json() decodifica o corpo novamente."""
+
+    def __init__(self, body):
+        self._body = body
+        self.state = SimpleNamespace()
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+        self.headers = {}
+
+
+async def legacy_path(request, response_body):
+    # Handler decodifica a requisição
+    payload = await request.json()
+    response = FakeResponse(response_body)
+    # Middleware decodifica a requisição e o corpo da resposta novamente
+    request_data = await request.json()
+    result = "fraud" if json.loads(response.body).get("is_fraud", False) else "legitimate"
+    return payload, request_data.get("model_name"), result
+
+
+async def single_parse_path(request, response_body):
+    # Middleware decodifica uma vez; o handler reutiliza o payload
+    request_data = await get_request_payload(request)
+    payload = await get_request_payload(request)
+    response = set_fraud_verdict(FakeResponse(response_body), is_fraud=True)
+    result = get_inference_result(response)
+    return payload, request_data.get("model_name"), result
+
+
+def run_sync(coro):
+    # Os caminhos medidos nunca suspendem; executá-los sem event loop evita
+    # que o custo do loop contamine a medição
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("caminho medido suspendeu inesperadamente")
+
+
+def measure(path, bodies, response_body):
+    # CPU por requisição
+    cpu_start = time.process_time()
+    for body in bodies:
+        run_sync(path(FakeRequest(body), response_body))
+    cpu = (time.process_time() - cpu_start) / len(bodies)
+
+    # Pico de memória alocada por requisição
+    sample = bodies[:1000]
+    tracemalloc.start()
+    peaks = []
+    for body in sample:
+        request = FakeRequest(body)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = run_sync(path(request, response_body))
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - baseline)
+        del result
+    tracemalloc.stop()
+
+    return {
+        "cpu_us_per_request": cpu * 1e6,
+        "peak_alloc_bytes_per_request": sum(peaks) / len(peaks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de decodificação de payloads no MetricsMiddleware")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    bodies = [json.dumps(build_pix_payload()).encode() for _ in range(args.requests)]
+    response_body = build_response_body(is_fraud=True)
+
+    results = {
+        "legacy": measure(legacy_path, bodies, response_body),
+        "single_parse": measure(single_parse_path, bodies, response_body),
+    }
+
+    print(f"{'fluxo':<14}{'CPU/req (us)':>14}{'alocado/req (B)':>18}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['cpu_us_per_request']:>14.2f}"
+              f"{result['peak_alloc_bytes_per_request']:>18.0f}")
+
+    reduction = 1 - results["single_parse"]["cpu_us_per_request"] / results["legacy"]["cpu_us_per_request"]
+    print(f"\nRedução de CPU por requisição: {reduction:.1%}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
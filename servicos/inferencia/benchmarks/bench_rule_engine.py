@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Micro-benchmark do motor de regras adversariais.
+#
+# Mede o custo por requisição do motor compilado (adversarial_rules.RuleEngine)
+# à medida que o número de regras cresce, comparado com a interpretação regra a
+# regra das mesmas condições (equivalente às cadeias de if anteriores).
+#
+# Uso: python bench_rule_engine.py [--requests 20000] [--rules 3,50,100,200,400,800]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from middleware.adversarial_rules import (  # noqa: E402
+    OPERATORS, SEVERITY_LEVELS, RuleEngine, load_rules_spec, RULES_PATH
+)
+
+FIELDS = {
+    "amount": (10, 2000000),
+    "hour": (0, 23),
+    "history.tx_count_24h": (0, 200),
+    "payee.account_age_days": (0, 3650),
+}
+
+
+def synthetic_spec(rule_count, rng):
+    """
+    Regras sintéticas no mesmo formato do arquivo adversarial_rules.json. Como
+    regras reais, cada uma mira uma cauda ou janela estreita das features e
+    casa com poucas transações.
+    """
+    spec = load_rules_spec(RULES_PATH)
+    rules = list(spec["rules"])
+    while len(rules) < rule_count:
+        when = {}
+        for field in rng.sample(sorted(FIELDS), rng.randint(1, 3)):
+            low, high = FIELDS[field]
+            span = high - low
+            kind = rng.random()
+            if kind < 0.3:
+                start = rng.uniform(low, high)
+                when[field] = {"between": [start, start + span * 0.02]}
+            elif kind < 0.8:
+                when[field] = {rng.choice([">", ">="]): low + span * rng.uniform(0.9, 1.0)}
+            else:
+                when[field] = {rng.choice(["<", "<="]): low + span * rng.uniform(0.0, 0.1)}
+        rule = {"id": f"sintetica_{len(rules)}", "when": when}
+        if rng.random() < 0.5:
+            rule["attack_type"] = rng.choice(["amount_manipulation", "evasion_attack", "input_manipulation"])
+        if rng.random() < 0.5:
+            rule["severity"] = rng.choice(SEVERITY_LEVELS)
+        rules.append(rule)
+    spec["rules"] = rules[:rule_count]
+    return spec
+
+
+def synthetic_payloads(count, rng):
+    base = datetime.datetime(2025, 5, 13)
+    return [{
+        "amount": rng.uniform(10, 2000000),
+        "time": (base + datetime.timedelta(minutes=rng.randint(0, 1439))).isoformat(),
+        "history": {"tx_count_24h": rng.randint(0, 200)},
+        "payee": {"account_age_days": rng.randint(0, 3650)},
+    } for _ in range(count)]
+
+
+def interpreted_evaluator(spec):
+    """Avaliação regra a regra, sem compilação, como referência."""
+    rules = []
+    for rule in spec["rules"]:
+        conditions = []
+        for field, field_spec in rule["when"].items():
+            for op, limit in field_spec.items():
+                if op == "between":
+                    conditions.append((field, OPERATORS[">="], limit[0]))
+                    conditions.append((field, OPERATORS["<="], limit[1]))
+                else:
+                    conditions.append((field, OPERATORS[op], limit))
+        rules.append((rule, conditions))
+
+    def evaluate(request_data):
+        features = {
+            "amount": request_data.get("amount"),
+            "hour": datetime.datetime.fromisoformat(request_data["time"]).hour,
+            "history.tx_count_24h": request_data["history"]["tx_count_24h"],
+            "payee.account_age_days": request_data["payee"]["account_age_days"],
+        }
+        matched = [rule for rule, conditions in rules
+                   if all(op(features[field], limit) for field, op, limit in conditions)]
+        attack_type = next((rule["attack_type"] for rule in matched if "attack_type" in rule), "unknown")
+        severities = [SEVERITY_LEVELS.index(rule["severity"]) for rule in matched if "severity" in rule]
+        severity = SEVERITY_LEVELS[max(severities)] if severities else "medium"
+        return bool(matched), attack_type, severity
+
+    return evaluate
+
+
+def per_request_us(evaluate, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        evaluate(payload)
+    return (time.perf_counter() - start) / len(payloads) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de regras adversariais")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rules", default="3,50,100,200,400,800")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = synthetic_payloads(args.requests, rng)
+
+    results = []
+    print(f"{'regras':>8}{'compilado (us)':>18}{'interpretado (us)':>20}")
+    for rule_count in [int(value) for value in args.rules.split(",")]:
+        spec = synthetic_spec(rule_count, rng)
+        engine = RuleEngine(spec=spec)
+        compiled_us = per_request_us(engine.evaluate, payloads)
+        interpreted_us = per_request_us(interpreted_evaluator(spec), payloads)
+        results.append({"rules": rule_count, "compiled_us": compiled_us, "interpreted_us": interpreted_us})
+        print(f"{rule_count:>8}{compiled_us:>18.2f}{interpreted_us:>20.2f}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
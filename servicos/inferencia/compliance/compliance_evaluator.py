@@ -1,18 +1,97 @@
 import os
 import time
-import schedule
+import asyncio
 import datetime
-from prometheus_client import Gauge, push_to_gateway
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from prometheus_client import CollectorRegistry, Counter, Gauge, push_to_gateway
+
+from compliance_registry import ComplianceRegistry, ResultCache
+from compliance_scheduler import ComplianceScheduler, json_response
+from compliance_publisher import PUSH_TIMEOUT_SECONDS, gzip_retry_handler, metrics_route
+# Cópia de modules/monitoring/ml_metrics_exporter/compliance_history.py (o
+# serviço é empacotado sem o exporter); testes/test_vendored_modules.py
+# verifica que as duas cópias continuam idênticas
+from compliance_history import ComplianceHistory, query_from_params
 
 # Configuração
 PUSH_GATEWAY_URL = os.getenv("PUSH_GATEWAY_URL", "prometheus-pushgateway:9091")
 JOB_NAME = "compliance_evaluator"
 
+# Execução das verificações: limite da avaliação inteira e verificações
+# executadas em paralelo (o timeout de cada uma é declarado no registro)
+EVALUATION_TIMEOUT_SECONDS = float(os.getenv("COMPLIANCE_EVALUATION_TIMEOUT", "120"))
+CHECK_WORKERS = int(os.getenv("COMPLIANCE_CHECK_WORKERS", "8"))
+
+# Publicação das métricas: push (Push Gateway), pull (GET /metrics) ou both
+METRICS_MODE = os.getenv("COMPLIANCE_METRICS_MODE", "push")
+
+# Porta do servidor HTTP (POST /evaluate, GET /schedule e, no modo pull,
+# GET /metrics); 0 desativa
+HTTP_PORT = int(os.getenv("COMPLIANCE_HTTP_PORT", "8090"))
+
+# Histórico de scores (SQLite), consultado em GET /history
+HISTORY_PATH = os.getenv("COMPLIANCE_HISTORY_PATH", "/tmp/compliance_history.db")
+
+# Declaração das verificações (artigo, requisito, peso, intervalo, entradas)
+CHECKS_CONFIG_PATH = os.getenv(
+    "COMPLIANCE_CHECKS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "compliance_checks.json")
+)
+
+# Registry próprio: o push e o /metrics levam só as métricas de compliance,
+# sem os coletores de processo e plataforma do registry padrão
+metrics_registry = CollectorRegistry()
+
+compliance_history = ComplianceHistory(HISTORY_PATH)
+
 # Métricas de compliance
 bcb_compliance_score = Gauge(
     'bcb_403_compliance_score',
     'Nível de conformidade com a Resolução BCB n° 403',
-    ['article_number', 'requirement_type']
+    ['article_number', 'requirement_type'],
+    registry=metrics_registry
+)
+
+last_evaluation_timestamp = Gauge(
+    'bcb_403_compliance_last_evaluation_timestamp_seconds',
+    'Momento (Unix) da última avaliação de compliance publicada',
+    registry=metrics_registry
+)
+
+compliance_push_attempts = Counter(
+    'bcb_403_compliance_push_attempts_total',
+    'Tentativas de envio das métricas de compliance ao Push Gateway',
+    ['status'],
+    registry=metrics_registry
+)
+
+compliance_check_duration = Gauge(
+    'bcb_403_compliance_check_duration_seconds',
+    'Duração da última execução de cada verificação de compliance',
+    ['article_number', 'requirement_type'],
+    registry=metrics_registry
+)
+
+article_compliance_score = Gauge(
+    'bcb_403_article_compliance_score',
+    'Conformidade por artigo: média dos requisitos ponderada pelos pesos declarados',
+    ['article_number'],
+    registry=metrics_registry
+)
+
+compliance_check_cache_hits = Counter(
+    'bcb_403_compliance_check_cache_hits_total',
+    'Verificações não executadas por terem resultado em cache ainda válido',
+    ['article_number', 'requirement_type'],
+    registry=metrics_registry
+)
+
+compliance_check_failures = Counter(
+    'bcb_403_compliance_check_failures_total',
+    'Verificações de compliance que terminaram sem resultado (score 0)',
+    ['article_number', 'requirement_type', 'reason'],
+    registry=metrics_registry
 )
 
 # Função para verificar monitoramento em tempo real
@@ -120,48 +199,231 @@ def check_anomaly_detection():
         print(f"Erro ao verificar detecção de anomalias: {str(e)}")
         return 0.0
 
+#################################################################
+# EXECUÇÃO DAS VERIFICAÇÕES
+#################################################################
+
+CheckResult = namedtuple("CheckResult", ["check", "score", "duration", "failure_reason"])
+
+# Verificações declaradas no arquivo de configuração e em entry points de
+# outros pacotes; funções sem módulo são procuradas neste arquivo
+check_registry = ComplianceRegistry()
+check_registry.load_file(CHECKS_CONFIG_PATH, namespace=globals())
+check_registry.load_entry_points()
+
+# Resultados reaproveitados enquanto as entradas não mudam e não expiram
+result_cache = ResultCache()
+
+# Último resultado de cada verificação: avaliações parciais publicam as demais
+# com o valor anterior e usam os scores das dependências que não rodaram
+last_results = {}
+
+# Pool compartilhado entre avaliações: uma verificação que excede o timeout
+# continua ocupando sua thread até terminar, sem bloquear a avaliação
+check_executor = ThreadPoolExecutor(max_workers=CHECK_WORKERS, thread_name_prefix="compliance-check")
+
+# Última execução de cada verificação, para não empilhar execuções travadas
+_running_checks = {}
+
+def _run_check(index, check, started):
+    started[index] = time.monotonic()
+    score = check.func()
+    return score, time.monotonic() - started[index]
+
+def run_checks(checks, executor=None, evaluation_timeout=EVALUATION_TIMEOUT_SECONDS):
+    """
+    Executa as verificações em paralelo e retorna um CheckResult por
+    verificação, na ordem recebida.
+
+    O timeout de cada verificação conta a partir do seu início real (não da
+    submissão), e nenhuma passa do limite da avaliação. Verificações que
+    excedem o tempo, lançam exceção ou ainda estão rodando desde a avaliação
+    anterior recebem score 0 e o motivo em failure_reason.
+    """
+    executor = executor or check_executor
+    evaluation_deadline = time.monotonic() + evaluation_timeout
+    started = {}
+    results = {}
+    pending = {}
+
+    for index, check in enumerate(checks):
+        key = (check.article_number, check.requirement_type)
+        previous = _running_checks.get(key)
+        if previous is not None and not previous.done():
+            results[index] = CheckResult(check, 0.0, 0.0, "still_running")
+            continue
+        future = executor.submit(_run_check, index, check, started)
+        _running_checks[key] = future
+        pending[future] = index
+
+    while pending:
+        now = time.monotonic()
+        deadlines = []
+        for future, index in list(pending.items()):
+            if future.done():
+                continue
+            check = checks[index]
+            start = started.get(index)
+            deadline = evaluation_deadline if start is None else min(start + check.timeout, evaluation_deadline)
+            if now >= deadline:
+                # Verificações ainda na fila são canceladas; as que já
+                # começaram terminam em segundo plano e são descartadas
+                future.cancel()
+                del pending[future]
+                results[index] = CheckResult(check, 0.0, now - start if start else 0.0, "timeout")
+            else:
+                deadlines.append(deadline)
+
+        if not pending:
+            break
+        done, _ = wait(pending, timeout=max(0.0, min(deadlines, default=now) - now),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            check = checks[index]
+            try:
+                score, duration = future.result()
+                results[index] = CheckResult(check, float(score), duration, None)
+            except Exception as e:
+                print(f"Erro na verificação {check.requirement_type} (Art. {check.article_number}): {str(e)}")
+                duration = time.monotonic() - started.get(index, now)
+                results[index] = CheckResult(check, 0.0, duration, "error")
+
+    return [results[index] for index in range(len(checks))]
+
+# Função para publicar os resultados de uma avaliação
+def publish_results(results, executed, cached):
+    """
+    Atualiza os gauges de todos os resultados (novos, em cache e de avaliações
+    anteriores) e envia tudo em um único push. Falhas só são contabilizadas
+    para verificações executadas nesta avaliação, e só os resultados desta
+    avaliação (executados ou em cache) entram no histórico.
+    """
+    weighted = {}
+    for result in results:
+        check = result.check
+        labels = (check.article_number, check.requirement_type)
+        bcb_compliance_score.labels(*labels).set(result.score)
+        compliance_check_duration.labels(*labels).set(result.duration)
+        totals = weighted.setdefault(check.article_number, [0.0, 0.0])
+        totals[0] += check.weight * result.score
+        totals[1] += check.weight
+        if check.id in executed or check.id in cached:
+            compliance_history.record(
+                *labels, result.score, source=JOB_NAME,
+                details={"check": check.id, "failure_reason": result.failure_reason,
+                         "cached": check.id in cached, "duration": result.duration}
+            )
+        if check.id in cached:
+            compliance_check_cache_hits.labels(*labels).inc()
+        elif check.id in executed and result.failure_reason is not None:
+            compliance_check_failures.labels(*labels, result.failure_reason).inc()
+            print(f"Verificação {check.requirement_type} (Art. {check.article_number}) "
+                  f"sem resultado: {result.failure_reason}")
+
+    for article_number, (score, weight) in weighted.items():
+        article_compliance_score.labels(article_number).set(score / weight if weight else 0.0)
+
+    last_evaluation_timestamp.set(time.time())
+
+    # Enviar métricas para o Prometheus (PUT com gzip e novas tentativas)
+    if METRICS_MODE in ("push", "both"):
+        push_to_gateway(
+            PUSH_GATEWAY_URL,
+            job=JOB_NAME,
+            registry=metrics_registry,
+            timeout=PUSH_TIMEOUT_SECONDS,
+            handler=gzip_retry_handler(on_attempt=lambda status: compliance_push_attempts.labels(status).inc())
+        )
+
+# Função para selecionar as verificações de uma avaliação parcial
+def _selected_checks(check_ids):
+    """
+    Verificações informadas, as que dependem delas e as dependências que
+    ainda não têm resultado (necessárias para o fingerprint dos dependentes).
+    """
+    selected = check_registry.dependents(check_ids)
+    pending = list(selected)
+    while pending:
+        check = check_registry.checks[pending.pop()]
+        for dependency in check.depends_on:
+            if dependency not in selected and dependency not in last_results:
+                selected.add(dependency)
+                pending.append(dependency)
+    return selected
+
 # Função para executar avaliação de compliance
-def evaluate_compliance():
-    """Executa verificações de compliance e atualiza métricas do Prometheus."""
+def evaluate_compliance(check_ids=None, force=False):
+    """
+    Executa verificações de compliance e atualiza métricas do Prometheus.
+
+    As verificações rodam por nível de dependência, em paralelo dentro de cada
+    nível. Uma verificação só é executada se o fingerprint das suas entradas e
+    dos scores das suas dependências mudou ou se o resultado em cache passou
+    de max_age; force=True ignora o cache. Uma verificação cuja dependência
+    falhou recebe score 0 sem ser executada.
+
+    Com check_ids, só essas verificações e as que dependem delas são
+    avaliadas; as demais mantêm o último resultado.
+    """
     print(f"Iniciando avaliação de compliance: {datetime.datetime.now()}")
     
-    # Avaliar compliance com Art. 89 - Monitoramento em tempo real
-    monitoring_score = check_real_time_monitoring()
-    bcb_compliance_score.labels(
-        article_number="89",
-        requirement_type="monitoramento_tempo_real"
-    ).set(monitoring_score)
-    
-    # Avaliar compliance com Art. 89, Parágrafo Único - Bloqueio de contas suspeitas
-    blocking_score = check_suspicious_account_blocking()
-    bcb_compliance_score.labels(
-        article_number="89",
-        requirement_type="bloqueio_contas_suspeitas"
-    ).set(blocking_score)
-    
-    # Avaliar compliance com Art. 91 - Detecção de anomalias
-    anomaly_score = check_anomaly_detection()
-    bcb_compliance_score.labels(
-        article_number="91",
-        requirement_type="deteccao_anomalias"
-    ).set(anomaly_score)
+    now = time.time()
+    selected = None if check_ids is None else _selected_checks(check_ids)
+    checks = [check for level in check_registry.levels() for check in level
+              if selected is None or check.id in selected]
+    input_fingerprints = check_registry.input_fingerprints({name for check in checks for name in check.inputs})
+    results = dict(last_results)
+    executed = set()
+    cached = set()
+    for level in check_registry.levels():
+        to_run = []
+        for check in level:
+            if selected is not None and check.id not in selected:
+                continue
+            if any(results[dependency].failure_reason is not None for dependency in check.depends_on):
+                results[check.id] = CheckResult(check, 0.0, 0.0, "dependency_failed")
+                executed.add(check.id)
+                continue
+            fingerprint = check_registry.fingerprint(check, input_fingerprints, results)
+            cached_result = None if force else result_cache.lookup(check, fingerprint, now)
+            if cached_result is not None:
+                results[check.id] = cached_result
+                cached.add(check.id)
+            else:
+                to_run.append((check, fingerprint))
+        
+        # Verificações do nível em paralelo, cada uma limitada pelo seu timeout
+        for (check, fingerprint), result in zip(to_run, run_checks([check for check, _ in to_run])):
+            results[check.id] = result
+            executed.add(check.id)
+            result_cache.store(check, fingerprint, result, now)
     
-    # Enviar métricas para o Prometheus
-    push_to_gateway(PUSH_GATEWAY_URL, job=JOB_NAME, registry=None)
+    last_results.update(results)
+    publish_results(results.values(), executed, cached)
     
-    print(f"Avaliação de compliance concluída: {datetime.datetime.now()}")
+    print(f"Avaliação de compliance concluída: {datetime.datetime.now()} "
+          f"({len(executed)} executadas, {len(cached)} em cache)")
+    return executed
+
+# Função para consultar o histórico de scores
+def history_route(query, headers):
+    # GET /history?article=...&requirement=...&start=...&end=...[&bucket=1d]
+    body, status = query_from_params(compliance_history, {name: values[-1] for name, values in query.items()})
+    return json_response(status, body)
 
 # Agendar avaliações regulares
 def main():
-    # Executar imediatamente uma vez
-    evaluate_compliance()
-    
-    # Agendar execução diária
-    schedule.every().day.at("01:00").do(evaluate_compliance)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    # Avaliação inicial de todas as verificações e, depois, cada uma na sua
+    # agenda; SIGHUP ou POST /evaluate disparam uma reavaliação imediata
+    scheduler = ComplianceScheduler(check_registry, evaluate_compliance, http_port=HTTP_PORT)
+    if METRICS_MODE in ("pull", "both"):
+        scheduler.add_route("GET", "/metrics", metrics_route(metrics_registry))
+    scheduler.add_route("GET", "/history", history_route)
+    try:
+        asyncio.run(scheduler.run())
+    finally:
+        compliance_history.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,69 @@
+import os
+import gzip
+import time
+import random
+from urllib.error import HTTPError
+from urllib.request import Request, build_opener, HTTPHandler
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# Reenvio ao Push Gateway: tentativas extras, atraso inicial e máximo
+PUSH_RETRIES = int(os.getenv("COMPLIANCE_PUSH_RETRIES", "4"))
+PUSH_BACKOFF_SECONDS = float(os.getenv("COMPLIANCE_PUSH_BACKOFF", "1"))
+PUSH_MAX_BACKOFF_SECONDS = float(os.getenv("COMPLIANCE_PUSH_MAX_BACKOFF", "30"))
+PUSH_TIMEOUT_SECONDS = float(os.getenv("COMPLIANCE_PUSH_TIMEOUT", "10"))
+
+
+def gzip_retry_handler(retries=PUSH_RETRIES, backoff=PUSH_BACKOFF_SECONDS,
+                       max_backoff=PUSH_MAX_BACKOFF_SECONDS, on_attempt=None):
+    """
+    Handler para push_to_gateway que comprime o corpo com gzip e repete o
+    envio com backoff exponencial (com jitter) em falhas de rede e respostas
+    5xx. Respostas 4xx não são repetidas. Como push_to_gateway usa PUT, que
+    substitui o grupo inteiro, repetir um envio é idempotente.
+
+    on_attempt(status), se informado, é chamado a cada tentativa com
+    "success" ou "error".
+    """
+    def handler(url, method, timeout, headers, data):
+        def handle():
+            body = gzip.compress(data)
+            delay = backoff
+            for attempt in range(retries + 1):
+                request = Request(url, data=body, method=method)
+                for name, value in headers:
+                    request.add_header(name, value)
+                request.add_header("Content-Encoding", "gzip")
+                try:
+                    response = build_opener(HTTPHandler).open(request, timeout=timeout)
+                    if response.code >= 400:
+                        raise OSError(f"resposta {response.code} do Push Gateway")
+                    if on_attempt is not None:
+                        on_attempt("success")
+                    return
+                except Exception as e:
+                    if on_attempt is not None:
+                        on_attempt("error")
+                    client_error = isinstance(e, HTTPError) and e.code < 500
+                    if client_error or attempt == retries:
+                        raise
+                    print(f"Falha no push de métricas ({attempt + 1}/{retries + 1}): {str(e)}; "
+                          f"nova tentativa em {delay:.1f}s")
+                    time.sleep(delay * random.uniform(0.8, 1.2))
+                    delay = min(max_backoff, delay * 2)
+        return handle
+    return handler
+
+
+def metrics_route(registry):
+    """
+    Rota GET /metrics (formato de ComplianceScheduler.add_route) expondo
+    apenas o registry informado, com gzip quando o cliente aceita.
+    """
+    def handler(query, headers):
+        output = generate_latest(registry)
+        response_headers = {"Content-Type": CONTENT_TYPE_LATEST}
+        if "gzip" in headers.get("accept-encoding", ""):
+            output = gzip.compress(output)
+            response_headers["Content-Encoding"] = "gzip"
+        return 200, response_headers, output
+    return handler
@@ -0,0 +1,368 @@
+import os
+import re
+import json
+import hashlib
+import datetime
+import importlib
+from collections import namedtuple
+
+# Grupo de entry points com verificações de compliance de outros pacotes
+ENTRY_POINT_GROUP = "mlsecops.compliance_checks"
+
+# Padrões de uma verificação declarada sem o campo correspondente
+DEFAULT_TIMEOUT = os.getenv("COMPLIANCE_CHECK_TIMEOUT", "30s")
+DEFAULT_SCHEDULE = "24h"
+DEFAULT_MAX_AGE = "24h"
+
+ComplianceCheck = namedtuple(
+    "ComplianceCheck",
+    ["article_number", "requirement_type", "func", "timeout",
+     "id", "weight", "schedule", "depends_on", "inputs", "max_age"],
+    defaults=(None, 1.0, None, (), (), 0.0)
+)
+
+_DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value):
+    """Converte "90s", "15m", "6h", "1d" ou um número de segundos em segundos."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _DURATION_PATTERN.match(str(value))
+    if match is None:
+        raise ValueError(f"Duração inválida: {value!r}")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+#################################################################
+# AGENDAS DAS VERIFICAÇÕES
+#################################################################
+
+class IntervalSchedule:
+    """Execução a cada intervalo fixo ("15m", "6h", "1d")."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def next_run(self, after):
+        return after + self.seconds
+
+    def __repr__(self):
+        return f"IntervalSchedule({self.seconds:g}s)"
+
+
+# Limites de minuto, hora, dia do mês, mês e dia da semana (0 ou 7 = domingo)
+_CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/")
+            step = int(step)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-"))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Campo de cron inválido: {field!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    Expressão cron de cinco campos (minuto, hora, dia do mês, mês, dia da
+    semana) no horário local, com *, listas, intervalos e passos. Como no
+    cron, se dia do mês e dia da semana forem restritos, basta um casar.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron inválida: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _cron_field(field, *limits) for field, limits in zip(fields, _CRON_RANGES)
+        )
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._restricted_days = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        return (day or weekday) if self._restricted_days else (day and weekday)
+
+    def next_run(self, after):
+        moment = datetime.datetime.fromtimestamp(after).replace(second=0, microsecond=0)
+        moment += datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+        # Avança por mês, dia e hora inteiros quando o campo não casa
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Expressão cron sem próxima execução: {self.expression!r}")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+
+def parse_schedule(value):
+    """Agenda de uma verificação: duração ("1h") ou expressão cron ("0 1 * * *")."""
+    if isinstance(value, (IntervalSchedule, CronSchedule)):
+        return value
+    if isinstance(value, str) and len(value.split()) == 5:
+        return CronSchedule(value)
+    return IntervalSchedule(parse_duration(value))
+
+
+def _fingerprint(value):
+    encoded = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _resolve_callable(reference, namespace):
+    # "modulo:atributo" é importado; um nome simples é procurado no namespace
+    # de quem carregou a configuração (o próprio avaliador)
+    if ":" in reference:
+        module_name, attribute = reference.split(":", 1)
+        return getattr(importlib.import_module(module_name), attribute)
+    if namespace is None or reference not in namespace:
+        raise ValueError(f"Função de verificação não encontrada: {reference}")
+    return namespace[reference]
+
+
+#################################################################
+# ENTRADAS DAS VERIFICAÇÕES
+#################################################################
+
+def _file_input(path):
+    def read():
+        try:
+            with open(path, "rb") as input_file:
+                return hashlib.sha256(input_file.read()).hexdigest()
+        except FileNotFoundError:
+            return "missing"
+    return read
+
+
+def _env_input(name):
+    return lambda: os.environ.get(name)
+
+
+def _build_input(name, spec, base_dir, namespace):
+    if callable(spec):
+        return spec
+    if "file" in spec:
+        return _file_input(os.path.join(base_dir, spec["file"]))
+    if "env" in spec:
+        return _env_input(spec["env"])
+    if "function" in spec:
+        return _resolve_callable(spec["function"], namespace)
+    raise ValueError(f"Entrada {name} sem file, env ou function")
+
+
+#################################################################
+# REGISTRO
+#################################################################
+
+class ComplianceRegistry:
+    """
+    Verificações de compliance declaradas por artigo e requisito da
+    Resolução BCB n° 403.
+
+    Cada verificação declara artigo, requisito, função, timeout, peso no score
+    do artigo, agenda (schedule: intervalo ou expressão cron), idade máxima de um resultado
+    em cache (max_age), dependências (depends_on, ids de outras verificações)
+    e entradas (inputs). Entradas são valores nomeados (conteúdo de um arquivo,
+    variável de ambiente ou função) cujo fingerprint decide se o resultado
+    anterior da verificação ainda vale.
+
+    As verificações vêm de um arquivo JSON (load_file), de entry points do
+    grupo ENTRY_POINT_GROUP (load_entry_points) ou de register().
+    """
+
+    def __init__(self):
+        self.checks = {}
+        self.inputs = {}
+        self._levels = None
+
+    def register_input(self, name, provider):
+        self.inputs[name] = provider
+
+    def register(self, check):
+        check_id = check.id or f"{check.article_number}.{check.requirement_type}"
+        if check_id in self.checks:
+            raise ValueError(f"Verificação duplicada: {check_id}")
+        self.checks[check_id] = check._replace(
+            id=check_id,
+            timeout=parse_duration(check.timeout),
+            schedule=parse_schedule(check.schedule or DEFAULT_SCHEDULE),
+            max_age=parse_duration(check.max_age),
+            depends_on=tuple(check.depends_on),
+            inputs=tuple(check.inputs),
+        )
+        self._levels = None
+        return self.checks[check_id]
+
+    def register_spec(self, spec, namespace=None):
+        """Registra uma verificação a partir do formato declarativo (dict)."""
+        func = spec["function"]
+        return self.register(ComplianceCheck(
+            article_number=str(spec["article_number"]),
+            requirement_type=spec["requirement_type"],
+            func=func if callable(func) else _resolve_callable(func, namespace),
+            timeout=spec.get("timeout", DEFAULT_TIMEOUT),
+            id=spec.get("id"),
+            weight=float(spec.get("weight", 1.0)),
+            schedule=spec.get("schedule", DEFAULT_SCHEDULE),
+            depends_on=spec.get("depends_on", ()),
+            inputs=spec.get("inputs", ()),
+            max_age=spec.get("max_age", DEFAULT_MAX_AGE),
+        ))
+
+    def load_file(self, path, namespace=None):
+        """
+        Carrega entradas e verificações de um arquivo JSON. Nomes de função sem
+        módulo são procurados em namespace; caminhos de arquivo das entradas
+        são relativos ao arquivo de configuração.
+        """
+        with open(path) as config_file:
+            config = json.load(config_file)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        for name, spec in config.get("inputs", {}).items():
+            self.register_input(name, _build_input(name, spec, base_dir, namespace))
+        for spec in config.get("checks", []):
+            self.register_spec(spec, namespace)
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        """
+        Carrega verificações publicadas por outros pacotes. Cada entry point
+        aponta para um ComplianceCheck, um dict no formato declarativo ou uma
+        lista deles.
+        """
+        from importlib.metadata import entry_points
+        try:
+            discovered = entry_points(group=group)
+        except TypeError:
+            discovered = entry_points().get(group, [])
+        for entry_point in discovered:
+            loaded = entry_point.load()
+            for item in loaded if isinstance(loaded, list) else [loaded]:
+                if isinstance(item, ComplianceCheck):
+                    self.register(item)
+                else:
+                    self.register_spec(item)
+
+    def levels(self):
+        """
+        Verificações agrupadas em níveis de dependência: as de um nível só
+        dependem de verificações dos níveis anteriores e podem rodar em
+        paralelo.
+        """
+        if self._levels is not None:
+            return self._levels
+        for check in self.checks.values():
+            for name in check.inputs:
+                if name not in self.inputs:
+                    raise ValueError(f"Entrada desconhecida em {check.id}: {name}")
+            for dependency in check.depends_on:
+                if dependency not in self.checks:
+                    raise ValueError(f"Dependência desconhecida em {check.id}: {dependency}")
+
+        levels = []
+        placed = set()
+        remaining = dict(self.checks)
+        while remaining:
+            level = [check for check in remaining.values() if placed.issuperset(check.depends_on)]
+            if not level:
+                raise ValueError(f"Dependência circular entre: {', '.join(sorted(remaining))}")
+            levels.append(level)
+            for check in level:
+                placed.add(check.id)
+                del remaining[check.id]
+        self._levels = levels
+        return levels
+
+    def dependents(self, check_ids):
+        """ids das verificações informadas e de todas que dependem delas."""
+        selected = set(check_ids)
+        for level in self.levels():
+            for check in level:
+                if selected.intersection(check.depends_on):
+                    selected.add(check.id)
+        return selected
+
+    def affected_by(self, input_names):
+        """ids das verificações que leem alguma das entradas informadas."""
+        names = set(input_names)
+        return {check.id for check in self.checks.values() if names.intersection(check.inputs)}
+
+    def input_fingerprints(self, names=None):
+        """
+        Fingerprint atual de cada entrada. Uma entrada que falha ao ser lida
+        fica sem fingerprint (None), o que força a execução das verificações
+        que dependem dela.
+        """
+        fingerprints = {}
+        for name in self.inputs if names is None else names:
+            try:
+                fingerprints[name] = _fingerprint(self.inputs[name]())
+            except Exception as e:
+                print(f"Erro ao ler a entrada {name}: {str(e)}")
+                fingerprints[name] = None
+        return fingerprints
+
+    def fingerprint(self, check, input_fingerprints, results):
+        """
+        Fingerprint de uma execução: entradas da verificação e scores das
+        dependências. None quando alguma entrada é desconhecida.
+        """
+        values = [input_fingerprints.get(name) for name in check.inputs]
+        if None in values:
+            return None
+        dependencies = [(dependency, results[dependency].score) for dependency in check.depends_on]
+        return _fingerprint([check.id, values, dependencies])
+
+
+class ResultCache:
+    """Último resultado bem-sucedido de cada verificação, com seu fingerprint."""
+
+    def __init__(self):
+        self._entries = {}
+
+    def lookup(self, check, fingerprint, now):
+        entry = self._entries.get(check.id)
+        if entry is None or fingerprint is None:
+            return None
+        cached_fingerprint, result, evaluated_at = entry
+        if cached_fingerprint != fingerprint or now - evaluated_at >= check.max_age:
+            return None
+        return result
+
+    def store(self, check, fingerprint, result, now):
+        if result.failure_reason is None:
+            self._entries[check.id] = (fingerprint, result, now)
+        else:
+            self._entries.pop(check.id, None)
+
+    def invalidate(self, check_ids=None):
+        if check_ids is None:
+            self._entries.clear()
+        else:
+            for check_id in check_ids:
+                self._entries.pop(check_id, None)
@@ -0,0 +1,217 @@
+import json
+import time
+import heapq
+import signal
+import asyncio
+import datetime
+from urllib.parse import urlsplit, parse_qs
+
+_HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 500: "Internal Server Error"}
+
+
+def json_response(status, body):
+    return status, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+
+class ComplianceScheduler:
+    """
+    Agendador asyncio das verificações de compliance.
+
+    Cada verificação tem a própria agenda (intervalo ou cron, ver
+    compliance_registry.parse_schedule). O laço dorme até a próxima execução
+    devida ou até um disparo sob demanda e então avalia apenas as verificações
+    devidas (e as que dependem delas). Execuções agendadas ignoram o cache de
+    resultados: as entradas declaradas raramente mudam com o processo no ar
+    (variáveis de ambiente), e o cache faria a agenda só republicar o último
+    resultado até max_age. A avaliação roda em uma thread, fora do event loop,
+    e nunca há duas avaliações simultâneas.
+
+    Disparos sob demanda (SIGHUP, POST /evaluate ou trigger()) ignoram o
+    cache por padrão, para reavaliar logo após um deploy. POST /evaluate
+    aceita checks=<ids> e inputs=<entradas> para reavaliar só as verificações
+    afetadas, e force=false para respeitar o cache. GET /schedule lista a
+    próxima execução de cada verificação.
+    """
+
+    def __init__(self, registry, evaluate, http_port=0, http_host="0.0.0.0"):
+        self.registry = registry
+        self.evaluate = evaluate
+        self.http_port = http_port
+        self.http_host = http_host
+        self.next_runs = {}
+        self.routes = {
+            ("POST", "/evaluate"): self._http_evaluate,
+            ("GET", "/schedule"): self._http_schedule,
+        }
+        self._queue = []
+        self._requested = set()
+        self._request_all = False
+        self._force = False
+        self._stopping = False
+        self._wakeup = None
+
+    def add_route(self, method, path, handler):
+        """
+        Registra uma rota no servidor HTTP. handler(query, headers)
+        retorna (status, headers, corpo em bytes).
+        """
+        self.routes[(method, path)] = handler
+
+    def trigger(self, check_ids=None, input_names=None, force=True):
+        """
+        Pede uma reavaliação imediata das verificações informadas, das que
+        leem as entradas informadas ou, sem nenhum dos dois, de todas.
+        """
+        if check_ids is None and input_names is None:
+            self._request_all = True
+        else:
+            self._requested.update(check_ids or ())
+            self._requested.update(self.registry.affected_by(input_names or ()))
+        self._force = self._force or force
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self):
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule(self, check, after):
+        due = check.schedule.next_run(after)
+        self.next_runs[check.id] = due
+        heapq.heappush(self._queue, (due, check.id))
+
+    async def _evaluate(self, check_ids, force):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.evaluate, check_ids, force)
+        except Exception as e:
+            # Uma falha (ex.: Push Gateway indisponível) não derruba o agendador
+            print(f"Erro na avaliação de compliance: {str(e)}")
+
+    def _take_triggers(self):
+        request_all, requested, force = self._request_all, self._requested, self._force
+        self._request_all, self._requested, self._force = False, set(), False
+        return request_all, requested, force
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        loop.add_signal_handler(signal.SIGHUP, self.trigger)
+        for stop_signal in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(stop_signal, self.stop)
+
+        server = None
+        if self.http_port:
+            server = await asyncio.start_server(self._handle_http, self.http_host, self.http_port)
+            print(f"Servidor HTTP de compliance em http://{self.http_host}:{self.http_port} "
+                  f"({', '.join(f'{method} {path}' for method, path in self.routes)})")
+
+        try:
+            await self._evaluate(None, False)
+            now = time.time()
+            for check in self.registry.checks.values():
+                self._schedule(check, now)
+
+            while not self._stopping:
+                if not (self._request_all or self._requested):
+                    timeout = max(0.0, self._queue[0][0] - time.time()) if self._queue else None
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+                if self._stopping:
+                    break
+
+                now = time.time()
+                due = set()
+                while self._queue and self._queue[0][0] <= now:
+                    _, check_id = heapq.heappop(self._queue)
+                    due.add(check_id)
+                    self._schedule(self.registry.checks[check_id], now)
+
+                request_all, requested, force = self._take_triggers()
+                if request_all:
+                    await self._evaluate(None, force)
+                    continue
+                if requested:
+                    await self._evaluate(requested, force)
+                    due -= requested
+                if due:
+                    await self._evaluate(due, True)
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            for handled_signal in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(handled_signal)
+
+    #################################################################
+    # SERVIDOR HTTP
+    #################################################################
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            handler = self.routes.get((method, url.path))
+            if handler is None:
+                known_path = any(path == url.path for _, path in self.routes)
+                response = json_response(405 if known_path else 404, {"error": "rota não encontrada"})
+            else:
+                response = handler(parse_qs(url.query), headers)
+        except ValueError as e:
+            response = json_response(400, {"error": str(e) or "requisição inválida"})
+        except Exception as e:
+            # Falha de um handler (ex.: histórico SQLite): responde 500 em vez
+            # de fechar a conexão sem resposta
+            print(f"Erro na rota HTTP de compliance: {str(e)}")
+            response = json_response(500, {"error": "erro interno"})
+
+        status, response_headers, body = response
+        head = [f"HTTP/1.1 {status} {_HTTP_REASONS.get(status, '')}",
+                f"Content-Length: {len(body)}", "Connection: close"]
+        head.extend(f"{name}: {value}" for name, value in response_headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def _http_evaluate(self, query, headers):
+        def values(name):
+            return [item for value in query.get(name, []) for item in value.split(",") if item] or None
+
+        check_ids = values("checks")
+        input_names = values("inputs")
+        unknown = set(check_ids or ()) - set(self.registry.checks)
+        unknown |= {f"input:{name}" for name in input_names or () if name not in self.registry.inputs}
+        if unknown:
+            return json_response(400, {"error": "verificações ou entradas desconhecidas",
+                                       "unknown": sorted(unknown)})
+
+        force = query.get("force", ["true"])[-1].lower() not in ("0", "false", "no")
+        self.trigger(check_ids, input_names, force)
+        if check_ids is None and input_names is None:
+            triggered = "all"
+        else:
+            triggered = sorted(self.registry.dependents(
+                set(check_ids or ()) | self.registry.affected_by(input_names or ())
+            ))
+        return json_response(202, {"triggered": triggered, "force": force})
+
+    def _http_schedule(self, query, headers):
+        return json_response(200, {
+            check_id: datetime.datetime.fromtimestamp(due).isoformat(timespec="seconds")
+            for check_id, due in sorted(self.next_runs.items())
+        })
@@ -0,0 +1,220 @@
+import os
+import json
+import uuid
+import time
+import datetime
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route, request_response
+
+from middleware.metrics_middleware import (
+    JOB_NAME, ASGIMetricsMiddleware, get_request_payload, metrics_pusher, set_fraud_verdict
+)
+from model.features import FeatureEncoder, invalid_fields
+from model.tree_ensemble import TreeEnsemble
+from serving.micro_batcher import BATCH_MAX_SIZE, BATCH_MAX_WAIT_SECONDS
+from serving.explanations import EXPLANATION_TOP_FACTORS, ExplanationEngine, explanation_store
+from serving.model_registry import MODEL_REGISTRY_PATH, MODEL_ROLLOUT_MODE, MODEL_VERSION, ModelRegistry
+
+# Configuração do serviço de inferência
+MODEL_NAME = os.getenv("MODEL_NAME", "fraude_pix_principal")
+FRAUD_THRESHOLD = float(os.getenv("FRAUD_THRESHOLD", "0.5"))
+
+
+class FraudScorer:
+    """
+    Modelo de uma versão (TreeEnsemble mapeado do disco), a codificação de
+    features gravada com ele e o motor de explicações da versão.
+    """
+
+    def __init__(self, path):
+        self.model = TreeEnsemble.load(path)
+        self.encoder = FeatureEncoder.from_spec(self.model.metadata.get("features", {}))
+        if self.model.feature_names != self.encoder.feature_names:
+            raise ValueError(f"Features do modelo em {path} diferem das extraídas pelo serviço: "
+                             f"{self.model.feature_names}")
+        # Mesmo rótulo de versão do registro de modelos: o nome do diretório
+        self.version = os.path.basename(os.path.normpath(path))
+        self.explainer = ExplanationEngine(self.model, self.version, self.encoder.raw_values)
+
+    def score_batch(self, payloads, explain=True):
+        """
+        Retorna (score, explicação) por payload, com um único passe no modelo
+        para o lote; sem explain, a explicação é None. Um payload que não pode
+        ser codificado recebe o seu erro (ValueError) no lugar do resultado,
+        sem afetar os demais do lote.
+        """
+        X, errors = self.encoder.encode_valid(payloads)
+        if not errors:
+            return self._score(X, payloads, explain)
+        results = iter(self._score(X, [payload for index, payload in enumerate(payloads)
+                                        if index not in errors], explain))
+        return [errors[index] if index in errors else next(results) for index in range(len(payloads))]
+
+    def _score(self, X, payloads, explain):
+        if not payloads:
+            return []
+        if not explain:
+            return [(score, None) for score in self.model.predict(X).tolist()]
+        scores, path_contributions = self.model.predict_with_contributions(X)
+        contributions, methods = self.explainer.explain(X, payloads, path_contributions)
+        return [(score, self._explanation(payload, row, method))
+                for payload, score, row, method in zip(payloads, scores.tolist(), contributions, methods)]
+
+    def warmup(self, rows):
+        self.model.warm_up(rows)
+        self.explainer.prepare()
+        self.score_batch([{}])
+
+    def _explanation(self, payload, contributions, method):
+        magnitude = np.abs(contributions)
+        total = float(magnitude.sum()) or 1.0
+        top = np.argsort(-magnitude)[:EXPLANATION_TOP_FACTORS]
+        explanation = {"method": method, "top_factors": [{
+            "feature": self.model.feature_names[index],
+            "importance": round(float(magnitude[index]) / total, 4),
+            "contribution": round(float(contributions[index]), 6),
+            "value": self.encoder.raw_value(payload, self.model.feature_names[index]),
+        } for index in top.tolist()]}
+        if self.explainer.mode != "path" and payload.get("transaction_id"):
+            explanation["full_explanation"] = f"/explanations/{payload['transaction_id']}"
+        return explanation
+
+
+async def predict(request):
+    """Score de fraude de uma transação PIX"""
+    start_time = time.perf_counter()
+    try:
+        payload = await get_request_payload(request)
+    except ValueError:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    if not isinstance(payload, dict):
+        return JSONResponse({"error": "payload deve ser um objeto JSON"}, status_code=400)
+    invalid = invalid_fields(payload)
+    if not isinstance(payload.get("transaction_id") or "", (str, int)):
+        invalid.append("transaction_id")
+    if invalid:
+        return JSONResponse({"error": "campos com tipo inválido", "fields": invalid}, status_code=400)
+
+    # O transaction_id identifica a explicação completa (/explanations)
+    if not payload.get("transaction_id"):
+        payload["transaction_id"] = str(uuid.uuid4())
+    payload["transaction_id"] = str(payload["transaction_id"])
+    registry = request.app.state.registry
+    slot, shadow = registry.route(payload["transaction_id"])
+    # O middleware rotula as métricas com o modelo lido deste mesmo payload:
+    # a versão que de fato respondeu
+    payload["model_name"] = MODEL_NAME
+    payload["model_version"] = slot.version
+    try:
+        fraud_score, explanation = await slot.score(payload)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    is_fraud = fraud_score >= FRAUD_THRESHOLD
+    if shadow is not None:
+        registry.shadow(shadow, payload, fraud_score, FRAUD_THRESHOLD)
+
+    response = JSONResponse({
+        "transaction_id": payload["transaction_id"],
+        "is_fraud": is_fraud,
+        "fraud_score": fraud_score,
+        "fraud_type": None,
+        "model_version": slot.version,
+        "explainability": explanation,
+        "processing_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+        "timestamp": datetime.datetime.now().isoformat(),
+    })
+    return set_fraud_verdict(response, is_fraud)
+
+
+async def health(request):
+    """Verificação de saúde do serviço"""
+    registry = request.app.state.registry
+    candidate = registry.candidate
+    return JSONResponse({
+        "status": "healthy",
+        "model_name": MODEL_NAME,
+        "model_version": registry.active.version,
+        "candidate_version": candidate.version if candidate is not None else None,
+        "rollout_mode": registry.mode,
+        "batching": {"max_batch_size": registry.max_batch_size, "max_wait_ms": registry.max_wait * 1000},
+    })
+
+
+async def explanation(request):
+    """Explicação completa de uma transação (pendente enquanto é calculada)"""
+    transaction_id = request.path_params["transaction_id"]
+    entry = explanation_store.get(transaction_id)
+    if entry is None:
+        return JSONResponse({"error": f"Explicação não encontrada para {transaction_id}"}, status_code=404)
+    return JSONResponse(entry, status_code=200 if entry["status"] == "complete" else 202)
+
+
+async def models(request):
+    """Versões disponíveis, ativa e candidata, com as estatísticas de carga"""
+    return JSONResponse(request.app.state.registry.status())
+
+
+async def reload_models(request):
+    """Verifica o diretório de modelos; {"version": "x"} ativa e fixa uma versão"""
+    body = await request.body()
+    try:
+        options = json.loads(body) if body else {}
+    except ValueError:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    version = options.get("version") if isinstance(options, dict) else None
+    try:
+        status = await request.app.state.registry.reload(version)
+    except FileNotFoundError as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+    except Exception as e:
+        return JSONResponse({"error": f"Falha ao carregar o modelo: {str(e)}"}, status_code=500)
+    return JSONResponse(status)
+
+
+async def promote_model(request):
+    """Torna a versão candidata a ativa"""
+    try:
+        status = await request.app.state.registry.promote()
+    except LookupError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return JSONResponse(status)
+
+
+def create_app(registry_path=MODEL_REGISTRY_PATH, version=MODEL_VERSION, mode=MODEL_ROLLOUT_MODE,
+               max_batch_size=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT_SECONDS, pusher=None, **registry_options):
+    """
+    Aplicação Starlette do serviço. O registro de modelos carrega a versão
+    inicial na inicialização (lifespan) e troca versões sem reiniciar o
+    serviço; /predict passa pelo ASGIMetricsMiddleware e pelo MicroBatcher
+    da versão que responde.
+    """
+    pusher = pusher or metrics_pusher
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.registry = ModelRegistry(
+            registry_path, MODEL_NAME, FraudScorer, version=version, mode=mode,
+            max_batch_size=max_batch_size, max_wait=max_wait,
+            on_change=lambda: pusher.mark_dirty(f"{JOB_NAME}_{MODEL_NAME}"), **registry_options
+        )
+        await app.state.registry.start()
+        yield
+        await app.state.registry.stop()
+        await pusher.stop(flush=True)
+
+    routes = [
+        Route('/predict', ASGIMetricsMiddleware(request_response(predict), pusher=pusher), methods=['POST']),
+        Route('/health', health, methods=['GET']),
+        Route('/explanations/{transaction_id}', explanation, methods=['GET']),
+        Route('/models', models, methods=['GET']),
+        Route('/models/reload', reload_models, methods=['POST']),
+        Route('/models/promote', promote_model, methods=['POST']),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import bisect
+import datetime
+import operator
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# Arquivo declarativo de regras (JSON ou YAML), recarregado sem reinício
+RULES_PATH = os.getenv(
+    "ADVERSARIAL_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "adversarial_rules.json")
+)
+RULES_RELOAD_INTERVAL = float(os.getenv("ADVERSARIAL_RULES_RELOAD_INTERVAL", "5"))
+
+# Níveis de severidade em ordem crescente
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
+# Operadores aceitos nas condições; funcionam com escalares e arrays NumPy
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+RuleMatch = namedtuple("RuleMatch", ["is_adversarial", "attack_type", "severity", "matched_rules"])
+BatchRuleMatch = namedtuple("BatchRuleMatch", ["is_adversarial", "attack_type", "severity"])
+
+_SEVERITY_RANK = {level: rank for rank, level in enumerate(SEVERITY_LEVELS)}
+
+# Linhas avaliadas por vez na avaliação em lote (limita a matriz linhas x regras)
+_BATCH_CHUNK_ROWS = 65536
+
+
+#################################################################
+# EXTRAÇÃO DE FEATURES
+#################################################################
+
+def _to_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _to_hour(value):
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return value.hour
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value).hour
+        except ValueError:
+            return None
+    return None
+
+
+def _record_value(request_data, path):
+    # "hour" é derivada do campo time; as demais features são chaves numéricas
+    # do payload, com "." para campos aninhados (ex.: history.tx_count_24h)
+    if path == ("hour",):
+        return _to_hour(request_data.get("time"))
+    value = request_data
+    for part in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return _to_number(value)
+
+
+def _column(batch, name):
+    # Tabela Arrow
+    if hasattr(batch, "column_names"):
+        if name not in batch.column_names:
+            return None
+        return batch.column(name).to_numpy(zero_copy_only=False)
+    # Dicionário de arrays ou DataFrame pandas
+    try:
+        column = batch[name]
+    except (KeyError, IndexError, ValueError):
+        return None
+    return np.asarray(column)
+
+
+def _hours(times):
+    if np.issubdtype(times.dtype, np.datetime64):
+        valid = ~np.isnat(times)
+        hours = np.full(times.shape, np.nan)
+        hours[valid] = (times[valid].astype("datetime64[h]").astype(np.int64) % 24)
+        return hours
+    # Objetos datetime ou strings ISO (ex.: DataFrame com timezone)
+    hours = [_to_hour(value) for value in times.tolist()]
+    return np.array([np.nan if hour is None else hour for hour in hours], dtype=float)
+
+
+def _batch_column(batch, field):
+    if field == "hour":
+        hour = _column(batch, "hour")
+        if hour is not None:
+            return hour.astype(float)
+        times = _column(batch, "time")
+        return None if times is None else _hours(times)
+    column = _column(batch, field)
+    return None if column is None else column.astype(float)
+
+
+#################################################################
+# COMPILAÇÃO DAS REGRAS
+#################################################################
+
+def _parse_conditions(rule_id, spec):
+    conditions = []
+    for op, limit in spec.items():
+        if op == "between":
+            low, high = limit
+            conditions.append((operator.ge, float(low)))
+            conditions.append((operator.le, float(high)))
+        elif op in OPERATORS:
+            conditions.append((OPERATORS[op], float(limit)))
+        else:
+            raise ValueError(f"Regra {rule_id}: operador desconhecido '{op}'")
+    return conditions
+
+
+class _FieldIndex:
+    """
+    Índice de uma feature: os limites de todas as regras sobre a feature
+    dividem a reta em regiões (intervalos abertos e os próprios limites). Para
+    cada região é pré-calculada a máscara de bits das regras satisfeitas, de
+    forma que avaliar a feature custa uma busca binária, independentemente do
+    número de regras.
+    """
+
+    def __init__(self, field, rule_conditions, rule_count):
+        self.field = field
+        self.path = tuple(field.split("."))
+
+        thresholds = sorted({limit for conditions in rule_conditions.values()
+                             for _, limit in conditions})
+        self.thresholds = thresholds
+        self.thresholds_array = np.array(thresholds + [np.inf])
+
+        # Representantes: intervalo aberto antes de cada limite, o limite e o
+        # intervalo após o último limite
+        representatives = []
+        for i, limit in enumerate(thresholds):
+            if i == 0:
+                representatives.append(limit - 1.0)
+            else:
+                representatives.append((thresholds[i - 1] + limit) / 2.0)
+            representatives.append(limit)
+        representatives.append(thresholds[-1] + 1.0 if thresholds else 0.0)
+
+        unconstrained = 0
+        for bit in range(rule_count):
+            if bit not in rule_conditions:
+                unconstrained |= 1 << bit
+
+        self.missing_mask = unconstrained
+        self.region_masks = []
+        region_matrix = np.zeros((len(representatives) + 1, rule_count), dtype=bool)
+        for region, value in enumerate(representatives):
+            mask = unconstrained
+            for bit, conditions in rule_conditions.items():
+                if all(op(value, limit) for op, limit in conditions):
+                    mask |= 1 << bit
+            self.region_masks.append(mask)
+            region_matrix[region] = [(mask >> bit) & 1 for bit in range(rule_count)]
+        # Última linha: valor ausente
+        region_matrix[-1] = [(unconstrained >> bit) & 1 for bit in range(rule_count)]
+        self.region_matrix = region_matrix
+
+    def mask_for(self, value):
+        if value is None:
+            return self.missing_mask
+        i = bisect.bisect_left(self.thresholds, value)
+        if i < len(self.thresholds) and self.thresholds[i] == value:
+            return self.region_masks[2 * i + 1]
+        return self.region_masks[2 * i]
+
+    def regions_for(self, column):
+        # NaN é ordenado após +inf; o índice é limitado e a região corrigida abaixo
+        i = np.minimum(np.searchsorted(self.thresholds_array, column, side="left"),
+                       len(self.thresholds))
+        regions = 2 * i + ((i < len(self.thresholds)) & (self.thresholds_array[i] == column))
+        regions[np.isnan(column)] = len(self.region_matrix) - 1
+        return regions
+
+
+class CompiledRules:
+    """Estrutura de decisão plana gerada a partir da especificação declarativa."""
+
+    def __init__(self, spec):
+        rules = spec.get("rules", [])
+        self.default_attack_type = spec.get("default_attack_type", "unknown")
+        self.default_severity = spec.get("default_severity", "medium")
+        if self.default_severity not in _SEVERITY_RANK:
+            raise ValueError(f"Severidade padrão desconhecida '{self.default_severity}'")
+
+        self.rule_ids = []
+        self.all_mask = (1 << len(rules)) - 1
+        self.attack_mask = 0
+        self.attack_by_bit = {}
+        severity_masks = {}
+        conditions_by_field = {}
+
+        for bit, rule in enumerate(rules):
+            rule_id = rule["id"]
+            self.rule_ids.append(rule_id)
+            for field, field_spec in rule.get("when", {}).items():
+                conditions_by_field.setdefault(field, {})[bit] = _parse_conditions(rule_id, field_spec)
+            if "attack_type" in rule:
+                self.attack_mask |= 1 << bit
+                self.attack_by_bit[bit] = rule["attack_type"]
+            if "severity" in rule:
+                if rule["severity"] not in _SEVERITY_RANK:
+                    raise ValueError(f"Regra {rule_id}: severidade desconhecida '{rule['severity']}'")
+                severity_masks[rule["severity"]] = severity_masks.get(rule["severity"], 0) | (1 << bit)
+
+        if len(set(self.rule_ids)) != len(self.rule_ids):
+            raise ValueError("Identificadores de regra duplicados")
+
+        self.fields = [_FieldIndex(field, conditions, len(rules))
+                       for field, conditions in conditions_by_field.items()]
+        # Severidades da maior para a menor
+        self.severity_masks = sorted(
+            ((_SEVERITY_RANK[level], level, mask) for level, mask in severity_masks.items()),
+            reverse=True
+        )
+
+        # Vetores por regra para a avaliação em lote
+        self.rule_severity_rank = np.full(len(rules), -1, dtype=np.int8)
+        for rank, _, mask in self.severity_masks:
+            for bit in range(len(rules)):
+                if (mask >> bit) & 1:
+                    self.rule_severity_rank[bit] = rank
+        self.attack_bits = np.array(sorted(self.attack_by_bit), dtype=np.intp)
+
+    def evaluate(self, request_data):
+        matched = self.all_mask
+        for field in self.fields:
+            matched &= field.mask_for(_record_value(request_data, field.path))
+            if not matched:
+                break
+
+        attack_type = self.default_attack_type
+        attacks = matched & self.attack_mask
+        if attacks:
+            attack_type = self.attack_by_bit[(attacks & -attacks).bit_length() - 1]
+
+        severity = self.default_severity
+        for _, level, mask in self.severity_masks:
+            if matched & mask:
+                severity = level
+                break
+
+        matched_rules = []
+        while matched:
+            lowest = matched & -matched
+            matched_rules.append(self.rule_ids[lowest.bit_length() - 1])
+            matched ^= lowest
+
+        return RuleMatch(
+            is_adversarial=bool(matched_rules),
+            attack_type=attack_type,
+            severity=severity,
+            matched_rules=matched_rules,
+        )
+
+    def evaluate_batch(self, batch):
+        columns = {field.field: _batch_column(batch, field.field) for field in self.fields}
+        present = [column for column in columns.values() if column is not None]
+        if not present:
+            raise ValueError("Lote sem nenhuma das colunas usadas pelas regras")
+        size = len(present[0])
+
+        is_adversarial = np.zeros(size, dtype=bool)
+        attack_code = np.full(size, -1, dtype=np.intp)
+        severity_rank = np.full(size, -1, dtype=np.int8)
+
+        for start in range(0, size, _BATCH_CHUNK_ROWS):
+            stop = min(start + _BATCH_CHUNK_ROWS, size)
+            matched = np.ones((stop - start, len(self.rule_ids)), dtype=bool)
+            for field in self.fields:
+                column = columns[field.field]
+                if column is None:
+                    matched &= field.region_matrix[-1]
+                else:
+                    matched &= field.region_matrix[field.regions_for(column[start:stop])]
+
+            is_adversarial[start:stop] = matched.any(axis=1)
+            if len(self.attack_bits):
+                attacks = matched[:, self.attack_bits]
+                first = attacks.argmax(axis=1)
+                attack_code[start:stop] = np.where(attacks.any(axis=1), first, -1)
+            if len(self.rule_ids):
+                severity_rank[start:stop] = np.where(matched, self.rule_severity_rank, -1).max(axis=1)
+
+        attack_names = np.array([self.attack_by_bit[bit] for bit in self.attack_bits]
+                                + [self.default_attack_type])
+        severity_names = np.array(SEVERITY_LEVELS + [self.default_severity])
+        return BatchRuleMatch(
+            is_adversarial=is_adversarial,
+            attack_type=attack_names[attack_code],
+            severity=severity_names[severity_rank],
+        )
+
+
+#################################################################
+# MOTOR DE REGRAS COM RECARGA A QUENTE
+#################################################################
+
+def load_rules_spec(path):
+    """Lê a especificação de regras de um arquivo JSON ou YAML."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class RuleEngine:
+    """
+    Avalia as regras compiladas e recarrega o arquivo de regras quando ele é
+    alterado. A verificação do arquivo ocorre no máximo a cada
+    reload_interval segundos e a troca da estrutura compilada é atômica; se o
+    novo arquivo for inválido, as regras anteriores continuam em uso.
+    """
+
+    def __init__(self, path=None, spec=None, reload_interval=RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        if spec is not None:
+            self._compiled = CompiledRules(spec)
+        else:
+            self._compiled = CompiledRules({"rules": []})
+            self.reload()
+
+    @property
+    def compiled(self):
+        self._maybe_reload()
+        return self._compiled
+
+    def reload(self):
+        """Recarrega e recompila o arquivo de regras."""
+        mtime = os.stat(self.path).st_mtime_ns
+        compiled = CompiledRules(load_rules_spec(self.path))
+        self._compiled = compiled
+        self._mtime = mtime
+        return compiled
+
+    def _maybe_reload(self):
+        if self.path is None or time.monotonic() < self._next_check:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self.reload_interval
+            if os.stat(self.path).st_mtime_ns != self._mtime:
+                self.reload()
+        except Exception as e:
+            print(f"Erro ao recarregar regras adversariais de {self.path}: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def evaluate(self, request_data):
+        """
+        Avalia todas as regras sobre uma transação em uma única passada,
+        retornando se é suspeita, o tipo de ataque, a severidade e as regras casadas.
+        """
+        return self.compiled.evaluate(request_data)
+
+    def evaluate_batch(self, batch):
+        """
+        Avalia as mesmas regras sobre um lote colunar: dicionário de arrays,
+        DataFrame pandas ou tabela Arrow com as colunas das features (amount,
+        time ou hour, ...). Valores ausentes nunca satisfazem uma condição.
+        """
+        return self.compiled.evaluate_batch(batch)
+
+
+# Motor padrão usado pelo middleware e pelos jobs de reavaliação em lote
+default_engine = RuleEngine(RULES_PATH)
+
+
+def evaluate_record(request_data):
+    return default_engine.evaluate(request_data)
+
+
+def evaluate_batch(batch):
+    return default_engine.evaluate_batch(batch)
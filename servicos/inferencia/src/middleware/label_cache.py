@@ -0,0 +1,77 @@
+# Cache de modules/monitoring/ml_metrics_exporter/label_cache.py sem o limite
+# de cardinalidade, usado apenas pelo exporter; cada serviço é empacotado de
+# forma independente.
+import threading
+from collections import OrderedDict
+
+# Quantidade padrão de children mantidos por métrica
+DEFAULT_MAX_CHILDREN = 1024
+
+
+class LabelChildCache:
+    """
+    Cache de children pré-resolvidos de uma métrica rotulada do prometheus_client.
+
+    metric.labels(...) monta um dicionário, valida os rótulos e faz uma busca
+    protegida por lock a cada chamada. O cache guarda o child resolvido por
+    tupla de valores, com despejo LRU limitado a maxsize entradas; o acerto é
+    uma busca em dicionário sem lock. Despejar uma entrada não remove a série
+    da métrica, apenas o atalho.
+
+    Expõe a mesma interface da métrica: labels() aceita valores posicionais (na
+    ordem dos rótulos, o caminho mais rápido) ou nomeados, e os demais
+    atributos são delegados à métrica original.
+    """
+
+    def __init__(self, metric, maxsize=DEFAULT_MAX_CHILDREN):
+        self.metric = metric
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._children = OrderedDict()
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues, **labelkwargs):
+        # Chaves posicionais são tuplas de valores; nomeadas, tuplas de pares,
+        # então as duas formas nunca colidem
+        key = labelvalues if labelvalues else tuple(labelkwargs.items())
+        child = self._children.get(key)
+        if child is not None:
+            self.hits += 1
+            try:
+                self._children.move_to_end(key)
+            except KeyError:
+                # Despejada concorrentemente; o child continua válido
+                pass
+            return child
+        return self._resolve(key, labelvalues, labelkwargs)
+
+    def _resolve(self, key, labelvalues, labelkwargs):
+        child = self.metric.labels(*labelvalues, **labelkwargs)
+        with self._lock:
+            self.misses += 1
+            self._children[key] = child
+            while len(self._children) > self.maxsize:
+                self._children.popitem(last=False)
+        return child
+
+    def prebind(self, *labelvalue_tuples):
+        """Resolve antecipadamente combinações conhecidas de rótulos."""
+        for labelvalues in labelvalue_tuples:
+            self.labels(*labelvalues)
+        return self
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getattr__(self, name):
+        return getattr(self.metric, name)
+
+
+def cached_labels(metric, maxsize=DEFAULT_MAX_CHILDREN):
+    """Envolve uma métrica rotulada com o cache de children."""
+    return LabelChildCache(metric, maxsize=maxsize)
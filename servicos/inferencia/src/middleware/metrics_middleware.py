@@ -1,30 +1,46 @@
+import json
 import time
-from prometheus_client import Counter, Histogram, Gauge, push_to_gateway
+from prometheus_client import Counter, Histogram, Gauge
+
+from middleware.adversarial_rules import evaluate_record
+from middleware.label_cache import cached_labels
+from middleware.metrics_pusher import MetricsPusher
 
 # Configuração do endpoint Prometheus Push Gateway
 PUSH_GATEWAY_URL = "prometheus-pushgateway:9091"
 JOB_NAME = "ml_inference_service"
 
+# Envio em segundo plano compartilhado pelas instâncias do middleware
+metrics_pusher = MetricsPusher(PUSH_GATEWAY_URL)
+
+# Atributo de request.state com o payload já decodificado, compartilhado
+# entre o middleware e o handler
+REQUEST_PAYLOAD_STATE = "parsed_payload"
+
+# Header de resposta com o veredito do modelo ("fraud" ou "legitimate")
+FRAUD_VERDICT_HEADER = "x-fraud-verdict"
+
 # Métricas básicas de inferência
-inference_requests = Counter(
+# (children pré-resolvidos via cache, pois são usadas a cada requisição)
+inference_requests = cached_labels(Counter(
     'ml_inference_requests_total',
     'Total de requisições de inferência',
     ['model_name', 'model_version', 'result']
-)
+))
 
-inference_latency = Histogram(
+inference_latency = cached_labels(Histogram(
     'ml_inference_latency_seconds',
     'Latência das requisições de inferência',
     ['model_name', 'model_version'],
     buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
-)
+))
 
 # Métricas de segurança
-adversarial_attempt_counter = Counter(
+adversarial_attempt_counter = cached_labels(Counter(
     'adversarial_attempts_total',
     'Contagem de tentativas detectadas de ataques adversariais',
     ['attack_type', 'detection_method', 'severity']
-)
+))
 
 input_outlier_score = Histogram(
     'input_outlier_score',
@@ -35,92 +51,197 @@ input_outlier_score = Histogram(
 
 # Função para detectar inputs potencialmente adversariais
 def is_potential_adversarial(request_data):
-    # Implementação simplificada:
-    # Verifica valores extremos ou padrões suspeitos
+    # Verifica valores extremos ou padrões suspeitos com a tabela de regras
+    # compartilhada com a avaliação em lote (adversarial_rules.evaluate_batch)
     try:
-        # Exemplo: valor de transação extremamente alto é suspeito
-        if 'amount' in request_data and request_data['amount'] > 100000:
-            return True
-            
-        # Exemplo: padrão suspeito de horário e valor
-        if ('time' in request_data and 'amount' in request_data and 
-            (0 <= request_data['time'].hour <= 4) and request_data['amount'] > 10000):
-            return True
-            
-        return False
-    except:
+        return evaluate_record(request_data).is_adversarial
+    except Exception:
         return False
 
 # Função para identificar o tipo de ataque
 def detect_attack_type(request_data):
-    # Lógica simplificada para identificar o tipo de ataque
-    # Em produção, usaria técnicas mais sofisticadas
-    if 'amount' in request_data and request_data['amount'] > 100000:
-        return "amount_manipulation"
-    return "unknown"
+    return evaluate_record(request_data).attack_type
 
 # Função para avaliar a severidade do ataque
 def assess_severity(request_data):
-    # Lógica simplificada para avaliar severidade
-    if 'amount' in request_data and request_data['amount'] > 1000000:
-        return "critical"
-    return "medium"
+    return evaluate_record(request_data).severity
+
+# Função para obter o payload da requisição decodificando o JSON uma única vez
+async def get_request_payload(request):
+    """
+    Retorna o payload JSON da requisição. O resultado fica em request.state,
+    então o middleware e o handler compartilham a mesma decodificação.
+    """
+    payload = getattr(request.state, REQUEST_PAYLOAD_STATE, None)
+    if payload is None:
+        payload = await request.json()
+        setattr(request.state, REQUEST_PAYLOAD_STATE, payload)
+    return payload
+
+# Função para o handler anexar o veredito à resposta
+def set_fraud_verdict(response, is_fraud):
+    """
+    Anexa o veredito à resposta como atributo tipado e como header, para que o
+    middleware não precise decodificar o corpo da resposta.
+    """
+    response.is_fraud = bool(is_fraud)
+    response.headers[FRAUD_VERDICT_HEADER] = "fraud" if is_fraud else "legitimate"
+    return response
+
+# Função para ler o resultado da inferência sem decodificar o corpo da resposta
+def get_inference_result(response):
+    is_fraud = getattr(response, 'is_fraud', None)
+    if is_fraud is not None:
+        return "fraud" if is_fraud else "legitimate"
+
+    headers = getattr(response, 'headers', None)
+    if headers is not None:
+        verdict = headers.get(FRAUD_VERDICT_HEADER)
+        if verdict in ("fraud", "legitimate"):
+            return verdict
+    return "unknown"
+
+# Função para registrar as métricas de uma requisição de inferência
+def record_inference_metrics(request_data, result, latency, pusher):
+    """
+    Registra contagem, latência e tentativas adversariais de uma requisição e
+    marca o job para envio em segundo plano. Compartilhada pelas versões
+    request/response e ASGI do middleware.
+    """
+    model_name = request_data.get('model_name', 'unknown')
+    model_version = request_data.get('model_version', 'unknown')
+    
+    # Valores posicionais, na ordem dos rótulos: caminho mais rápido do cache
+    inference_requests.labels(model_name, model_version, result).inc()
+    inference_latency.labels(model_name, model_version).observe(latency)
+    
+    # Verificar se é potencialmente um ataque adversarial (regras avaliadas
+    # uma única vez para detecção, tipo de ataque e severidade)
+    rule_match = evaluate_record(request_data)
+    if rule_match.is_adversarial:
+        adversarial_attempt_counter.labels(
+            rule_match.attack_type, "input_analysis", rule_match.severity
+        ).inc()
+    
+    # Marcar o job para envio em segundo plano ao Prometheus
+    pusher.mark_dirty(f"{JOB_NAME}_{model_name}")
 
 # Middleware para métricas Prometheus
 class MetricsMiddleware:
-    def __init__(self, app):
+    def __init__(self, app, pusher=None):
         self.app = app
+        self.pusher = pusher or metrics_pusher
 
     async def __call__(self, request):
         start_time = time.time()
         
+        # Decodificar o payload uma única vez, antes do handler, que o reutiliza
+        # através de get_request_payload
+        try:
+            request_data = await get_request_payload(request)
+        except Exception:
+            request_data = {}
+        
         # Processar a request
         response = await self.app(request)
         
         # Extrair dados para métricas
         try:
-            request_data = await request.json()
-            model_name = request_data.get('model_name', 'unknown')
-            model_version = request_data.get('model_version', 'unknown')
-            
-            # Verificar resultado da inferência 
-            result = "unknown"
-            if hasattr(response, 'body'):
-                response_data = json.loads(response.body)
-                result = "fraud" if response_data.get('is_fraud', False) else "legitimate"
-            
-            # Registrar métricas
-            inference_requests.labels(
-                model_name=model_name,
-                model_version=model_version,
-                result=result
-            ).inc()
-            
-            inference_latency.labels(
-                model_name=model_name,
-                model_version=model_version
-            ).observe(time.time() - start_time)
-            
-            # Verificar se é potencialmente um ataque adversarial
-            if is_potential_adversarial(request_data):
-                attack_type = detect_attack_type(request_data)
-                severity = assess_severity(request_data)
-                
-                adversarial_attempt_counter.labels(
-                    attack_type=attack_type,
-                    detection_method="input_analysis",
-                    severity=severity
-                ).inc()
-            
-            # Enviar métricas para o Prometheus
-            push_to_gateway(
-                PUSH_GATEWAY_URL, 
-                job=f"{JOB_NAME}_{model_name}",
-                registry=REGISTRY
-            )
-                
+            # Verificar resultado da inferência pelo atributo/header da resposta
+            result = get_inference_result(response)
+            record_inference_metrics(request_data, result, time.time() - start_time, self.pusher)
         except Exception as e:
             # Registrar erro na coleta de métricas, mas não afetar a resposta
             print(f"Erro ao coletar métricas: {str(e)}")
         
-        return response
\ No newline at end of file
+        return response
+
+# Middleware ASGI (scope, receive, send) para métricas Prometheus
+class ASGIMetricsMiddleware:
+    """
+    Versão ASGI do MetricsMiddleware, compatível com Starlette/FastAPI
+    (app.add_middleware) e com aplicações ASGI puras.
+
+    A latência é medida do primeiro receive até o envio da última parte do
+    corpo da resposta, o que cobre respostas em streaming. O corpo da
+    requisição é observado sem cópia: os chunks recebidos são apenas
+    referenciados e só são decodificados se o handler não tiver deixado o
+    payload em request.state.
+    """
+
+    def __init__(self, app, pusher=None):
+        self.app = app
+        self.pusher = pusher or metrics_pusher
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        entry_time = time.perf_counter()
+        first_receive_time = None
+        body_chunks = []
+        verdict = "unknown"
+        recorded = False
+
+        async def receive_wrapper():
+            nonlocal first_receive_time
+            message = await receive()
+            if first_receive_time is None:
+                first_receive_time = time.perf_counter()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                if chunk:
+                    body_chunks.append(chunk)
+            return message
+
+        async def send_wrapper(message):
+            nonlocal verdict, recorded
+            if message["type"] == "http.response.start":
+                verdict = _verdict_from_raw_headers(message.get("headers", ()))
+            await send(message)
+            if (message["type"] == "http.response.body"
+                    and not message.get("more_body", False) and not recorded):
+                recorded = True
+                self._record(state, body_chunks, verdict,
+                             (first_receive_time or entry_time))
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            if not recorded:
+                recorded = True
+                self._record(state, body_chunks, "error", (first_receive_time or entry_time))
+            raise
+
+    def _record(self, state, body_chunks, result, start_time):
+        latency = time.perf_counter() - start_time
+        try:
+            request_data = state.get(REQUEST_PAYLOAD_STATE)
+            if request_data is None:
+                request_data = _decode_body(body_chunks)
+            if not isinstance(request_data, dict):
+                request_data = {}
+            record_inference_metrics(request_data, result, latency, self.pusher)
+        except Exception as e:
+            # Registrar erro na coleta de métricas, mas não afetar a resposta
+            print(f"Erro ao coletar métricas: {str(e)}")
+
+def _verdict_from_raw_headers(raw_headers):
+    header_name = FRAUD_VERDICT_HEADER.encode("latin-1")
+    for name, value in raw_headers:
+        if name.lower() == header_name:
+            verdict = value.decode("latin-1")
+            if verdict in ("fraud", "legitimate"):
+                return verdict
+    return "unknown"
+
+def _decode_body(body_chunks):
+    if not body_chunks:
+        return {}
+    body = body_chunks[0] if len(body_chunks) == 1 else b"".join(body_chunks)
+    try:
+        return json.loads(body)
+    except ValueError:
+        return {}
@@ -0,0 +1,172 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Counter, Gauge, REGISTRY, push_to_gateway
+
+# Configuração do envio em segundo plano para o Prometheus Push Gateway
+PUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_PUSH_INTERVAL", "5"))
+PUSH_QUEUE_SIZE = int(os.getenv("METRICS_PUSH_QUEUE_SIZE", "256"))
+PUSH_TIMEOUT_SECONDS = float(os.getenv("METRICS_PUSH_TIMEOUT", "2"))
+PUSH_MAX_BACKOFF_SECONDS = float(os.getenv("METRICS_PUSH_MAX_BACKOFF", "60"))
+
+# Métricas do próprio pipeline de envio
+push_dropped_counter = Counter(
+    'ml_metrics_push_dropped_total',
+    'Marcações de envio descartadas pelo pipeline de métricas',
+    ['reason']
+)
+
+push_attempts_counter = Counter(
+    'ml_metrics_push_attempts_total',
+    'Tentativas de envio ao Push Gateway',
+    ['status']
+)
+
+push_queue_depth = Gauge(
+    'ml_metrics_push_queue_depth',
+    'Jobs aguardando envio ao Push Gateway'
+)
+
+
+class MetricsPusher:
+    """
+    Envia métricas ao Push Gateway fora do caminho da requisição.
+
+    O caminho da requisição apenas marca o job como "sujo" (mark_dirty). Uma
+    única tarefa em segundo plano agrupa as marcações dentro do intervalo
+    configurado, executa o push em uma thread dedicada e aplica backoff
+    exponencial enquanto o gateway estiver indisponível. stop(flush=True)
+    envia também os jobs do ciclo interrompido (já retirados da fila).
+    """
+
+    def __init__(self, gateway_url, registry=REGISTRY,
+                 interval=PUSH_INTERVAL_SECONDS,
+                 queue_size=PUSH_QUEUE_SIZE,
+                 timeout=PUSH_TIMEOUT_SECONDS,
+                 max_backoff=PUSH_MAX_BACKOFF_SECONDS):
+        self.gateway_url = gateway_url
+        self.registry = registry
+        self.interval = interval
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self._queue = None
+        self._pending = set()
+        # Jobs retirados da fila pelo ciclo em andamento e ainda não enviados
+        self._in_flight = set()
+        self._task = None
+        self._backoff = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metrics-push")
+
+    def start(self):
+        """Inicia a tarefa de envio no event loop corrente (idempotente)."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._pending.clear()
+            # Jobs de um ciclo que não terminou (ex.: event loop anterior
+            # encerrado sem stop) voltam para a fila nova
+            in_flight, self._in_flight = self._in_flight, set()
+            for job in in_flight:
+                self._requeue(job)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self, flush=True):
+        """Interrompe a tarefa de envio, opcionalmente enviando o que estiver pendente."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        jobs = list(self._in_flight)
+        self._in_flight.clear()
+        if self._queue is not None:
+            jobs.extend(self._drain())
+        # Sem a tarefa, nenhuma marcação fica pendente: a próxima mark_dirty
+        # reinicia o envio
+        self._pending.clear()
+        if flush and jobs:
+            await self._push_jobs(jobs)
+
+    def mark_dirty(self, job):
+        """
+        Registra que o job possui métricas novas. Não bloqueia: marcações
+        repetidas do mesmo job são agrupadas e, com a fila cheia, a marcação
+        é descartada e contabilizada.
+        """
+        self.start()
+        if job in self._pending:
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            push_dropped_counter.labels(reason="queue_full").inc()
+            return
+        self._pending.add(job)
+        push_queue_depth.set(self._queue.qsize())
+
+    def _drain(self):
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        # Liberar as marcações antes do envio: novas métricas durante o push
+        # geram um novo ciclo em vez de se perderem
+        self._pending.difference_update(jobs)
+        push_queue_depth.set(0)
+        return jobs
+
+    async def _run(self):
+        while True:
+            # Aguardar a primeira marcação e então o intervalo de agrupamento
+            first_job = await self._queue.get()
+            self._in_flight.add(first_job)
+            await asyncio.sleep(max(self.interval, self._backoff))
+            jobs = [first_job] + self._drain()
+            self._in_flight.update(jobs)
+            self._pending.discard(first_job)
+
+            failed = await self._push_jobs(jobs)
+            self._in_flight.clear()
+            if failed:
+                self._backoff = min(self.max_backoff, max(self.interval, self._backoff * 2) or 1.0)
+                for job in failed:
+                    self._requeue(job)
+            else:
+                self._backoff = 0.0
+
+    def _requeue(self, job):
+        if job in self._pending:
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            push_dropped_counter.labels(reason="gateway_unavailable").inc()
+            return
+        self._pending.add(job)
+
+    async def _push_jobs(self, jobs):
+        loop = asyncio.get_running_loop()
+        failed = []
+        for job in dict.fromkeys(jobs):
+            try:
+                await loop.run_in_executor(self._executor, self._push, job)
+                push_attempts_counter.labels(status="success").inc()
+            except Exception as e:
+                push_attempts_counter.labels(status="error").inc()
+                print(f"Erro ao enviar métricas para o Push Gateway ({job}): {str(e)}")
+                failed.append(job)
+        return failed
+
+    def _push(self, job):
+        push_to_gateway(
+            self.gateway_url,
+            job=job,
+            registry=self.registry,
+            timeout=self.timeout
+        )
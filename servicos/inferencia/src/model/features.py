@@ -0,0 +1,164 @@
+import math
+import datetime
+
+import numpy as np
+
+# Features numéricas extraídas do payload de /predict. Campos ausentes viram
+# NaN e seguem o lado default de cada split
+NUMERIC_FEATURES = ("amount_log", "hour", "weekday", "payee_account_age_days", "payer_tx_count_24h")
+
+# Features categóricas codificadas como ordinais; os valores conhecidos são
+# aprendidos no treino e gravados junto com o modelo
+CATEGORICAL_FEATURES = ("channel", "transaction_type", "user_segment")
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+def _nested(payload, *path):
+    value = payload
+    for part in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _category(codes, value):
+    # Só strings são valores categóricos; listas, objetos e números viram NaN
+    if isinstance(value, str):
+        return codes.get(value, math.nan)
+    return math.nan
+
+
+def _time_parts(value):
+    if isinstance(value, str):
+        try:
+            moment = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return math.nan, math.nan
+        return float(moment.hour), float(moment.weekday())
+    return math.nan, math.nan
+
+
+# Campos lidos do payload e os tipos aceitos; None equivale a ausente
+_FIELD_TYPES = {
+    ("amount",): (int, float),
+    ("time",): (str,),
+    ("payee", "account_age_days"): (int, float),
+    ("history", "tx_count_24h"): (int, float),
+    **{(name,): (str,) for name in CATEGORICAL_FEATURES},
+}
+
+
+def _finite(value):
+    # JSON aceita 1e400 (inf) e inteiros fora do alcance de float64
+    try:
+        return not isinstance(value, (int, float)) or math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def invalid_fields(payload):
+    """
+    Campos do payload com tipo que o modelo não aceita (ex.: lista como
+    canal) ou número não finito, em notação "payee.account_age_days". Lista
+    vazia se o payload é válido.
+    """
+    invalid = []
+    for path, types in _FIELD_TYPES.items():
+        parent = _nested(payload, *path[:-1]) if len(path) > 1 else payload
+        if parent is not None and not isinstance(parent, dict):
+            invalid.append(".".join(path[:-1]))
+            continue
+        value = parent.get(path[-1]) if parent is not None else None
+        if value is not None and (not isinstance(value, types) or isinstance(value, bool) or not _finite(value)):
+            invalid.append(".".join(path))
+    return list(dict.fromkeys(invalid))
+
+
+class FeatureEncoder:
+    """
+    Converte payloads de transação PIX na matriz de features do modelo.
+
+    categories mapeia cada feature categórica para a lista de valores
+    conhecidos; o código de um valor é a sua posição e valores desconhecidos
+    viram NaN. spec() e from_spec() gravam e restauram a codificação junto com
+    o modelo (metadata "features"), para que cada versão use a sua.
+    """
+
+    def __init__(self, categories):
+        self.categories = {name: list(categories.get(name, ())) for name in CATEGORICAL_FEATURES}
+        self._codes = {name: {value: float(code) for code, value in enumerate(values)}
+                       for name, values in self.categories.items()}
+        self.feature_names = list(NUMERIC_FEATURES) + list(CATEGORICAL_FEATURES)
+
+    @classmethod
+    def fit(cls, payloads):
+        """Aprende os valores categóricos presentes nos payloads de treino."""
+        seen = {name: {} for name in CATEGORICAL_FEATURES}
+        for payload in payloads:
+            for name in CATEGORICAL_FEATURES:
+                value = payload.get(name)
+                if isinstance(value, str):
+                    seen[name].setdefault(value, None)
+        return cls({name: sorted(values) for name, values in seen.items()})
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec.get("categories", {}))
+
+    def spec(self):
+        return {"categories": self.categories}
+
+    def row(self, payload):
+        amount = _number(payload.get("amount"))
+        hour, weekday = _time_parts(payload.get("time"))
+        row = [
+            math.log1p(amount) if amount >= 0 else math.nan,
+            hour,
+            weekday,
+            _number(_nested(payload, "payee", "account_age_days")),
+            _number(_nested(payload, "history", "tx_count_24h")),
+        ]
+        for name in CATEGORICAL_FEATURES:
+            row.append(_category(self._codes[name], payload.get(name)))
+        return row
+
+    def encode(self, payloads):
+        """Matriz (transações x features) em float64."""
+        return np.array([self.row(payload) for payload in payloads], dtype=np.float64).reshape(
+            len(payloads), len(self.feature_names))
+
+    def encode_valid(self, payloads):
+        """
+        Como encode, mas um payload que não pode ser codificado não derruba os
+        demais: retorna (matriz só com as linhas válidas, {índice: erro}).
+        """
+        rows, errors = [], {}
+        for index, payload in enumerate(payloads):
+            try:
+                rows.append(self.row(payload))
+            except Exception as e:
+                errors[index] = ValueError(f"Payload inválido: {str(e)}")
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self.feature_names)), errors
+
+    def raw_values(self, payload):
+        return {feature: self.raw_value(payload, feature) for feature in self.feature_names}
+
+    def raw_value(self, payload, feature):
+        """Valor original da feature no payload, para as explicações."""
+        if feature == "amount_log":
+            return payload.get("amount")
+        if feature in ("hour", "weekday"):
+            hour, weekday = _time_parts(payload.get("time"))
+            value = hour if feature == "hour" else weekday
+            return None if math.isnan(value) else int(value)
+        if feature == "payee_account_age_days":
+            return _nested(payload, "payee", "account_age_days")
+        if feature == "payer_tx_count_24h":
+            return _nested(payload, "history", "tx_count_24h")
+        return payload.get(feature)
@@ -0,0 +1,325 @@
+import os
+import json
+import math
+import mmap
+
+import numpy as np
+
+# Arquivos de um modelo salvo: metadados em JSON e um .npy por array, o que
+# permite carregar os arrays com np.load(mmap_mode="r")
+METADATA_FILE = "model.json"
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "default_left", "value", "cover", "roots")
+
+
+class TreeEnsemble:
+    """
+    Ensemble de árvores de decisão (gradient boosting) em arrays NumPy planos.
+
+    Os nós de todas as árvores ficam nos mesmos arrays, com índices globais:
+    um nó interno vai para left quando x[feature] < threshold, para right caso
+    contrário e para o lado default_left quando o valor é ausente (NaN). Folhas
+    apontam para si mesmas, então a travessia de um lote inteiro é um laço de
+    max_depth passos vetorizados sobre (linhas x árvores), sem máscaras.
+
+    value guarda o valor das folhas e, nos nós internos, a média dos filhos
+    ponderada por cover (soma de hessianos ou de amostras). A margem é
+    base_score + soma das folhas; com objective "binary:logistic" o score é a
+    sigmoide da margem.
+    """
+
+    def __init__(self, arrays, feature_names, base_score=0.0, objective="binary:logistic",
+                 metadata=None):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.feature_names = list(feature_names)
+        self.base_score = float(base_score)
+        self.objective = objective
+        self.metadata = dict(metadata or {})
+        self.max_depth = int(self.metadata.get("max_depth") or _max_depth(self.left, self.right, self.roots))
+        self.metadata["max_depth"] = self.max_depth
+        # Margem esperada (valor médio ponderado de cada árvore)
+        self.expected_value = self.base_score + float(np.sum(self.value[self.roots]))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    #################################################################
+    # PREDIÇÃO
+    #################################################################
+
+    def _leaves(self, X, path=None):
+        nodes = np.tile(np.asarray(self.roots), (len(X), 1))
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            features = self.feature[nodes]
+            values = X[rows, features]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if path is not None:
+                path(nodes, next_nodes, features)
+            nodes = next_nodes
+        return nodes
+
+    def predict_margin(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return self.base_score + self.value[self._leaves(X)].sum(axis=1)
+
+    def predict(self, X):
+        """Score de cada linha de X (probabilidade com binary:logistic)."""
+        return self.transform(self.predict_margin(X))
+
+    def transform(self, margin):
+        if self.objective.startswith("binary"):
+            return 1.0 / (1.0 + np.exp(-margin))
+        return margin
+
+    def predict_with_contributions(self, X):
+        """
+        Retorna (scores, contribuições). As contribuições (linhas x features)
+        seguem o caminho de decisão de cada árvore: cada split atribui à sua
+        feature a variação do valor do nó pai para o filho escolhido. A soma
+        de uma linha mais expected_value é a margem da linha.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n_rows, n_features = X.shape
+        contributions = np.zeros(n_rows * n_features)
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+
+        def accumulate(nodes, next_nodes, features):
+            delta = self.value[next_nodes] - self.value[nodes]
+            contributions[:] += np.bincount((row_offsets + features).ravel(), weights=delta.ravel(),
+                                            minlength=n_rows * n_features)
+
+        leaves = self._leaves(X, accumulate)
+        margin = self.base_score + self.value[leaves].sum(axis=1)
+        return self.transform(margin), contributions.reshape(n_rows, n_features)
+
+    def warm_up(self, rows=256, seed=0):
+        """
+        Prepara o modelo para servir: lê uma posição de cada página dos
+        arrays (mapeados do disco com mmap) e pontua um lote sintético com
+        valores próximos dos thresholds de cada feature, incluindo ausentes.
+        """
+        for name in ARRAY_NAMES:
+            data = np.asarray(getattr(self, name)).reshape(-1).view(np.uint8)
+            int(data[::mmap.PAGESIZE].sum())
+
+        rng = np.random.default_rng(seed)
+        internal = np.asarray(self.left) != np.arange(self.n_nodes)
+        X = np.zeros((rows, len(self.feature_names)))
+        for index in range(len(self.feature_names)):
+            thresholds = self.threshold[internal & (self.feature == index)]
+            if len(thresholds):
+                X[:, index] = rng.choice(thresholds, rows) + rng.normal(0, 1e-3, rows)
+        X[rng.random(X.shape) < 0.1] = np.nan
+        self.predict_with_contributions(X)
+
+    #################################################################
+    # SERIALIZAÇÃO
+    #################################################################
+
+    def save(self, path):
+        """Grava o modelo em um diretório (model.json e um .npy por array)."""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        # model.json é gravado por último e de forma atômica: um diretório só
+        # é um modelo completo quando ele existe
+        partial = os.path.join(path, f".{METADATA_FILE}.tmp")
+        with open(partial, "w") as f:
+            json.dump({
+                "feature_names": self.feature_names,
+                "base_score": self.base_score,
+                "objective": self.objective,
+                "metadata": self.metadata,
+            }, f, indent=2)
+        os.replace(partial, os.path.join(path, METADATA_FILE))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Carrega um modelo salvo com save(). Com mmap, os arrays são mapeados
+        do disco em vez de copiados para a memória do processo.
+        """
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            spec = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARRAY_NAMES
+        }
+        return cls(arrays, spec["feature_names"], spec["base_score"], spec["objective"], spec.get("metadata"))
+
+    #################################################################
+    # CONSTRUÇÃO
+    #################################################################
+
+    @classmethod
+    def from_trees(cls, trees, feature_names, base_score=0.0, objective="binary:logistic", metadata=None):
+        """
+        Monta o ensemble a partir de árvores em listas de nós com índices
+        locais: cada nó é um dict com feature (-1 em folhas), threshold, left,
+        right, default_left, value (obrigatório nas folhas) e cover.
+        """
+        sizes = [len(nodes) for nodes in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        total = int(sum(sizes))
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.zeros(total, dtype=np.float64)
+        left = np.arange(total, dtype=np.int32)
+        right = np.arange(total, dtype=np.int32)
+        default_left = np.zeros(total, dtype=bool)
+        value = np.zeros(total, dtype=np.float64)
+        cover = np.zeros(total, dtype=np.float64)
+
+        for offset, nodes in zip(offsets, trees):
+            for local, node in enumerate(nodes):
+                index = offset + local
+                cover[index] = node.get("cover", 1.0)
+                if node["feature"] < 0:
+                    value[index] = node["value"]
+                    continue
+                feature[index] = node["feature"]
+                threshold[index] = node["threshold"]
+                left[index] = offset + node["left"]
+                right[index] = offset + node["right"]
+                default_left[index] = bool(node.get("default_left", True))
+            _fill_internal_values(offset, len(nodes), feature, left, right, value, cover, nodes)
+
+        arrays = {
+            "feature": feature, "threshold": threshold, "left": left, "right": right,
+            "default_left": default_left, "value": value, "cover": cover, "roots": offsets,
+        }
+        return cls(arrays, feature_names, base_score, objective, metadata)
+
+
+def _fill_internal_values(offset, count, feature, left, right, value, cover, nodes):
+    # Valor dos nós internos: média dos filhos ponderada por cover, dos nós
+    # mais profundos para a raiz
+    order = []
+    stack = [offset]
+    while stack:
+        index = stack.pop()
+        order.append(index)
+        if nodes[index - offset]["feature"] >= 0:
+            stack.extend((left[index], right[index]))
+    for index in reversed(order):
+        if nodes[index - offset]["feature"] < 0:
+            continue
+        left_cover, right_cover = cover[left[index]], cover[right[index]]
+        total = left_cover + right_cover
+        if total > 0:
+            value[index] = (value[left[index]] * left_cover + value[right[index]] * right_cover) / total
+        else:
+            value[index] = (value[left[index]] + value[right[index]]) / 2
+        if not cover[index]:
+            cover[index] = total
+
+
+def _max_depth(left, right, roots):
+    depth = 0
+    nodes = np.asarray(roots)
+    while True:
+        internal = nodes[(left[nodes] != nodes)]
+        if not len(internal):
+            return depth
+        depth += 1
+        nodes = np.concatenate([left[internal], right[internal]])
+
+
+#################################################################
+# CONVERSORES (XGBOOST E LIGHTGBM)
+#################################################################
+
+def _load_json(source):
+    if isinstance(source, dict):
+        return source
+    with open(source) as f:
+        return json.load(f)
+
+
+def from_xgboost_json(source, metadata=None):
+    """
+    Converte um modelo XGBoost salvo em JSON (Booster.save_model("x.json"))
+    sem depender do pacote xgboost. Só boosters gbtree com features numéricas.
+    """
+    learner = _load_json(source)["learner"]
+    booster = learner["gradient_booster"]
+    if booster.get("name") != "gbtree":
+        raise ValueError(f"Booster XGBoost não suportado: {booster.get('name')}")
+    objective = learner["objective"]["name"]
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    if objective.startswith("binary"):
+        base_score = math.log(base_score / (1.0 - base_score))
+    feature_names = learner.get("feature_names") or [
+        f"f{index}" for index in range(int(learner["learner_model_param"]["num_feature"]))
+    ]
+
+    trees = []
+    for tree in booster["model"]["trees"]:
+        nodes = []
+        for index, left in enumerate(tree["left_children"]):
+            cover = float(tree["sum_hessian"][index])
+            if left == -1:
+                nodes.append({"feature": -1, "value": float(tree["split_conditions"][index]), "cover": cover})
+            else:
+                nodes.append({
+                    "feature": int(tree["split_indices"][index]),
+                    "threshold": float(tree["split_conditions"][index]),
+                    "left": int(left),
+                    "right": int(tree["right_children"][index]),
+                    "default_left": bool(tree["default_left"][index]),
+                    "cover": cover,
+                })
+        trees.append(nodes)
+    return TreeEnsemble.from_trees(trees, feature_names, base_score, objective,
+                                   dict(metadata or {}, source="xgboost"))
+
+
+def from_lightgbm_json(source, metadata=None):
+    """
+    Converte um modelo LightGBM exportado com Booster.dump_model() (JSON) sem
+    depender do pacote lightgbm. Só splits numéricos ("<="); o limiar é
+    ajustado para o próximo float, já que aqui a comparação é "<".
+    """
+    model = _load_json(source)
+    objective = model.get("objective", "binary")
+    trees = []
+    for info in model["tree_info"]:
+        nodes = []
+
+        def add(node):
+            index = len(nodes)
+            nodes.append(None)
+            if "leaf_value" in node:
+                nodes[index] = {"feature": -1, "value": float(node["leaf_value"]),
+                                "cover": float(node.get("leaf_weight", node.get("leaf_count", 1.0)))}
+                return index
+            if node.get("decision_type", "<=") != "<=":
+                raise ValueError(f"Split LightGBM não suportado: {node.get('decision_type')}")
+            threshold = float(node["threshold"])
+            # missing_type "None": o LightGBM trata ausentes como zero
+            default_left = bool(node.get("default_left", True))
+            if node.get("missing_type") == "None":
+                default_left = 0.0 <= threshold
+            left = add(node["left_child"])
+            right = add(node["right_child"])
+            nodes[index] = {
+                "feature": int(node["split_feature"]),
+                "threshold": float(np.nextafter(threshold, np.inf)),
+                "left": left,
+                "right": right,
+                "default_left": default_left,
+                "cover": float(node.get("internal_weight", node.get("internal_count", 0.0))),
+            }
+            return index
+
+        add(info["tree_structure"])
+        trees.append(nodes)
+    objective_name = "binary:logistic" if objective.startswith("binary") else objective
+    return TreeEnsemble.from_trees(trees, model["feature_names"], 0.0, objective_name,
+                                   dict(metadata or {}, source="lightgbm"))
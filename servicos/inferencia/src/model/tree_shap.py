@@ -0,0 +1,189 @@
+import math
+
+import numpy as np
+
+# Limite de memória das tabelas; modelos acima dele não usam o caminho tabelado
+TABLE_MAX_BYTES = 256 * 1024 * 1024
+
+# Elementos (linhas x folhas x colunas da tabela) processados por vez em
+# shap_values
+CHUNK_ELEMENTS = 1 << 21
+
+
+def _shapley_weights(m):
+    # Peso de um subconjunto de tamanho t entre as m features do caminho
+    return np.array([math.factorial(t) * math.factorial(m - 1 - t) / math.factorial(m) for t in range(m)])
+
+
+def _leaf_paths(model):
+    """
+    Caminho de cada folha: lista de (nó, foi para a esquerda, fração de
+    cover do filho) da raiz até a folha.
+    """
+    left, right, cover = np.asarray(model.left), np.asarray(model.right), np.asarray(model.cover)
+    paths = []
+    for root in np.asarray(model.roots).tolist():
+        stack = [(root, [])]
+        while stack:
+            node, path = stack.pop()
+            if left[node] == node:
+                paths.append((node, path))
+                continue
+            parent_cover = cover[node] or 1.0
+            for child, went_left in ((int(right[node]), False), (int(left[node]), True)):
+                stack.append((child, path + [(node, went_left, cover[child] / parent_cover)]))
+    return paths
+
+
+class ShapTables:
+    """
+    Valores SHAP exatos (TreeSHAP path-dependent) de um TreeEnsemble a partir
+    de tabelas pré-computadas por folha.
+
+    Na versão path-dependent, a contribuição de uma folha de valor v para a
+    feature k do seu caminho depende apenas de quais features do caminho a
+    linha satisfaz (o_j em {0, 1}) e das frações de cover z_j dos splits
+    (features repetidas no caminho são combinadas: o_j é o E lógico das
+    condições e z_j o produto das frações):
+
+        phi_k += v * (o_k - z_k) * soma_{S ⊆ M\\{k}} w(|S|) * prod_{s∈S} o_s * prod_{s∉S, s≠k} z_s
+
+    Com o_j binário, o valor é função da máscara das condições satisfeitas
+    ao longo do caminho, então cada folha guarda uma linha de contribuições
+    por máscara. Em um lote: avalia-se a decisão de cada nó uma vez por
+    linha, monta-se a máscara de cada folha, lê-se a linha correspondente da
+    tabela e as contribuições são somadas por feature com um produto de
+    matrizes. A soma das contribuições de uma linha mais expected_value é a
+    margem da linha.
+    """
+
+    def __init__(self, model, max_bytes=TABLE_MAX_BYTES):
+        self.model = model
+        self.n_features = len(model.feature_names)
+        self.expected_value = model.expected_value
+        paths = _leaf_paths(model)
+        n_leaves = len(paths)
+        depth = max([len(path) for _, path in paths] + [1])
+
+        unique_lists = []
+        for _, path in paths:
+            features = []
+            for node, _, _ in path:
+                if int(model.feature[node]) not in features:
+                    features.append(int(model.feature[node]))
+            unique_lists.append(features)
+        # Colunas da tabela: uma por feature distinta do caminho
+        self.width = max([len(features) for features in unique_lists] + [1])
+
+        lengths = np.array([len(path) for _, path in paths], dtype=np.int64)
+        table_rows = int((1 << lengths).sum())
+        table_bytes = table_rows * self.width * 8
+        if table_bytes > max_bytes:
+            raise ValueError(f"Tabelas SHAP exigiriam {table_bytes / 2 ** 20:.0f} MB "
+                             f"(limite {max_bytes / 2 ** 20:.0f} MB)")
+
+        self.path_node = np.zeros((n_leaves, depth), dtype=np.int64)
+        self.path_left = np.zeros((n_leaves, depth), dtype=bool)
+        self.path_valid = np.zeros((n_leaves, depth), dtype=bool)
+        self.offset = np.concatenate([[0], np.cumsum(1 << lengths)[:-1]]).astype(np.int64)
+        self.table = np.zeros((table_rows, self.width))
+
+        # Matriz (folhas x colunas, features) que soma as colunas da tabela
+        # na feature correspondente
+        self.scatter = np.zeros((n_leaves * self.width, self.n_features))
+
+        leaf_values = np.asarray(model.value)
+        groups = {}
+        for index, (leaf, path) in enumerate(paths):
+            features = unique_lists[index]
+            fractions = [1.0] * len(features)
+            for position, (node, went_left, fraction) in enumerate(path):
+                fractions[features.index(int(model.feature[node]))] *= fraction
+                self.path_node[index, position] = node
+                self.path_left[index, position] = went_left
+                self.path_valid[index, position] = True
+            for column, feature in enumerate(features):
+                self.scatter[index * self.width + column, feature] = 1.0
+            # Folhas com a mesma sequência de features (por posição) têm a
+            # mesma expansão de máscaras e são calculadas juntas
+            signature = tuple(features.index(int(model.feature[node])) for node, _, _ in path)
+            groups.setdefault(signature, []).append((index, fractions, leaf_values[leaf]))
+
+        for signature, members in groups.items():
+            if not signature:
+                continue
+            indices = np.array([index for index, _, _ in members])
+            Z = np.array([fractions for _, fractions, _ in members])
+            values = np.array([value for _, _, value in members])
+            unique_tables = _unique_tables(Z, values)
+            # Máscara por posição -> máscara por feature distinta (E lógico
+            # das posições de cada feature)
+            d, m = len(signature), Z.shape[1]
+            position_masks = np.arange(1 << d)
+            unique_masks = np.full(1 << d, (1 << m) - 1)
+            for position, column in enumerate(signature):
+                failed = ((position_masks >> position) & 1) == 0
+                unique_masks[failed] &= ~(1 << column)
+            rows = self.offset[indices][:, None] + position_masks[None, :]
+            self.table[rows, :m] = unique_tables[:, unique_masks, :]
+
+        # Colunas de path_node/path_left/path_valid por posição, já no
+        # formato usado em _shap_chunk
+        self._positions = [(np.ascontiguousarray(self.path_node[:, position]), self.path_left[:, position, None],
+                            self.path_valid[:, position, None]) for position in range(depth)]
+        self._mask_dtype = np.uint8 if depth <= 8 else np.uint16 if depth <= 16 else np.uint32
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.table, self.scatter, self.path_node, self.path_left,
+                                               self.path_valid, self.offset))
+
+    def shap_values(self, X):
+        """Contribuições SHAP (linhas x features) para a margem."""
+        X = np.asarray(X, dtype=np.float64)
+        result = np.zeros((len(X), self.n_features))
+        rows_per_chunk = max(1, CHUNK_ELEMENTS // (len(self.path_node) * self.width))
+        for start in range(0, len(X), rows_per_chunk):
+            chunk = X[start:start + rows_per_chunk]
+            result[start:start + len(chunk)] = self._shap_chunk(chunk)
+        return result
+
+    def _shap_chunk(self, X):
+        model = self.model
+        values = X[:, np.asarray(model.feature)]
+        go_left = np.where(np.isnan(values), np.asarray(model.default_left), values < np.asarray(model.threshold))
+        # Decisões por nó com os nós nas linhas: cada posição dos caminhos
+        # copia linhas contíguas
+        go_left = np.ascontiguousarray(go_left.T)
+        masks = np.zeros((len(self.path_node), len(X)), dtype=self._mask_dtype)
+        for position, (nodes, went_left, valid) in enumerate(self._positions):
+            satisfied = np.take(go_left, nodes, axis=0)
+            np.equal(satisfied, went_left, out=satisfied)
+            satisfied &= valid
+            masks |= satisfied.view(np.uint8).astype(self._mask_dtype, copy=False) << position
+        contributions = np.take(self.table, self.offset[None, :] + masks.T, axis=0)
+        return contributions.reshape(len(X), -1) @ self.scatter
+
+
+def _unique_tables(Z, leaf_values):
+    """
+    Tabelas (folhas x máscaras x m) de folhas com m features distintas no
+    caminho. A soma sobre subconjuntos é o polinômio prod_{s≠k} (z_s + o_s*y)
+    avaliado com os pesos de Shapley de cada grau.
+    """
+    n_leaves, m = Z.shape
+    masks = np.arange(1 << m)
+    bits = ((masks[:, None] >> np.arange(m)[None, :]) & 1).astype(np.float64)
+    weights = _shapley_weights(m)
+    tables = np.empty((n_leaves, 1 << m, m))
+    for k in range(m):
+        poly = np.zeros((n_leaves, 1 << m, m))
+        poly[:, :, 0] = 1.0
+        for s in range(m):
+            if s == k:
+                continue
+            shifted = np.zeros_like(poly)
+            shifted[:, :, 1:] = poly[:, :, :-1] * bits[None, :, s, None]
+            poly = poly * Z[:, s, None, None] + shifted
+        tables[:, :, k] = leaf_values[:, None] * (bits[None, :, k] - Z[:, k, None]) * (poly @ weights)
+    return tables
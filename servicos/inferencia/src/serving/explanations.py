@@ -0,0 +1,414 @@
+import os
+import time
+import queue
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from model.tree_shap import ShapTables
+
+# Como /predict explica o score:
+# shap: valores SHAP exatos na resposta (cache por vetor quantizado e, nas
+#       faltas, tabelas TreeSHAP pré-computadas)
+# async: atribuição pelo caminho de decisão na resposta; os valores SHAP
+#        exatos são calculados em segundo plano e consultados depois em
+#        /explanations/<transaction_id>
+# path: apenas a atribuição pelo caminho de decisão
+EXPLANATION_MODE = os.getenv("EXPLANATION_MODE", "shap")
+EXPLANATION_TOP_FACTORS = int(os.getenv("EXPLANATION_TOP_FACTORS", "5"))
+# Cortes por feature na chave do cache. 0 usa todos os thresholds do modelo:
+# linhas com a mesma chave tomam as mesmas decisões em todos os nós e têm os
+# mesmos valores SHAP (sem perda). N > 0 limita a N cortes por feature, com
+# mais acertos e valores aproximados
+EXPLANATION_CACHE_RESOLUTION = int(os.getenv("EXPLANATION_CACHE_RESOLUTION", "0"))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "50000"))
+# Explicações completas mantidas por transaction_id
+EXPLANATION_STORE_SIZE = int(os.getenv("EXPLANATION_STORE_SIZE", "100000"))
+EXPLANATION_STORE_TTL = float(os.getenv("EXPLANATION_STORE_TTL", "3600"))
+EXPLANATION_QUEUE_SIZE = int(os.getenv("EXPLANATION_QUEUE_SIZE", "10000"))
+# Fração das explicações aproximadas comparadas com os valores exatos
+EXPLANATION_CONSISTENCY_SAMPLE_RATE = float(os.getenv("EXPLANATION_CONSISTENCY_SAMPLE_RATE", "0.01"))
+
+EXPLANATION_MODES = ("shap", "async", "path")
+
+# Métodos reportados na resposta e nos rótulos das métricas
+METHOD_TREE_SHAP = "tree_shap"
+METHOD_CACHED = "tree_shap_cached"
+METHOD_PATH = "decision_path"
+
+explanations_total = Counter(
+    'ml_explanations_total',
+    'Explicações servidas por método',
+    ['model_version', 'method']
+)
+
+explanation_duration = Histogram(
+    'ml_explanation_duration_seconds',
+    'Tempo de explicação de um lote (cache e tabelas SHAP)',
+    ['model_version'],
+    buckets=[0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+
+explanation_consistency = Histogram(
+    'ml_explanation_consistency',
+    'Fração dos principais fatores da explicação servida presentes nos fatores SHAP exatos',
+    ['model_version', 'method'],
+    buckets=[0.2, 0.4, 0.6, 0.8, 0.9, 1.0]
+)
+
+explanation_error = Histogram(
+    'ml_explanation_attribution_error',
+    'Erro relativo (L1) das contribuições servidas em relação às SHAP exatas',
+    ['model_version', 'method'],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
+)
+
+explanation_queue_depth = Gauge(
+    'ml_explanation_queue_depth',
+    'Explicações exatas aguardando cálculo em segundo plano'
+)
+
+explanation_jobs_dropped = Counter(
+    'ml_explanation_jobs_dropped_total',
+    'Cálculos de explicação em segundo plano descartados com a fila cheia',
+    ['kind']
+)
+
+
+def consistency(served, exact, top=EXPLANATION_TOP_FACTORS):
+    """
+    Retorna (concordância dos top fatores, erro relativo L1) entre as
+    contribuições servidas e as exatas de uma transação.
+    """
+    top = min(top, len(exact))
+    served_top = set(np.argsort(-np.abs(served))[:top].tolist())
+    exact_top = set(np.argsort(-np.abs(exact))[:top].tolist())
+    scale = float(np.abs(exact).sum())
+    error = float(np.abs(served - exact).sum()) / scale if scale else 0.0
+    return len(served_top & exact_top) / top if top else 1.0, error
+
+
+class Quantizer:
+    """
+    Chave de cache de um vetor de features: o intervalo entre cortes em que
+    cada valor cai (ausentes têm código próprio). Os cortes de uma feature
+    são os thresholds do modelo para ela, opcionalmente reduzidos a
+    resolution pontos.
+    """
+
+    def __init__(self, model, resolution=EXPLANATION_CACHE_RESOLUTION):
+        internal = np.asarray(model.left) != np.arange(model.n_nodes)
+        feature = np.asarray(model.feature)
+        threshold = np.asarray(model.threshold)
+        self.resolution = resolution
+        self.edges = []
+        for index in range(len(model.feature_names)):
+            edges = np.unique(threshold[internal & (feature == index)])
+            if resolution and len(edges) > resolution:
+                edges = edges[np.linspace(0, len(edges) - 1, resolution).round().astype(int)]
+            self.edges.append(edges)
+
+    @property
+    def lossless(self):
+        return not self.resolution
+
+    def keys(self, X):
+        codes = np.empty(X.shape, dtype=np.int32)
+        for index, edges in enumerate(self.edges):
+            column = X[:, index]
+            codes[:, index] = np.searchsorted(edges, column, side="right")
+            codes[np.isnan(column), index] = -1
+        return [row.tobytes() for row in codes]
+
+
+class ExplanationCache:
+    """Cache LRU de contribuições SHAP por chave quantizada."""
+
+    def __init__(self, max_entries=EXPLANATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ExplanationStore:
+    """
+    Explicações completas por transaction_id, com limite de entradas e TTL.
+    A primeira versão a registrar uma transação é a dona da entrada (uma
+    pontuação em shadow não sobrescreve a explicação da versão que
+    respondeu).
+    """
+
+    def __init__(self, max_entries=EXPLANATION_STORE_SIZE, ttl=EXPLANATION_STORE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, transaction_id, model_version):
+        """Registra a explicação como pendente; False se já existe."""
+        with self._lock:
+            entry = self._live(transaction_id)
+            if entry is not None:
+                return False
+            self._entries[transaction_id] = {
+                "transaction_id": transaction_id,
+                "model_version": model_version,
+                "status": "pending",
+                "requested_at": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def complete(self, transaction_id, model_version, explanation):
+        """
+        Grava a explicação calculada (contribuições como array; a formatação
+        fica para a consulta).
+        """
+        with self._lock:
+            entry = self._entries.get(transaction_id)
+            if entry is None or entry["model_version"] != model_version:
+                return
+            entry.update(status="complete", computed_at=time.time(), explanation=explanation)
+
+    def discard(self, transaction_id):
+        with self._lock:
+            self._entries.pop(transaction_id, None)
+
+    def put(self, transaction_id, model_version, explanation):
+        if self.begin(transaction_id, model_version):
+            self.complete(transaction_id, model_version, explanation)
+
+    def get(self, transaction_id):
+        with self._lock:
+            entry = self._live(transaction_id)
+            if entry is None:
+                return None
+            entry = dict(entry)
+        explanation = entry.pop("explanation", None)
+        if explanation is not None:
+            entry.update(_format_explanation(*explanation))
+        return entry
+
+    def _live(self, transaction_id):
+        entry = self._entries.get(transaction_id)
+        if entry is not None and time.time() - entry["requested_at"] > self.ttl:
+            del self._entries[transaction_id]
+            return None
+        return entry
+
+
+def _format_explanation(method, contributions, raw_values, feature_names, expected_value):
+    """Todas as contribuições de uma transação, da maior para a menor em módulo."""
+    order = np.argsort(-np.abs(contributions))
+    return {
+        "method": method,
+        "expected_value": expected_value,
+        "margin": expected_value + float(contributions.sum()),
+        "contributions": [{
+            "feature": feature_names[index],
+            "contribution": float(contributions[index]),
+            "value": raw_values.get(feature_names[index]),
+        } for index in order.tolist()],
+    }
+
+
+class ExplanationWorker:
+    """
+    Thread que calcula valores SHAP exatos fora do caminho da requisição:
+    explicações completas (modo async) e amostras de consistência. Os
+    pedidos pendentes são agrupados por versão em um único cálculo.
+    """
+
+    def __init__(self, queue_size=EXPLANATION_QUEUE_SIZE, max_batch=256):
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, engine, kind, row, transaction_id=None, served=None, method=None, raw_values=None):
+        self._start()
+        try:
+            self._queue.put_nowait((engine, kind, row, transaction_id, served, method, raw_values))
+        except queue.Full:
+            explanation_jobs_dropped.labels(kind).inc()
+            return False
+        explanation_queue_depth.set(self._queue.qsize())
+        return True
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="explanation-worker", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            explanation_queue_depth.set(self._queue.qsize())
+            groups = {}
+            for job in jobs:
+                groups.setdefault(id(job[0]), []).append(job)
+            for group in groups.values():
+                try:
+                    self._process(group)
+                except Exception as e:
+                    print(f"Erro ao calcular explicações: {str(e)}")
+
+    def _process(self, jobs):
+        engine = jobs[0][0]
+        exact = engine.tables.shap_values(np.array([job[2] for job in jobs]))
+        for (_, kind, _, transaction_id, served, method, raw_values), values in zip(jobs, exact):
+            if served is not None:
+                engine.record_consistency(method, served, values)
+            if kind == "full":
+                explanation_store.complete(transaction_id, engine.version,
+                                           engine.stored_explanation(METHOD_TREE_SHAP, values, raw_values))
+
+
+# Compartilhados pelas versões carregadas: a explicação de uma transação é
+# consultada pelo transaction_id, qualquer que seja a versão que respondeu
+explanation_store = ExplanationStore()
+explanation_worker = ExplanationWorker()
+
+
+class ExplanationEngine:
+    """
+    Explicações de um modelo (uma versão) para os lotes do MicroBatcher.
+
+    explain() recebe o lote codificado e as contribuições pelo caminho de
+    decisão (já calculadas junto com o score) e retorna as contribuições
+    servidas e o método de cada linha, conforme o modo:
+
+    - shap: cache LRU por vetor quantizado; as faltas são calculadas juntas
+      com as tabelas TreeSHAP (ShapTables) e a explicação completa fica
+      disponível em explanation_store;
+    - async: devolve a atribuição pelo caminho e agenda o cálculo exato da
+      transação em explanation_worker;
+    - path: apenas a atribuição pelo caminho.
+
+    Uma fração das explicações aproximadas (caminho de decisão e cache com
+    quantização reduzida) é comparada com os valores exatos em segundo plano
+    (ml_explanation_consistency e ml_explanation_attribution_error); no modo
+    async a comparação sai de graça para todas as transações. Sem memória
+    para as tabelas, o modo cai para path.
+    """
+
+    def __init__(self, model, version, raw_values, mode=EXPLANATION_MODE,
+                 resolution=EXPLANATION_CACHE_RESOLUTION, cache_size=EXPLANATION_CACHE_SIZE,
+                 sample_rate=EXPLANATION_CONSISTENCY_SAMPLE_RATE):
+        if mode not in EXPLANATION_MODES:
+            raise ValueError(f"Modo de explicação inválido: {mode} (use {', '.join(EXPLANATION_MODES)})")
+        self.model = model
+        self.version = version
+        self.raw_values = raw_values
+        self.mode = mode
+        self.resolution = resolution
+        self.sample_rate = sample_rate
+        self.cache = ExplanationCache(cache_size)
+        self.tables = None
+        self.quantizer = None
+        self._prepared = False
+
+    def prepare(self):
+        """Monta as tabelas SHAP e a quantização (na carga da versão)."""
+        if self._prepared:
+            return
+        self._prepared = True
+        if self.mode == "path" and not self.sample_rate:
+            return
+        try:
+            self.tables = ShapTables(self.model)
+        except ValueError as e:
+            print(f"Explicações SHAP desativadas para o modelo {self.version}: {str(e)}")
+            self.mode = "path"
+            return
+        self.quantizer = Quantizer(self.model, self.resolution)
+
+    def explain(self, X, payloads, path_contributions):
+        """Retorna (contribuições servidas, método de cada linha)."""
+        self.prepare()
+        if self.mode != "shap":
+            methods = [METHOD_PATH] * len(X)
+            for row, payload in enumerate(payloads):
+                transaction_id = payload.get("transaction_id")
+                if self.mode == "async" and transaction_id and explanation_store.begin(transaction_id, self.version):
+                    if not explanation_worker.submit(self, "full", X[row], transaction_id, path_contributions[row],
+                                                     METHOD_PATH, self.raw_values(payload)):
+                        explanation_store.discard(transaction_id)
+                elif self.tables is not None and random.random() < self.sample_rate:
+                    explanation_worker.submit(self, "consistency", X[row], served=path_contributions[row],
+                                              method=METHOD_PATH)
+            explanations_total.labels(self.version, METHOD_PATH).inc(len(X))
+            return path_contributions, methods
+
+        start = time.perf_counter()
+        keys = self.quantizer.keys(X)
+        contributions = np.empty(X.shape)
+        methods = [METHOD_CACHED] * len(X)
+        misses = []
+        for row, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                misses.append(row)
+            else:
+                contributions[row] = cached
+        if misses:
+            computed = self.tables.shap_values(X[misses])
+            for row, values in zip(misses, computed):
+                contributions[row] = values
+                methods[row] = METHOD_TREE_SHAP
+                self.cache.put(keys[row], values)
+        explanation_duration.labels(self.version).observe(time.perf_counter() - start)
+
+        for row, payload in enumerate(payloads):
+            transaction_id = payload.get("transaction_id")
+            if transaction_id:
+                explanation_store.put(transaction_id, self.version, self.stored_explanation(
+                    methods[row], contributions[row], self.raw_values(payload)))
+            if (methods[row] == METHOD_CACHED and not self.quantizer.lossless
+                    and random.random() < self.sample_rate):
+                explanation_worker.submit(self, "consistency", X[row], served=contributions[row],
+                                          method=METHOD_CACHED)
+        hits = len(X) - len(misses)
+        if hits:
+            explanations_total.labels(self.version, METHOD_CACHED).inc(hits)
+        if misses:
+            explanations_total.labels(self.version, METHOD_TREE_SHAP).inc(len(misses))
+        return contributions, methods
+
+    def record_consistency(self, method, served, exact):
+        agreement, error = consistency(served, exact)
+        explanation_consistency.labels(self.version, method).observe(agreement)
+        explanation_error.labels(self.version, method).observe(error)
+
+    def stored_explanation(self, method, contributions, raw_values):
+        # Sem referência ao engine: a versão pode ser descarregada antes de
+        # a explicação expirar
+        return (method, contributions.copy(), raw_values, self.model.feature_names, self.model.expected_value)
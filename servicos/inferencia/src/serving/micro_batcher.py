@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Histogram
+
+# Tamanho máximo do lote e espera máxima da primeira requisição do lote
+BATCH_MAX_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_SECONDS = float(os.getenv("INFERENCE_BATCH_MAX_WAIT_MS", "2")) / 1000
+
+inference_batch_size = Histogram(
+    'ml_inference_batch_size',
+    'Requisições por lote de inferência',
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256]
+)
+
+inference_batch_wait = Histogram(
+    'ml_inference_batch_wait_seconds',
+    'Espera na fila da requisição mais antiga de cada lote',
+    buckets=[0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+
+
+class MicroBatcher:
+    """
+    Agrupa requisições concorrentes em lotes dinâmicos.
+
+    submit(item) enfileira o item e aguarda o resultado. Um lote é fechado
+    quando atinge max_batch_size itens ou quando o item mais antigo espera
+    max_wait segundos, o que vier primeiro; process(itens) roda em uma thread
+    dedicada e retorna um resultado por item, na mesma ordem (uma exceção no
+    lugar do resultado falha só a requisição daquele item). Só um lote é
+    processado por vez: enquanto ele roda, as novas requisições se acumulam e
+    formam o próximo lote, então o lote cresce com a carga sem aumentar a
+    espera quando o serviço está ocioso. Com max_batch_size=1 cada requisição
+    é processada sozinha.
+    """
+
+    def __init__(self, process, max_batch_size=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT_SECONDS):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._full = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference-batch")
+
+    def start(self):
+        """Inicia a tarefa de agrupamento no event loop corrente (idempotente)."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        if self._queue.qsize() >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            remaining = first[2] + self.max_wait - time.perf_counter()
+            if remaining > 0 and self._queue.qsize() + 1 < self.max_batch_size:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [first]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            inference_batch_size.observe(len(batch))
+            inference_batch_wait.observe(time.perf_counter() - first[2])
+            try:
+                results = await loop.run_in_executor(self._executor, self.process, [item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                # Requisições canceladas (cliente desconectou) são ignoradas
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
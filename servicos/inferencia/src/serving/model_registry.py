@@ -0,0 +1,435 @@
+import os
+import time
+import zlib
+import functools
+import random
+import asyncio
+import resource
+import threading
+from prometheus_client import Counter, Gauge, Histogram
+
+from serving.micro_batcher import BATCH_MAX_SIZE, BATCH_MAX_WAIT_SECONDS, MicroBatcher
+
+# Diretório do registro: uma versão por subdiretório (ex.: .../1.0, .../1.1),
+# cada uma gravada com TreeEnsemble.save (model.json marca a versão completa)
+MODEL_REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH", "/models/fraude_pix_principal")
+# Versão fixada; sem ela, a mais recente do diretório
+MODEL_VERSION = os.getenv("MODEL_VERSION") or None
+# swap: novas versões substituem a ativa assim que aquecidas
+# shadow: novas versões são candidatas, pontuadas em paralelo sem responder
+# ab: novas versões são candidatas e respondem a MODEL_AB_TRAFFIC das transações
+MODEL_ROLLOUT_MODE = os.getenv("MODEL_ROLLOUT_MODE", "swap")
+MODEL_AB_TRAFFIC = float(os.getenv("MODEL_AB_TRAFFIC", "0.1"))
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+MODEL_WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "256"))
+# Limite de pontuações em shadow pendentes; acima dele o shadow é descartado
+SHADOW_MAX_PENDING = int(os.getenv("MODEL_SHADOW_MAX_PENDING", "256"))
+
+ROLLOUT_MODES = ("swap", "shadow", "ab")
+METADATA_FILE = "model.json"
+
+model_version_gauge = Gauge(
+    'ml_model_version',
+    'Versões de modelo carregadas no serviço (1 por versão e papel)',
+    ['model_name', 'model_version', 'role']
+)
+
+model_reload_duration = Histogram(
+    'ml_model_reload_duration_seconds',
+    'Duração das etapas de carga de uma versão de modelo',
+    ['model_name', 'stage'],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+model_reload_peak_rss = Gauge(
+    'ml_model_reload_peak_rss_bytes',
+    'Pico de memória residente do processo durante a última carga de modelo',
+    ['model_name']
+)
+
+model_reload_rss_delta = Gauge(
+    'ml_model_reload_rss_delta_bytes',
+    'Memória residente adicional no pico da última carga de modelo',
+    ['model_name']
+)
+
+model_swaps = Counter(
+    'ml_model_swaps_total',
+    'Cargas de versões de modelo por papel e resultado',
+    ['model_name', 'role', 'result']
+)
+
+shadow_score_delta = Histogram(
+    'ml_shadow_score_delta',
+    'Diferença absoluta entre o score da versão candidata e o da ativa',
+    ['model_name', 'model_version'],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+shadow_decisions = Counter(
+    'ml_shadow_decisions_total',
+    'Decisões da versão candidata em shadow comparadas às da ativa',
+    ['model_name', 'model_version', 'agreement']
+)
+
+
+def _version_key(version):
+    # "1.10" > "1.9": compara as partes numéricas como números
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in version.split("."))
+
+
+def _bucket(key):
+    """Posição estável em [0, 1) de uma transação, para o roteamento A/B."""
+    if key is None:
+        return random.random()
+    return zlib.crc32(str(key).encode()) / 2 ** 32
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _RssSampler:
+    """Amostra a memória residente em uma thread enquanto o bloco executa."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.baseline = self.peak = _rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+class ModelSlot:
+    """
+    Versão carregada e aquecida, com o seu próprio MicroBatcher (um lote
+    nunca mistura versões). Conta as requisições em andamento para que a
+    versão substituída só seja descarregada depois de respondê-las. As
+    pontuações sem explicação (shadow) usam um segundo batcher, criado sob
+    demanda.
+    """
+
+    def __init__(self, version, path, scorer, max_batch_size, max_wait, load_stats):
+        self.version = version
+        self.path = path
+        self.scorer = scorer
+        self.batcher = MicroBatcher(scorer.score_batch, max_batch_size, max_wait)
+        self.score_only_batcher = None
+        self.load_stats = load_stats
+        self.loaded_at = time.time()
+        self.inflight = 0
+        self.retired = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def score(self, payload, explain=True):
+        """Retorna (score, explicação); sem explain, a explicação é None."""
+        batcher = self.batcher
+        if not explain:
+            if self.score_only_batcher is None:
+                self.score_only_batcher = MicroBatcher(
+                    functools.partial(self.scorer.score_batch, explain=False),
+                    self.batcher.max_batch_size, self.batcher.max_wait)
+            batcher = self.score_only_batcher
+        self.inflight += 1
+        self._idle.clear()
+        try:
+            return await batcher.submit(payload)
+        finally:
+            self.inflight -= 1
+            if not self.inflight:
+                self._idle.set()
+
+    async def retire(self):
+        """Aguarda as requisições em andamento e encerra o batcher."""
+        self.retired = True
+        await self._idle.wait()
+        await self.batcher.stop()
+        if self.score_only_batcher is not None:
+            await self.score_only_batcher.stop()
+
+    def status(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "inflight": self.inflight,
+            "n_trees": self.scorer.model.n_trees,
+            "load": self.load_stats,
+        }
+
+
+class ModelRegistry:
+    """
+    Registro de versões de um modelo em um diretório local.
+
+    Cada versão é carregada com mmap e aquecida fora do event loop; só então
+    a referência da versão ativa (ou candidata) é trocada, uma atribuição
+    atômica: requisições novas usam a versão nova, as que já estavam em
+    andamento terminam na anterior, que é descarregada depois de drenada.
+    Uma tarefa em segundo plano verifica o diretório a cada poll_interval
+    segundos; reload() força a verificação ou ativa uma versão específica.
+
+    loader(path) retorna o scorer de uma versão (score_batch, warmup e
+    model). on_change() é chamado após cada troca.
+    """
+
+    def __init__(self, root, model_name, loader, version=MODEL_VERSION, mode=MODEL_ROLLOUT_MODE,
+                 ab_traffic=MODEL_AB_TRAFFIC, poll_interval=MODEL_REGISTRY_POLL_SECONDS,
+                 max_batch_size=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT_SECONDS,
+                 warmup_rows=MODEL_WARMUP_ROWS, on_change=None):
+        if mode not in ROLLOUT_MODES:
+            raise ValueError(f"Modo de rollout inválido: {mode} (use {', '.join(ROLLOUT_MODES)})")
+        self.root = root
+        self.model_name = model_name
+        self.loader = loader
+        self.pinned = version
+        self.mode = mode
+        self.ab_traffic = ab_traffic
+        self.poll_interval = poll_interval
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.warmup_rows = warmup_rows
+        self.on_change = on_change
+
+        self.active = None
+        self.candidate = None
+        self.last_error = None
+        self._failed = {}
+        self._lock = None
+        self._task = None
+        self._background = set()
+
+    def versions(self):
+        """Versões completas no diretório, da mais antiga para a mais recente."""
+        try:
+            entries = [entry.name for entry in os.scandir(self.root)
+                       if entry.is_dir() and os.path.exists(os.path.join(entry.path, METADATA_FILE))]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=_version_key)
+
+    #################################################################
+    # CICLO DE VIDA
+    #################################################################
+
+    async def start(self):
+        """Carrega a versão inicial e inicia a verificação periódica."""
+        self._lock = asyncio.Lock()
+        await self.reload()
+        if self.active is None:
+            raise FileNotFoundError(f"Nenhum modelo em {self.root}")
+        if self.poll_interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for slot in (self.active, self.candidate):
+            if slot is not None:
+                await slot.retire()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"Erro ao verificar modelos em {self.root}: {str(e)}")
+
+    #################################################################
+    # CARGA E TROCA DE VERSÕES
+    #################################################################
+
+    async def reload(self, version=None):
+        """
+        Verifica o diretório e aplica o modo de rollout. Com version, carrega
+        (ou reaproveita a candidata) e ativa essa versão, que passa a ficar
+        fixada. Retorna o status do registro.
+        """
+        async with self._lock:
+            versions = self.versions()
+            if version is not None:
+                if version not in versions:
+                    raise FileNotFoundError(f"Versão {version} não encontrada em {self.root}")
+                await self._activate(version)
+                self.pinned = version
+                return self.status()
+            # Versões que já falharam ficam de fora até model.json mudar
+            loadable = [v for v in versions if not self._known_failure(v)]
+            if not loadable:
+                return self.status()
+            newest = loadable[-1]
+            if self.active is None:
+                await self._activate(self.pinned if self.pinned in loadable else newest)
+            elif self.mode == "swap":
+                target = self.pinned if self.pinned in versions else newest
+                if target != self.active.version and target in loadable:
+                    await self._activate(target)
+            elif (_version_key(newest) > _version_key(self.active.version)
+                  and (self.candidate is None or self.candidate.version != newest)):
+                await self._set_candidate(newest)
+            return self.status()
+
+    async def promote(self):
+        """Torna a candidata a versão ativa, sem recarregá-la."""
+        async with self._lock:
+            if self.candidate is None:
+                raise LookupError("Nenhuma versão candidata carregada")
+            version = self.candidate.version
+            await self._activate(version)
+            self.pinned = version
+            return self.status()
+
+    async def _activate(self, version):
+        if self.active is not None and self.active.version == version:
+            return
+        if self.candidate is not None and self.candidate.version == version:
+            slot, self.candidate = self.candidate, None
+            model_version_gauge.remove(self.model_name, version, "candidate")
+        else:
+            slot = await self._load(version, "active")
+        previous, self.active = self.active, slot
+        model_version_gauge.labels(self.model_name, version, "active").set(1)
+        if previous is not None:
+            model_version_gauge.remove(self.model_name, previous.version, "active")
+            self._retire(previous)
+        print(f"Modelo {self.model_name} {version} ativo"
+              + (f" (substituiu {previous.version})" if previous is not None else ""))
+        self._changed()
+
+    async def _set_candidate(self, version):
+        slot = await self._load(version, "candidate")
+        previous, self.candidate = self.candidate, slot
+        model_version_gauge.labels(self.model_name, version, "candidate").set(1)
+        if previous is not None:
+            model_version_gauge.remove(self.model_name, previous.version, "candidate")
+            self._retire(previous)
+        print(f"Modelo {self.model_name} {version} carregado como candidato ({self.mode})")
+        self._changed()
+
+    async def _load(self, version, role):
+        path = os.path.join(self.root, version)
+        try:
+            scorer, stats = await asyncio.get_running_loop().run_in_executor(None, self._load_blocking, path)
+        except Exception as e:
+            model_swaps.labels(self.model_name, role, "failed").inc()
+            self._failed[version] = self._mtime(version)
+            self.last_error = {"version": version, "error": str(e), "timestamp": time.time()}
+            raise
+        model_swaps.labels(self.model_name, role, "success").inc()
+        self._failed.pop(version, None)
+        slot = ModelSlot(version, path, scorer, self.max_batch_size, self.max_wait, stats)
+        slot.batcher.start()
+        return slot
+
+    def _load_blocking(self, path):
+        # Carga e aquecimento fora do event loop; a memória é amostrada
+        # durante as duas etapas, enquanto a versão anterior segue servindo
+        start = time.perf_counter()
+        with _RssSampler() as rss:
+            scorer = self.loader(path)
+            loaded = time.perf_counter()
+            scorer.warmup(self.warmup_rows)
+        warmed = time.perf_counter()
+
+        model_reload_duration.labels(self.model_name, "load").observe(loaded - start)
+        model_reload_duration.labels(self.model_name, "warmup").observe(warmed - loaded)
+        model_reload_duration.labels(self.model_name, "total").observe(warmed - start)
+        model_reload_peak_rss.labels(self.model_name).set(rss.peak)
+        model_reload_rss_delta.labels(self.model_name).set(rss.peak - rss.baseline)
+        return scorer, {
+            "load_seconds": round(loaded - start, 4),
+            "warmup_seconds": round(warmed - loaded, 4),
+            "peak_rss_bytes": rss.peak,
+            "rss_delta_bytes": rss.peak - rss.baseline,
+        }
+
+    def _mtime(self, version):
+        try:
+            return os.path.getmtime(os.path.join(self.root, version, METADATA_FILE))
+        except OSError:
+            return None
+
+    def _known_failure(self, version):
+        return version in self._failed and self._failed[version] == self._mtime(version)
+
+    def _retire(self, slot):
+        task = asyncio.get_running_loop().create_task(slot.retire())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    #################################################################
+    # ROTEAMENTO
+    #################################################################
+
+    def route(self, key=None):
+        """
+        Retorna (versão que responde, versão em shadow ou None) para a
+        transação. No modo ab a escolha é estável por key (transaction_id).
+        """
+        active, candidate = self.active, self.candidate
+        if candidate is None or self.mode == "swap":
+            return active, None
+        if self.mode == "ab":
+            return (candidate if _bucket(key) < self.ab_traffic else active), None
+        return active, candidate
+
+    def shadow(self, slot, payload, primary_score, threshold):
+        """Pontua o payload na versão em shadow, sem bloquear a resposta."""
+        if slot.inflight >= SHADOW_MAX_PENDING:
+            shadow_decisions.labels(self.model_name, slot.version, "skipped").inc()
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._shadow_score(slot, payload, primary_score, threshold))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _shadow_score(self, slot, payload, primary_score, threshold):
+        try:
+            score, _ = await slot.score(payload, explain=False)
+        except Exception as e:
+            print(f"Erro no shadow do modelo {slot.version}: {str(e)}")
+            shadow_decisions.labels(self.model_name, slot.version, "error").inc()
+            return
+        shadow_score_delta.labels(self.model_name, slot.version).observe(abs(score - primary_score))
+        agreement = "agree" if (score >= threshold) == (primary_score >= threshold) else "disagree"
+        shadow_decisions.labels(self.model_name, slot.version, agreement).inc()
+
+    def status(self):
+        return {
+            "model_name": self.model_name,
+            "root": self.root,
+            "mode": self.mode,
+            "ab_traffic": self.ab_traffic if self.mode == "ab" else None,
+            "pinned_version": self.pinned,
+            "available_versions": self.versions(),
+            "active": self.active.status() if self.active is not None else None,
+            "candidate": self.candidate.status() if self.candidate is not None else None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Os módulos do serviço são importados como nos containers: a partir de src/
+# (model, serving, middleware, app) e de compliance/
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(SERVICE_DIR, "src"))
+sys.path.insert(0, os.path.join(SERVICE_DIR, "compliance"))
+
+
+@pytest.fixture(scope="session")
+def model_registry(tmp_path_factory):
+    """Registro de modelos com a versão 1.0 treinada em eventos sintéticos."""
+    from model.features import FeatureEncoder
+    from model.train import synthetic_events, train
+
+    events = synthetic_events(5000, 42)
+    encoder = FeatureEncoder.fit(events)
+    y = np.array([1.0 if event["label"]["is_fraud"] else 0.0 for event in events])
+    model = train(encoder.encode(events), y, encoder.feature_names, trees=10, max_depth=4,
+                  metadata={"features": encoder.spec()})
+    root = tmp_path_factory.mktemp("models")
+    model.save(str(root / "1.0"))
+    return str(root)
+
+
+@pytest.fixture(scope="session")
+def transactions():
+    """Payloads de /predict (eventos sintéticos sem o rótulo)."""
+    from model.train import synthetic_events
+
+    return [{key: value for key, value in event.items() if key != "label"}
+            for event in synthetic_events(50, 7)]
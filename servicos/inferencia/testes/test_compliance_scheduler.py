@@ -0,0 +1,76 @@
+import json
+import asyncio
+
+from compliance_registry import ComplianceCheck, ComplianceRegistry
+from compliance_scheduler import ComplianceScheduler
+
+
+def _registry(schedule):
+    registry = ComplianceRegistry()
+    registry.register(ComplianceCheck("89", "monitoramento_tempo_real", lambda: 1.0, "1s",
+                                      id="monitoramento", schedule=schedule, max_age="24h"))
+    return registry
+
+
+def _run_for(scheduler, seconds, during=None):
+    async def run():
+        task = asyncio.get_running_loop().create_task(scheduler.run())
+        await asyncio.sleep(seconds / 2)
+        if during is not None:
+            during()
+        await asyncio.sleep(seconds / 2)
+        scheduler.stop()
+        await task
+
+    asyncio.run(run())
+
+
+def test_execucoes_agendadas_ignoram_o_cache():
+    calls = []
+    scheduler = ComplianceScheduler(_registry(0.05), lambda check_ids, force: calls.append((check_ids, force)))
+    _run_for(scheduler, 0.3)
+
+    # Avaliação inicial com cache; as agendadas reexecutam a verificação
+    assert calls[0] == (None, False)
+    scheduled = calls[1:]
+    assert scheduled
+    assert all(check_ids == {"monitoramento"} and force for check_ids, force in scheduled)
+
+
+def test_disparo_sem_force_respeita_o_cache():
+    calls = []
+    scheduler = ComplianceScheduler(_registry("1h"), lambda check_ids, force: calls.append((check_ids, force)))
+    _run_for(scheduler, 0.1, lambda: scheduler.trigger(["monitoramento"], force=False))
+    assert calls == [(None, False), ({"monitoramento"}, False)]
+
+
+def _http(scheduler, request):
+    async def run():
+        server = await asyncio.start_server(scheduler._handle_http, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        writer.write(request)
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    return asyncio.run(run())
+
+
+def test_erro_em_rota_responde_500():
+    scheduler = ComplianceScheduler(_registry("1h"), lambda check_ids, force: None)
+
+    def broken_route(query, headers):
+        raise RuntimeError("database is locked")
+
+    scheduler.add_route("GET", "/history", broken_route)
+    response = _http(scheduler, b"GET /history HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 500 Internal Server Error\r\n")
+    assert json.loads(response.split(b"\r\n\r\n", 1)[1]) == {"error": "erro interno"}
+
+
+def test_parametro_invalido_responde_400():
+    scheduler = ComplianceScheduler(_registry("1h"), lambda check_ids, force: None)
+    response = _http(scheduler, b"POST /evaluate?checks=desconhecida HTTP/1.1\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 400 ")
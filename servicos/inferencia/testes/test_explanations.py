@@ -0,0 +1,77 @@
+import os
+import math
+import itertools
+from collections import defaultdict
+
+import numpy as np
+
+from app import FraudScorer
+from model.train import synthetic_events
+from model.tree_shap import ShapTables
+from serving.explanations import Quantizer
+
+
+def _scorer(model_registry):
+    return FraudScorer(os.path.join(model_registry, "1.0"))
+
+
+def _conditional_expectation(model, x, subset):
+    """
+    E[f(x) | x_S] path-dependent: nos splits de features em subset segue o
+    ramo de x; nos demais, média dos dois ramos ponderada por cover.
+    """
+    feature, threshold = np.asarray(model.feature), np.asarray(model.threshold)
+    left, right = np.asarray(model.left), np.asarray(model.right)
+    default_left, value, cover = np.asarray(model.default_left), np.asarray(model.value), np.asarray(model.cover)
+
+    def expectation(node):
+        if left[node] == node:
+            return value[node]
+        if feature[node] in subset:
+            column = x[feature[node]]
+            go_left = default_left[node] if math.isnan(column) else column < threshold[node]
+            return expectation(left[node] if go_left else right[node])
+        return (expectation(left[node]) * cover[left[node]]
+                + expectation(right[node]) * cover[right[node]]) / cover[node]
+
+    return model.base_score + sum(expectation(root) for root in np.asarray(model.roots).tolist())
+
+
+def _brute_force_shap(model, x):
+    n = len(model.feature_names)
+    phi = np.zeros(n)
+    for k in range(n):
+        others = [feature for feature in range(n) if feature != k]
+        for size in range(n):
+            weight = math.factorial(size) * math.factorial(n - size - 1) / math.factorial(n)
+            for subset in itertools.combinations(others, size):
+                phi[k] += weight * (_conditional_expectation(model, x, set(subset) | {k})
+                                    - _conditional_expectation(model, x, set(subset)))
+    return phi
+
+
+def test_tabelas_shap_iguais_a_enumeracao_de_shapley(model_registry, transactions):
+    scorer = _scorer(model_registry)
+    X = scorer.encoder.encode(transactions[:4] + [{}, {"amount": 5000.0, "channel": "PIX"}])
+    shap = ShapTables(scorer.model).shap_values(X)
+    for row, contributions in zip(X, shap):
+        np.testing.assert_allclose(contributions, _brute_force_shap(scorer.model, row), atol=1e-9)
+    np.testing.assert_allclose(shap.sum(axis=1) + scorer.model.expected_value,
+                               scorer.model.predict_margin(X), atol=1e-9)
+
+
+def test_chaves_sem_perda_agrupam_linhas_com_os_mesmos_valores_shap(model_registry):
+    scorer = _scorer(model_registry)
+    events = synthetic_events(3000, 11)
+    X = scorer.encoder.encode(events)
+    quantizer = Quantizer(scorer.model, resolution=0)
+    assert quantizer.lossless
+
+    shap = ShapTables(scorer.model).shap_values(X)
+    groups = defaultdict(list)
+    for index, key in enumerate(quantizer.keys(X)):
+        groups[key].append(index)
+    # Chaves repetidas existem (o teste não é trivial) e cada grupo tem um só vetor SHAP
+    assert len(groups) < len(X)
+    for indices in groups.values():
+        assert all(np.array_equal(shap[indices[0]], shap[other]) for other in indices[1:])
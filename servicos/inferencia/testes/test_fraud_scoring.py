@@ -0,0 +1,92 @@
+import os
+import json
+import math
+import asyncio
+
+import numpy as np
+from prometheus_client import CollectorRegistry
+from starlette.testclient import TestClient
+
+from app import FraudScorer, create_app
+from middleware.metrics_pusher import MetricsPusher
+from model.features import FeatureEncoder, invalid_fields
+from model.train import synthetic_events
+from serving.micro_batcher import MicroBatcher
+
+
+class NullPusher(MetricsPusher):
+    def __init__(self):
+        super().__init__("push-gateway.invalid:9091", registry=CollectorRegistry())
+
+    def _push(self, job):
+        pass
+
+
+def test_categoria_nao_escalar_vira_nan():
+    encoder = FeatureEncoder({"channel": ["APP", "PIX"]})
+    X = encoder.encode([{"channel": ["PIX"]}, {"channel": {"name": "PIX"}}, {"channel": "PIX"}])
+    channel = encoder.feature_names.index("channel")
+    assert math.isnan(X[0, channel]) and math.isnan(X[1, channel])
+    assert X[2, channel] == 1.0
+
+
+def test_eventos_sinteticos_preenchem_todas_as_features():
+    events = synthetic_events(2000, 3)
+    encoder = FeatureEncoder.fit(events)
+    X = encoder.encode(events)
+    for index, name in enumerate(encoder.feature_names):
+        column = X[:, index]
+        assert not np.isnan(column).any(), name
+        assert len(np.unique(column)) > 1, name
+    assert synthetic_events(100, 3) == events[:100]
+
+
+def test_campos_com_tipo_invalido():
+    assert invalid_fields({"amount": 10.5, "channel": "PIX", "payee": {"account_age_days": 3}}) == []
+    assert invalid_fields({"amount": None, "time": None}) == []
+    assert invalid_fields({"amount": float("inf"), "history": {"tx_count_24h": float("nan")}}) == [
+        "amount", "history.tx_count_24h"]
+    assert invalid_fields({"amount": "10", "channel": ["PIX"], "payee": [1],
+                           "history": {"tx_count_24h": True}}) == [
+        "amount", "payee", "history.tx_count_24h", "channel"]
+
+
+def test_payload_invalido_nao_afeta_o_lote(model_registry, transactions):
+    scorer = FraudScorer(os.path.join(model_registry, "1.0"))
+    # Inteiro grande demais para float: a codificação da linha falha
+    payloads = transactions[:3] + [{"amount": 10 ** 400}] + transactions[3:6]
+    expected = scorer.score_batch(transactions[:6])
+
+    async def run():
+        batcher = MicroBatcher(scorer.score_batch, max_batch_size=len(payloads), max_wait=1.0)
+        results = await asyncio.gather(*(batcher.submit(payload) for payload in payloads),
+                                       return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert isinstance(results[3], ValueError)
+    scores = [result[0] for index, result in enumerate(results) if index != 3]
+    assert scores == [score for score, _ in expected]
+
+
+def test_predict_recusa_payload_invalido(model_registry, transactions):
+    app = create_app(model_registry, version=None, mode="swap", max_wait=0.001, pusher=NullPusher(),
+                     poll_interval=0)
+    with TestClient(app) as client:
+        response = client.post("/predict", json={**transactions[0], "channel": ["PIX"]})
+        assert response.status_code == 400
+        assert response.json()["fields"] == ["channel"]
+
+        response = client.post("/predict", content=json.dumps({**transactions[0], "amount": 10 ** 400}))
+        assert response.status_code == 400
+
+        # 1e400 é JSON válido e vira inf
+        for body in (b'{"amount": 1e400}', b'{"amount": -1e400, "payee": {"account_age_days": 1e400}}'):
+            response = client.post("/predict", content=body)
+            assert response.status_code == 400
+            assert "amount" in response.json()["fields"]
+
+        response = client.post("/predict", json=transactions[0])
+        assert response.status_code == 200
+        assert response.json()["model_version"] == "1.0"
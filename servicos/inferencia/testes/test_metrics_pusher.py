@@ -0,0 +1,75 @@
+import asyncio
+
+from prometheus_client import CollectorRegistry
+
+from middleware.metrics_pusher import MetricsPusher
+
+
+class RecordingPusher(MetricsPusher):
+    """MetricsPusher que registra os jobs em vez de chamar o Push Gateway."""
+
+    def __init__(self, **kwargs):
+        super().__init__("push-gateway.invalid:9091", registry=CollectorRegistry(), **kwargs)
+        self.pushed = []
+
+    def _push(self, job):
+        self.pushed.append(job)
+
+
+def test_stop_envia_o_job_retirado_da_fila():
+    pusher = RecordingPusher(interval=10)
+
+    async def run():
+        pusher.mark_dirty("job_a")
+        # A tarefa retira job_a da fila e dorme o intervalo de agrupamento
+        await asyncio.sleep(0.01)
+        await pusher.stop(flush=True)
+
+    asyncio.run(run())
+    assert pusher.pushed == ["job_a"]
+    assert not pusher._pending
+
+
+def test_stop_sem_flush_nao_envia():
+    pusher = RecordingPusher(interval=10)
+
+    async def run():
+        pusher.mark_dirty("job_a")
+        await asyncio.sleep(0.01)
+        await pusher.stop(flush=False)
+
+    asyncio.run(run())
+    assert pusher.pushed == []
+    assert not pusher._pending
+
+
+def test_marcacao_depois_do_stop_reinicia_o_envio():
+    pusher = RecordingPusher(interval=0.01)
+
+    async def first_loop():
+        pusher.mark_dirty("job_a")
+        await asyncio.sleep(0.01)
+        await pusher.stop(flush=False)
+
+    async def second_loop():
+        pusher.mark_dirty("job_a")
+        await asyncio.sleep(0.1)
+        await pusher.stop(flush=False)
+
+    asyncio.run(first_loop())
+    asyncio.run(second_loop())
+    assert pusher.pushed == ["job_a"]
+
+
+def test_marcacoes_no_intervalo_sao_agrupadas():
+    pusher = RecordingPusher(interval=0.05)
+
+    async def run():
+        for _ in range(10):
+            pusher.mark_dirty("job_a")
+            pusher.mark_dirty("job_b")
+        await asyncio.sleep(0.2)
+        await pusher.stop(flush=True)
+
+    asyncio.run(run())
+    assert sorted(pusher.pushed) == ["job_a", "job_b"]
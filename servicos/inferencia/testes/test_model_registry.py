@@ -0,0 +1,168 @@
+import os
+import time
+import shutil
+import asyncio
+import threading
+
+import pytest
+
+from app import FraudScorer
+from serving.model_registry import ModelRegistry
+
+
+def _add_version(model_registry, root, version):
+    shutil.copytree(os.path.join(model_registry, "1.0"), os.path.join(root, version))
+
+
+def _registry(root, loader=FraudScorer, **options):
+    # Sem verificação periódica: as trocas acontecem só em reload()
+    return ModelRegistry(str(root), "fraude_pix_teste", loader, version=options.pop("version", None),
+                         poll_interval=0, max_wait=0.001, warmup_rows=8, **options)
+
+
+def test_versao_substituida_responde_as_requisicoes_em_andamento(model_registry, transactions, tmp_path):
+    _add_version(model_registry, tmp_path, "1.0")
+    gate = threading.Event()
+    gate.set()
+
+    class GatedScorer(FraudScorer):
+        def score_batch(self, payloads, explain=True):
+            if self.version == "1.0":
+                gate.wait(5)
+            return super().score_batch(payloads, explain)
+
+    async def run():
+        registry = _registry(tmp_path, GatedScorer, mode="swap")
+        await registry.start()
+        previous = registry.active
+        gate.clear()
+        request = asyncio.get_running_loop().create_task(previous.score(transactions[0]))
+        while not previous.inflight:
+            await asyncio.sleep(0.001)
+
+        _add_version(model_registry, tmp_path, "1.1")
+        await registry.reload()
+        assert registry.active.version == "1.1"
+        # A versão anterior aguarda a requisição antes de encerrar o batcher
+        await asyncio.sleep(0.05)
+        assert previous.retired and not request.done()
+        assert previous.batcher._task is not None
+
+        gate.set()
+        score, _ = await request
+        assert 0.0 <= score <= 1.0
+        while registry._background:
+            await asyncio.sleep(0.001)
+        assert previous.inflight == 0 and previous.batcher._task is None
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_versao_com_falha_e_ignorada_ate_model_json_mudar(model_registry, tmp_path):
+    _add_version(model_registry, tmp_path, "1.0")
+    loaded = []
+
+    def loader(path):
+        loaded.append(os.path.basename(path))
+        return FraudScorer(path)
+
+    async def run():
+        registry = _registry(tmp_path, loader, mode="swap")
+        await registry.start()
+        os.makedirs(tmp_path / "2.0")
+        (tmp_path / "2.0" / "model.json").write_text("{}")
+
+        with pytest.raises(Exception):
+            await registry.reload()
+        status = await registry.reload()
+        assert loaded == ["1.0", "2.0"]
+        assert status["active"]["version"] == "1.0"
+        assert status["last_error"]["version"] == "2.0"
+
+        shutil.rmtree(tmp_path / "2.0")
+        _add_version(model_registry, tmp_path, "2.0")
+        later = time.time() + 10
+        os.utime(tmp_path / "2.0" / "model.json", (later, later))
+        await registry.reload()
+        assert loaded == ["1.0", "2.0", "2.0"]
+        assert registry.active.version == "2.0"
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_reload_usa_a_versao_fixada_ou_a_mais_recente(model_registry, tmp_path):
+    for version in ("1.0", "1.9", "1.10"):
+        _add_version(model_registry, tmp_path, version)
+
+    async def run():
+        pinned = _registry(tmp_path, version="1.9", mode="swap")
+        await pinned.start()
+        assert pinned.active.version == "1.9"
+        await pinned.reload()
+        assert pinned.active.version == "1.9"
+        await pinned.stop()
+
+        registry = _registry(tmp_path, mode="swap")
+        await registry.start()
+        # "1.10" é mais recente que "1.9"
+        assert registry.active.version == "1.10"
+        status = await registry.reload("1.0")
+        assert status["active"]["version"] == "1.0" and status["pinned_version"] == "1.0"
+        await registry.reload()
+        assert registry.active.version == "1.0"
+        with pytest.raises(FileNotFoundError):
+            await registry.reload("3.0")
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_promote_ativa_a_candidata_sem_recarregar(model_registry, tmp_path):
+    _add_version(model_registry, tmp_path, "1.0")
+    loaded = []
+
+    def loader(path):
+        loaded.append(os.path.basename(path))
+        return FraudScorer(path)
+
+    async def run():
+        registry = _registry(tmp_path, loader, mode="shadow")
+        await registry.start()
+        with pytest.raises(LookupError):
+            await registry.promote()
+
+        _add_version(model_registry, tmp_path, "1.1")
+        await registry.reload()
+        candidate = registry.candidate
+        assert registry.active.version == "1.0" and candidate.version == "1.1"
+        assert registry.route("tx-1") == (registry.active, candidate)
+
+        status = await registry.promote()
+        assert registry.active is candidate and registry.candidate is None
+        assert status["pinned_version"] == "1.1"
+        assert loaded == ["1.0", "1.1"]
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_roteamento_ab_e_estavel_por_transacao(model_registry, tmp_path):
+    _add_version(model_registry, tmp_path, "1.0")
+
+    async def run():
+        registry = _registry(tmp_path, mode="ab", ab_traffic=0.3)
+        await registry.start()
+        _add_version(model_registry, tmp_path, "1.1")
+        await registry.reload()
+
+        keys = [f"tx-{index}" for index in range(2000)]
+        first = [registry.route(key) for key in keys]
+        assert all(shadow is None for _, shadow in first)
+        assert [registry.route(key) for key in keys] == first
+        share = sum(slot is registry.candidate for slot, _ in first) / len(keys)
+        assert 0.25 < share < 0.35
+        await registry.stop()
+
+    asyncio.run(run())
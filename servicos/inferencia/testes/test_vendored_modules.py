@@ -0,0 +1,16 @@
+import os
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..")
+EXPORTER_DIR = os.path.join(REPO_DIR, "modules", "monitoring", "ml_metrics_exporter")
+SERVICE_DIR = os.path.join(REPO_DIR, "servicos", "inferencia")
+
+
+def _read(*parts):
+    with open(os.path.join(*parts), "rb") as f:
+        return f.read()
+
+
+def test_historico_de_compliance_igual_ao_do_exporter():
+    # Alterações no histórico são feitas no exporter e copiadas para cá
+    assert _read(SERVICE_DIR, "compliance", "compliance_history.py") == \
+        _read(EXPORTER_DIR, "compliance_history.py")